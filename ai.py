@@ -1,46 +1,106 @@
 import numpy as np
 from board import Board
 from eval_fn import evaluation_state
+from quiescence import quiescence_search
+from threats import forced_moves
+from pn_search import precheck
+from search_limits import SearchLimits, SearchAborted, BOOK, DEPTH, SOFT_TIME, PROVEN
+
+# Extend forcing moves at the depth horizon in alpha-beta search
+USE_QUIESCENCE = True
+
+# Only generate the winning move or the forced blocks when one side has a
+# four or an open three on the lines through the last moves
+USE_FORCED_MOVES = True
+
+# Before searching, try to prove a win by continuous threats (see pn_search)
+USE_PROOF_PRECHECK = True
+
+# Limits of the search in progress; every node is counted against them
+active_limits = SearchLimits()
 
 def get_opponent(color):
     return Board.WHITE if color == Board.BLACK else Board.BLACK
 
 
-def get_best_move(state, depth, ai_color, use_alphabeta=True):
+def generate_moves(state):
+    """Forced replies when the position demands them, otherwise every valid move"""
+    if USE_FORCED_MOVES:
+        moves = forced_moves(state)
+        if moves is not None:
+            return moves
+    return state.get_valid_moves()
+
+
+def get_best_move(state, depth, ai_color, use_alphabeta=True, limits=None):
     """
     Get the best move for the AI
     
     Args:
         state: Current board state
-        depth: Search depth
+        depth: Search depth, used when limits does not set one
         ai_color: AI player's color
         use_alphabeta: Whether to use alpha-beta pruning (default: True)
+        limits: Optional SearchLimits; node and time limits stop the search
+            between nodes and the best root move so far is played.
+            limits.stop_reason tells which limit ended the search.
         
     Returns:
         tuple: (best_move, best_value)
     """
-    values = np.array(state.board)
+    global active_limits
+    if limits is None:
+        limits = SearchLimits(depth=depth)
+    if limits.depth is not None:
+        depth = limits.depth
+    limits.start()
+    active_limits = limits
+
     best_value = -float('inf')
     best_move = (-1, -1)
-    pieces = np.count_nonzero(values != Board.EMPTY)
+    pieces = len(state.moves_history)
 
     if pieces == 0:
+        limits.finish(BOOK)
         return first_move(state)
     if pieces == 1:
+        limits.finish(BOOK)
         return second_move(state)
 
+    if USE_PROOF_PRECHECK:
+        proof = precheck(state.copy())
+        if proof is not None:
+            limits.finish(PROVEN)
+            return proof
+
+    # The search plays moves in place on one copy of the caller's board; a
+    # search aborted by a limit leaves its moves on the copy, which is dropped
+    state = state.copy()
     top_moves = get_top_moves(state, 10, ai_color)
 
-    for move_n_value in top_moves:
+    for index, move_n_value in enumerate(top_moves):
         move = move_n_value[0]
-        if use_alphabeta:
-            value = alphaBetaPruning(state.next(move), -float('inf'), float('inf'), depth - 1, ai_color)
-        else:
-            value = minimax(state.next(move), depth - 1, ai_color)
+        # Without iterations to cut short, the soft limit applies between root moves
+        if index and limits.soft_time_passed():
+            limits.finish(SOFT_TIME)
+            break
+        state.make_move(*move)
+        try:
+            if use_alphabeta:
+                value = alphaBetaPruning(state, -float('inf'), float('inf'), depth - 1, ai_color)
+            else:
+                value = minimax(state, depth - 1, ai_color)
+        except SearchAborted:
+            break
+        state.undo_move()
             
         if value > best_value:
             best_value = value
             best_move = move
+    else:
+        # Every root move was searched to the full depth
+        limits.depth_reached = depth
+    limits.finish(DEPTH)
 
     if best_move[0] == -1 and best_move[1] == -1:
         return top_moves[0]
@@ -50,35 +110,38 @@ def get_best_move(state, depth, ai_color, use_alphabeta=True):
 
 def get_top_moves(state, n, ai_color):
     top_moves = []
-    for move in state.get_valid_moves():
-        next_state = state.copy()
-        next_state.make_move(*move)
-        evaluation = evaluation_state(next_state, ai_color)
+    for move in generate_moves(state):
+        state.make_move(*move)
+        evaluation = evaluation_state(state, ai_color)
+        state.undo_move()
         top_moves.append((move, evaluation))
     return sorted(top_moves, key=lambda x: x[1], reverse=True)[:n]
 
 
 def alphaBetaPruning(state, alpha, beta, depth, ai_color):
+    active_limits.count_node()
+    if depth == 0 and USE_QUIESCENCE and not state.game_over:
+        return quiescence_search(state, alpha, beta, ai_color)
     if depth == 0 or state.game_over:
         return evaluation_state(state, ai_color)
 
     maximizing = (state.current_player == ai_color)
     if maximizing:
         value = -float('inf')
-        for move in state.get_valid_moves():
-            next_state = state.copy()
-            next_state.make_move(*move)
-            value = max(value, alphaBetaPruning(next_state, alpha, beta, depth - 1, ai_color))
+        for move in generate_moves(state):
+            state.make_move(*move)
+            value = max(value, alphaBetaPruning(state, alpha, beta, depth - 1, ai_color))
+            state.undo_move()
             alpha = max(alpha, value)
             if alpha >= beta:
                 break
         return value
     else:
         value = float('inf')
-        for move in state.get_valid_moves():
-            next_state = state.copy()
-            next_state.make_move(*move)
-            value = min(value, alphaBetaPruning(next_state, alpha, beta, depth - 1, ai_color))
+        for move in generate_moves(state):
+            state.make_move(*move)
+            value = min(value, alphaBetaPruning(state, alpha, beta, depth - 1, ai_color))
+            state.undo_move()
             beta = min(beta, value)
             if alpha >= beta:
                 break
@@ -89,6 +152,7 @@ def minimax(state, depth, ai_color):
     """
     Minimax algorithm without alpha-beta pruning
     """
+    active_limits.count_node()
     if depth == 0 or state.game_over:
         return evaluation_state(state, ai_color)
 
@@ -97,29 +161,29 @@ def minimax(state, depth, ai_color):
     if maximizing:
         # Maximizing player's turn
         value = -float('inf')
-        for move in state.get_valid_moves():
-            next_state = state.copy()
-            next_state.make_move(*move)
-            value = max(value, minimax(next_state, depth - 1, ai_color))
+        for move in generate_moves(state):
+            state.make_move(*move)
+            value = max(value, minimax(state, depth - 1, ai_color))
+            state.undo_move()
         return value
     else:
         # Minimizing player's turn
         value = float('inf')
-        for move in state.get_valid_moves():
-            next_state = state.copy()
-            next_state.make_move(*move)
-            value = min(value, minimax(next_state, depth - 1, ai_color))
+        for move in generate_moves(state):
+            state.make_move(*move)
+            value = min(value, minimax(state, depth - 1, ai_color))
+            state.undo_move()
         return value
 
 
 def first_move(state):
-    x = state.size // 2
+    x = state.size // 2 if state.size else 0
     return (np.random.choice([x - 1, x, x + 1]), np.random.choice([x - 1, x, x + 1])), 1
 
 
 def second_move(state):
     i, j = state.last_move
-    size = state.size
-    i2 = 1 if i <= size // 2 else -1
-    j2 = 1 if j <= size // 2 else -1
+    center = state.size // 2 if state.size else 0
+    i2 = 1 if i <= center else -1
+    j2 = 1 if j <= center else -1
     return (i + i2, j + j2), 2
@@ -1,107 +1,551 @@
+import math
+import threading
+from array import array
 import numpy as np
-import time
 from board import Board
 from eval_fn import evaluation_state
+from eval_cache import EvalCache
+from quiescence import quiescence_search, QuiescenceBudget
+from threats import forced_moves
+from pn_search import precheck, ProofTable
+from rules import FREESTYLE
+from search_limits import SearchLimits, SearchAborted, BOOK, DEPTH, PROVEN
+from symmetry import canonical_key, to_canonical, from_canonical
+from move_order import score_move
 
 def get_opponent(color):
     return Board.WHITE if color == Board.BLACK else Board.BLACK
 
-# Use a transposition table to avoid recalculating positions
+# Use a transposition table to avoid recalculating positions; entries are
+# (depth, value, flag, best_move). The table of the active EngineSession.
 transposition_table = {}
 
-def get_best_move(state, depth, ai_color, use_alphabeta=True):
+# History heuristic: moves that caused cutoffs, weighted by depth squared,
+# keyed by packed move
+history_table = {}
+
+# Moves in the search are packed into one 32-bit integer,
+# (row + MOVE_OFFSET) << MOVE_BITS | (col + MOVE_OFFSET), so rows and columns
+# from -MOVE_OFFSET to MOVE_OFFSET - 1 fit, large and unbounded sparse
+# boards included
+MOVE_BITS = 16
+MOVE_OFFSET = 1 << (MOVE_BITS - 1)
+COORD_MASK = (1 << MOVE_BITS) - 1
+MOVE_MASK = (1 << (2 * MOVE_BITS)) - 1
+# Ordering keys pack the evaluation, the history count (capped) and the move
+# into one integer, so a plain in-place sort orders the moves
+HISTORY_BITS = 20
+HISTORY_LIMIT = (1 << HISTORY_BITS) - 1
+
+# Per-ply buffers reused by every node at that ply: the generated moves
+# (array('L') of packed moves) and their ordering keys
+_move_buffers = []
+_order_buffers = []
+
+# The buffers, tables and limits above belong to the search in progress, so
+# searches from different threads (e.g. a GUI producer started while the
+# one it replaced still searches) take turns
+_search_lock = threading.Lock()
+
+# Sessions clear their table when it grows past this many positions
+TT_MAX_ENTRIES = 500000
+
+# Hard time limit (seconds) used when get_best_move is called without limits
+DEFAULT_TIME_LIMIT = 5
+
+# Limits of the search in progress; every node is counted against them
+active_limits = SearchLimits()
+
+# Transposition table bound types: searches with a narrowed window only
+# prove a lower or upper bound on the value
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+# Late move reductions: moves after the first LMR_FULL_DEPTH_MOVES in the
+# ordering are searched LMR table plies shallower with a null window, and
+# re-searched at full depth if they turn out better than expected
+LMR_MIN_DEPTH = 3
+LMR_FULL_DEPTH_MOVES = 3
+
+# Null-move pruning: let the side to move pass and search shallower; if it is
+# still fine the real search would be too. Off by default, and never used
+# when either side has a threat on the board
+USE_NULL_MOVE = False
+NULL_MOVE_REDUCTION = 2
+NULL_MOVE_MIN_DEPTH = 3
+
+# Extend forcing moves at the depth horizon instead of evaluating positions
+# with open fours/threes statically
+USE_QUIESCENCE = True
+
+# Cache static evaluations; positions are evaluated for move ordering and
+# again as leaves, and again on every iteration
+USE_EVAL_CACHE = True
+evaluation_cache = EvalCache()
+
+# Only generate the winning move or the forced blocks when one side has a
+# four or an open three on the lines through the last moves
+USE_FORCED_MOVES = True
+
+# Before searching, try to prove a win by continuous threats when the side
+# to move has forcing moves (see pn_search)
+USE_PROOF_PRECHECK = True
+
+# Rotated and mirrored positions share transposition table entries, with the
+# best move stored in the canonical frame (see symmetry). Off by default:
+# evaluation_state is not symmetric, so shared entries would make results
+# depend on which variant of a position was searched first
+USE_SYMMETRY = False
+
+# Order moves (and pick the root candidates) by the line shapes through
+# each cell (move_order.score_move) instead of playing every move and
+# evaluating the whole board
+USE_LOCAL_ORDERING = True
+
+
+def evaluate(state, ai_color):
+    """evaluation_state, through the evaluation cache when enabled"""
+    if USE_EVAL_CACHE:
+        return evaluation_cache.evaluate(state, ai_color)
+    return evaluation_state(state, ai_color)
+
+
+def generate_moves(state):
+    """Forced replies when the position demands them, otherwise every valid move"""
+    if USE_FORCED_MOVES:
+        moves = forced_moves(state)
+        if moves is not None:
+            return moves
+    return state.get_valid_moves()
+
+
+def pack_move(row, col):
+    if not (-MOVE_OFFSET <= row < MOVE_OFFSET and -MOVE_OFFSET <= col < MOVE_OFFSET):
+        raise ValueError(f"Move {(row, col)} is outside the searchable range")
+    return ((row + MOVE_OFFSET) << MOVE_BITS) | (col + MOVE_OFFSET)
+
+
+def unpack_move(packed):
+    return (packed >> MOVE_BITS) - MOVE_OFFSET, (packed & COORD_MASK) - MOVE_OFFSET
+
+
+def ply_buffers(ply):
+    """The (moves, order keys) buffers of a ply, created on first use"""
+    while len(_move_buffers) <= ply:
+        _move_buffers.append(array('L'))
+        _order_buffers.append([])
+    return _move_buffers[ply], _order_buffers[ply]
+
+
+def generate_packed_moves(state, buffer):
+    """Refill buffer with generate_moves(state) as packed moves"""
+    del buffer[:]
+    for row, col in generate_moves(state):
+        buffer.append(pack_move(row, col))
+    return buffer
+
+
+def build_reduction_table(max_depth=32, max_moves=256, base=0.5, divisor=2.5):
+    """
+    Build a late move reduction table.
+
+    Args:
+        max_depth (int): Largest remaining depth covered
+        max_moves (int): Largest move index covered
+        base (float): Constant part of the reduction
+        divisor (float): Larger values reduce less
+
+    Returns:
+        list: table[depth][move_index] = plies to reduce
+    """
+    table = [[0] * max_moves for _ in range(max_depth + 1)]
+    for depth in range(1, max_depth + 1):
+        for index in range(1, max_moves):
+            reduction = int(base + math.log(depth) * math.log(index) / divisor)
+            # Always leave at least one ply of real search
+            table[depth][index] = max(0, min(reduction, depth - 2))
+    return table
+
+
+reduction_table = build_reduction_table()
+
+
+class SearchStats:
+    """Counters for the pruning techniques used by alphaBetaPruning"""
+    def __init__(self):
+        self.reductions = 0
+        self.re_searches = 0
+        self.null_move_tries = 0
+        self.null_move_cutoffs = 0
+        self.quiescence_nodes = 0
+        self.tt_probes = 0
+        self.tt_hits = 0
+
+    def tt_hit_rate(self):
+        return self.tt_hits / self.tt_probes if self.tt_probes else 0.0
+
+    def __str__(self):
+        return (f"reductions {self.reductions}, re-searches {self.re_searches}, "
+                f"null moves {self.null_move_cutoffs}/{self.null_move_tries}, "
+                f"quiescence nodes {self.quiescence_nodes}, TT hits {self.tt_hit_rate():.0%}")
+
+
+search_stats = SearchStats()
+
+class SearchInfo:
+    """Progress of a search, reported after each completed depth"""
+    def __init__(self, depth, lines, nodes, elapsed):
+        """
+        Args:
+            depth (int): Completed depth
+            lines (list): (move, value, principal_variation) for the best root moves
+            nodes (int): Nodes searched so far
+            elapsed (float): Seconds since the search started
+        """
+        self.depth = depth
+        self.lines = lines
+        self.nodes = nodes
+        self.elapsed = elapsed
+
+    @property
+    def nps(self):
+        return self.nodes / self.elapsed if self.elapsed else 0.0
+
+
+class EngineSession:
+    """
+    Search state kept between the turns of one game.
+
+    The transposition table, history heuristic and principal variation of
+    the previous search stay valid after the two moves played since, so a
+    session syncs its own board with the game by applying the new moves and,
+    when the opponent answered as expected, resumes iterative deepening
+    where the principal variation continues instead of from depth 1.
+    Positions that do not continue the previous one reset the session.
+    """
+    def __init__(self, max_table_size=TT_MAX_ENTRIES, shared_table=None):
+        """
+        Args:
+            max_table_size (int): The table is cleared when it grows past this
+            shared_table: Optional SharedTranspositionTable used instead of a
+                private dict; it is shared with other processes, so it is
+                never cleared
+        """
+        self.max_table_size = max_table_size
+        self.shared_table = shared_table
+        self.ai_color = None
+        # Proven positions stay proven, so this table survives resets
+        self.proofs = ProofTable()
+        self.reset()
+
+    def reset(self, rules=FREESTYLE, size=15):
+        self.board = None
+        self.moves = []
+        # Shared entries are keyed by the AI color too, as values are from its
+        # side, and by the variant, as other processes may play other games
+        self.table = {} if self.shared_table is None else self.shared_table.for_color(self.ai_color, rules, size)
+        self.history = {}
+        self.pv = []
+        self.depth = 0
+
+    def sync(self, state):
+        """
+        Bring the session board up to date with state.
+
+        Returns:
+            list: Moves applied since the last search, or None if the session
+                had to be reset
+        """
+        moves = [(r, c) for r, c, _ in state.moves_history]
+        known = len(self.moves)
+        if self.board is None or moves[:known] != self.moves or self.board.size != state.size \
+                or type(self.board) is not type(state) or self.board.rules != state.rules:
+            self.reset(state.rules, state.size)
+            self.board = state.copy()
+            self.moves = moves
+            return None
+        new_moves = moves[known:]
+        for move in new_moves:
+            self.board.make_move(*move)
+        self.moves = moves
+        return new_moves
+
+    def get_best_move(self, state, depth, ai_color, use_alphabeta=True, limits=None,
+                      on_depth=None, multi_pv=1):
+        """
+        Search the position like get_best_move, reusing the previous turn's work.
+
+        The search runs on the session's own board, so state is not touched.
+        """
+        with _search_lock:
+            return self._get_best_move(state, depth, ai_color, use_alphabeta, limits, on_depth, multi_pv)
+
+    def _get_best_move(self, state, depth, ai_color, use_alphabeta, limits, on_depth, multi_pv):
+        global moves_calculated, search_stats, active_limits, transposition_table, history_table
+        moves_calculated = 0
+        search_stats = SearchStats()
+        evaluation_cache.reset_stats()
+        if limits is None:
+            limits = SearchLimits(depth=depth, hard_time=DEFAULT_TIME_LIMIT)
+        max_depth = limits.depth if limits.depth is not None else depth
+        limits.start()
+        active_limits = limits
+
+        pieces = len(state.moves_history)
+
+        # Early game optimizations
+        if pieces == 0:
+            limits.finish(BOOK)
+            return first_move(state)
+        if pieces == 1:
+            limits.finish(BOOK)
+            return second_move(state)
+
+        if ai_color != self.ai_color:
+            self.ai_color = ai_color
+            self.reset()
+        new_moves = self.sync(state)
+        if self.shared_table is None and len(self.table) > self.max_table_size:
+            self.table.clear()
+        # Older history counts matter less than this turn's
+        for move in self.history:
+            self.history[move] //= 2
+        transposition_table = self.table
+        history_table = self.history
+
+        if USE_PROOF_PRECHECK:
+            proof = precheck(self.board, table=self.proofs)
+            if proof is not None:
+                limits.finish(PROVEN)
+                self.pv = []
+                self.depth = 0
+                return proof
+
+        # Resume where the principal variation continues
+        start_depth = 1
+        expected = None
+        if new_moves is not None and len(self.pv) > 2 and new_moves == self.pv[:2]:
+            expected = self.pv[2]
+            start_depth = max(1, min(max_depth, self.depth - 1))
+            print(f"Continuing expected line, starting at depth {start_depth}")
+
+        board = self.board
+        best_move, best_value = self._search(board, ai_color, use_alphabeta, limits,
+                                             start_depth, max_depth, expected, on_depth, multi_pv)
+        if best_move is not None and best_move != (-1, -1):
+            self.pv = principal_variation(board, best_move, max(limits.depth_reached, 1))
+            self.depth = limits.depth_reached
+        else:
+            self.pv = []
+            self.depth = 0
+        return best_move, best_value
+
+    def _search(self, state, ai_color, use_alphabeta, limits, start_depth, max_depth, expected,
+                on_depth=None, multi_pv=1):
+        """Iterative deepening from start_depth; returns (best_move, best_value)"""
+        global moves_calculated
+
+        best_move = None
+        best_value = -float('inf')
+
+        # Get candidate moves ordered by initial evaluation
+        candidate_moves = get_top_moves(state, 10, ai_color)
+
+        # No valid moves case
+        if not candidate_moves:
+            limits.finish(DEPTH)
+            return (-1, -1), -float('inf')
+
+        # Search the expected move first, even if it is not a top static move
+        if expected is not None and state.is_valid_move(*expected):
+            candidate_moves = [(expected, None)] + [item for item in candidate_moves if item[0] != expected]
+
+        # Initialize with the first move
+        best_move = candidate_moves[0][0]
+        root_length = len(state.moves_history)
+
+        # Increase the depth until the target depth or another limit
+        for current_depth in range(start_depth, max_depth + 1):
+            if current_depth > start_depth and not limits.can_deepen(current_depth):
+                print(f"Stopped before depth {current_depth}: {limits.stop_reason} limit")
+                break
+            temp_best_move = None
+            temp_best_value = -float('inf')
+            depth_moves_calculated = 0  # Counter for moves at this depth
+            root_values = []
+
+            # Search each candidate move
+            for move, _ in candidate_moves:
+                # Use in-place make_move/undo_move instead of deep copy
+                state.make_move(*move)
+                move_counter = MoveCounter()
+                try:
+                    if use_alphabeta:
+                        # Only moves that could make the top multi_pv matter at the root
+                        value = alphaBetaPruning(state, root_alpha(root_values, multi_pv), float('inf'),
+                                               current_depth - 1, ai_color, move_counter)
+                    else:
+                        value = minimax(state, current_depth - 1, ai_color, move_counter)
+                except SearchAborted:
+                    # Unwind the moves the interrupted search left on the board
+                    while len(state.moves_history) > root_length:
+                        state.undo_move()
+                    print(f"{limits.stop_reason} limit reached at depth {current_depth}")
+                    print(f"Total positions evaluated before stopping: "
+                          f"{moves_calculated + depth_moves_calculated + move_counter.count}")
+                    # Use the best move found at this depth if it's better than the previous best
+                    if temp_best_value > best_value:
+                        return temp_best_move, temp_best_value
+                    else:
+                        return best_move, best_value
+                state.undo_move()
+
+                depth_moves_calculated += move_counter.count
+                root_values.append((move, value))
+
+                if value > temp_best_value:
+                    temp_best_value = value
+                    temp_best_move = move
+
+            # Update best move with completed depth results
+            best_value = temp_best_value
+            best_move = temp_best_move
+            limits.depth_reached = current_depth
+            limits.completed_iteration(current_depth, best_move, best_value, len(candidate_moves))
+
+            # Print information about this depth
+            print(f"Depth {current_depth}: Evaluated {depth_moves_calculated} positions ({search_stats})")
+            moves_calculated += depth_moves_calculated
+
+            if on_depth is not None:
+                ranked = sorted(root_values, key=lambda item: item[1], reverse=True)[:multi_pv]
+                lines = [(move, value, principal_variation(state, move, current_depth))
+                         for move, value in ranked]
+                on_depth(SearchInfo(current_depth, lines, limits.nodes_searched, limits.elapsed()))
+
+            # Search the best move first at the next depth
+            candidate_moves.sort(key=lambda item: item[0] != best_move)
+
+        # Print total moves calculated for this turn
+        limits.finish(DEPTH)
+        print(f"Total positions evaluated: {moves_calculated}")
+        if USE_EVAL_CACHE:
+            print(f"Evaluation cache: {evaluation_cache}")
+        return best_move, best_value
+
+    def score_move(self, state, move, depth, ai_color, limits=None):
+        """
+        Value of playing move in state, searched like a root move.
+
+        The value is from ai_color's point of view and searched as deep as
+        the root moves of a depth `depth` search, so it compares directly
+        with the best_value get_best_move returns for the same position.
+
+        Returns:
+            The value of the move; raises SearchAborted when limits stop it
+        """
+        with _search_lock:
+            return self._score_move(state, move, depth, ai_color, limits)
+
+    def _score_move(self, state, move, depth, ai_color, limits):
+        global search_stats, active_limits, transposition_table, history_table
+        search_stats = SearchStats()
+        if limits is None:
+            limits = SearchLimits(hard_time=DEFAULT_TIME_LIMIT)
+        limits.start()
+        active_limits = limits
+
+        if ai_color != self.ai_color:
+            self.ai_color = ai_color
+            self.reset()
+        self.sync(state)
+        transposition_table = self.table
+        history_table = self.history
+
+        board = self.board
+        root_length = len(board.moves_history)
+        board.make_move(*move)
+        try:
+            return alphaBetaPruning(board, -float('inf'), float('inf'), max(1, depth) - 1,
+                                    ai_color, MoveCounter())
+        finally:
+            while len(board.moves_history) > root_length:
+                board.undo_move()
+
+
+# Sessions used by get_best_move, one per AI color so that both sides of an
+# AI vs AI game keep their own tables
+_sessions = {}
+# Transposition table shared with other processes (see use_shared_table)
+shared_table = None
+
+def use_shared_table(table):
+    """
+    Make get_best_move search with a table shared between processes.
+
+    Args:
+        table: shared_tt.SharedTranspositionTable, or None for private tables
+    """
+    global shared_table
+    shared_table = table
+    _sessions.clear()
+
+def get_best_move(state, depth, ai_color, use_alphabeta=True, limits=None, on_depth=None, multi_pv=1):
     """
     Get the best move for the AI with iterative deepening
     
+    Search state is kept between calls (see EngineSession), so consecutive
+    turns of the same game reuse the previous turn's work.
+    
     Args:
         state: Current board state
-        depth: Maximum search depth
+        depth: Maximum search depth, used when limits does not set one
         ai_color: AI player's color
         use_alphabeta: Whether to use alpha-beta pruning (default: True)
+        limits: SearchLimits bounding the search (default: depth and a
+            DEFAULT_TIME_LIMIT second hard time limit). limits.stop_reason
+            tells which limit ended the search.
+        on_depth: Optional callback receiving a SearchInfo after every
+            completed depth; called from the searching thread
+        multi_pv (int): Number of root moves to score exactly and report
         
     Returns:
         tuple: (best_move, best_value)
     """
-    # Reset move counter for this search
-    global moves_calculated
-    moves_calculated = 0
-    
-    pieces = sum(1 for row in state.board for cell in row if cell != Board.EMPTY)
-    
-    # Early game optimizations
-    if pieces == 0:
-        return first_move(state)
-    if pieces == 1:
-        return second_move(state)
-    
-    # Clear transposition table for a new search
-    transposition_table.clear()
-    
-    best_move = None
-    best_value = -float('inf')
-    
-    # Get candidate moves ordered by initial evaluation
-    candidate_moves = get_top_moves(state, 10, ai_color)
-    
-    # No valid moves case
-    if not candidate_moves:
-        return (-1, -1), -float('inf')
-    
-    # Initialize with the first move
-    best_move = candidate_moves[0][0]
-    
-    # Start timing logic
-    start_time = time.time()
-    time_limit = 5  # seconds
-    
-    # Start with depth=1 and increase until target depth
-    for current_depth in range(1, depth + 1):            
-        temp_best_move = None
-        temp_best_value = -float('inf')
-        depth_moves_calculated = 0  # Counter for moves at this depth
-        
-        # Search each candidate move
-        for move, _ in candidate_moves:
-            # Check time limit before evaluating each move
-            if time.time() - start_time > time_limit:
-                print(f"Time limit reached at depth {current_depth}")
-                print(f"Total positions evaluated before timeout: {moves_calculated + depth_moves_calculated}")
-                # Use the best move found at this depth if it's better than the previous best
-                if temp_best_value > best_value:
-                    return temp_best_move, temp_best_value
-                else:
-                    return best_move, best_value
-            
-            # Use in-place make_move/undo_move instead of deep copy
-            state.make_move(*move)
-            move_counter = MoveCounter()
-            if use_alphabeta:
-                value = alphaBetaPruning(state, -float('inf'), float('inf'), 
-                                       current_depth - 1, ai_color, move_counter)
-            else:
-                value = minimax(state, current_depth - 1, ai_color, move_counter)
-            state.undo_move()
-            
-            depth_moves_calculated += move_counter.count
-            
-            if value > temp_best_value:
-                temp_best_value = value
-                temp_best_move = move
-        
-        # Update best move with completed depth results
-        best_value = temp_best_value
-        best_move = temp_best_move
-        
-        # Print information about this depth
-        print(f"Depth {current_depth}: Evaluated {depth_moves_calculated} positions")
-        moves_calculated += depth_moves_calculated
-        
-        # Re-order candidate moves based on current evaluation
-        candidate_moves = get_top_moves(state, 10, ai_color)
-    
-    # Print total moves calculated for this turn
-    print(f"Total positions evaluated: {moves_calculated}")
-    return best_move, best_value
+    session = _sessions.get(ai_color)
+    if session is None:
+        session = _sessions[ai_color] = EngineSession(shared_table=shared_table)
+    return session.get_best_move(state, depth, ai_color, use_alphabeta, limits, on_depth, multi_pv)
+
+def root_alpha(root_values, multi_pv):
+    """Alpha for the next root move: the multi_pv-th best value so far"""
+    if len(root_values) < multi_pv:
+        return -float('inf')
+    return sorted((value for _, value in root_values), reverse=True)[multi_pv - 1]
+
+def principal_variation(state, move, length):
+    """
+    Follow the transposition table's best moves from a root move.
+
+    Returns:
+        list: Up to length + 1 moves starting with move
+    """
+    pv = [move]
+    state.make_move(*move)
+    played = 1
+    while len(pv) <= length and not state.game_over:
+        state_hash, symmetry = get_state_key(state)
+        entry = transposition_table.get(state_hash)
+        move = from_canonical(entry[3], symmetry, state) if entry is not None else None
+        if move is None or not state.is_valid_move(*move):
+            break
+        pv.append(move)
+        state.make_move(*move)
+        played += 1
+    for _ in range(played):
+        state.undo_move()
+    return pv
 
 class MoveCounter:
     """Simple class to track move count"""
@@ -113,89 +557,232 @@ class MoveCounter:
 
 def get_state_hash(state):
     """Generate a hashable representation of the board state"""
-    board_tuple = tuple(map(tuple, state.board))
-    return (board_tuple, state.current_player)
+    return (state.hash_key, state.current_player)
+
+def get_state_key(state):
+    """
+    Transposition table key of the position.
+
+    Returns:
+        tuple: (key, symmetry) where symmetry maps moves on the board into the
+            frame of the stored best move
+    """
+    if USE_SYMMETRY:
+        key, symmetry = canonical_key(state)
+        return (key, state.current_player), symmetry
+    return get_state_hash(state), 0
 
 def get_top_moves(state, n, ai_color):
-    """Get the top n moves based on immediate evaluation (in-place)"""
+    """Get the top n moves based on the local move score or immediate evaluation (in-place)"""
     top_moves = []
-    for move in state.get_valid_moves():
+    if USE_LOCAL_ORDERING:
+        player = state.current_player
+        for move in generate_moves(state):
+            top_moves.append((move, score_move(state, move[0], move[1], player)))
+        return sorted(top_moves, key=lambda x: x[1], reverse=True)[:n]
+    for move in generate_moves(state):
         state.make_move(*move)
-        evaluation = evaluation_state(state, ai_color)
+        evaluation = evaluate(state, ai_color)
         state.undo_move()
         top_moves.append((move, evaluation))
     return sorted(top_moves, key=lambda x: x[1], reverse=True)[:n]
 
-def alphaBetaPruning(state, alpha, beta, depth, ai_color, move_counter):
-    """Alpha-beta pruning with transposition table (in-place, using make_move/undo_move)"""
+def alphaBetaPruning(state, alpha, beta, depth, ai_color, move_counter, allow_null=True):
+    """
+    Alpha-beta pruning with transposition table (in-place, using make_move/undo_move),
+    late move reductions and optional null-move pruning
+    """
     move_counter.increment()
+    active_limits.count_node()
 
-    if depth == 0 or state.game_over:
-        return evaluation_state(state, ai_color)
+    if state.game_over:
+        return evaluate(state, ai_color)
+    if depth <= 0:
+        if USE_QUIESCENCE:
+            budget = QuiescenceBudget()
+            value = quiescence_search(state, alpha, beta, ai_color, budget, evaluate=evaluate)
+            search_stats.quiescence_nodes += budget.nodes
+            return value
+        return evaluate(state, ai_color)
 
-    state_hash = get_state_hash(state)
-    if state_hash in transposition_table and transposition_table[state_hash][0] >= depth:
-        return transposition_table[state_hash][1]
+    alpha_orig, beta_orig = alpha, beta
+    state_hash, symmetry = get_state_key(state)
+    entry = transposition_table.get(state_hash)
+    search_stats.tt_probes += 1
+    if entry is not None:
+        search_stats.tt_hits += 1
+    if entry is not None and entry[0] >= depth:
+        _, tt_value, tt_flag, _ = entry
+        if tt_flag == EXACT:
+            return tt_value
+        if tt_flag == LOWER and tt_value >= beta:
+            return tt_value
+        if tt_flag == UPPER and tt_value <= alpha:
+            return tt_value
 
     maximizing = (state.current_player == ai_color)
-    moves = state.get_valid_moves()
-    if len(moves) > 5:
-        move_values = []
-        for move in moves:
-            state.make_move(*move)
-            move_values.append((move, evaluation_state(state, ai_color)))
-            state.undo_move()
+
+    # Null move: if passing still fails outside the window, so will a real move
+    bound = beta if maximizing else alpha
+    if USE_NULL_MOVE and allow_null and depth >= NULL_MOVE_MIN_DEPTH and abs(bound) != float('inf') \
+            and not has_threat(state):
+        search_stats.null_move_tries += 1
+        state.current_player = get_opponent(state.current_player)
         if maximizing:
-            moves = [m[0] for m in sorted(move_values, key=lambda x: x[1], reverse=True)]
+            null_value = alphaBetaPruning(state, beta - 1, beta, depth - 1 - NULL_MOVE_REDUCTION,
+                                          ai_color, move_counter, False)
         else:
-            moves = [m[0] for m in sorted(move_values, key=lambda x: x[1])]
+            null_value = alphaBetaPruning(state, alpha, alpha + 1, depth - 1 - NULL_MOVE_REDUCTION,
+                                          ai_color, move_counter, False)
+        state.current_player = get_opponent(state.current_player)
+        if (maximizing and null_value >= beta) or (not maximizing and null_value <= alpha):
+            search_stats.null_move_cutoffs += 1
+            return null_value
 
-    if maximizing:
-        value = -float('inf')
-        for move in moves:
-            state.make_move(*move)
-            child_value = alphaBetaPruning(state, alpha, beta, depth - 1, ai_color, move_counter)
+    # Moves and their ordering live in this ply's buffers. A null-move child
+    # runs at the same ply, but returns before the buffers are filled here.
+    moves, order = ply_buffers(len(state.moves_history))
+    generate_packed_moves(state, moves)
+    if len(moves) > 5:
+        # Sort keys: (score, history) then the move, negated to put the
+        # best first; ties in the score go to the history heuristic
+        del order[:]
+        player = state.current_player
+        for packed in moves:
+            row, col = (packed >> MOVE_BITS) - MOVE_OFFSET, (packed & COORD_MASK) - MOVE_OFFSET
+            history = min(history_table.get(packed, 0), HISTORY_LIMIT)
+            if USE_LOCAL_ORDERING:
+                # The local score is the mover's: best first for both sides
+                score = score_move(state, row, col, player) << HISTORY_BITS
+                order.append((-(score + history) << (2 * MOVE_BITS)) | packed)
+                continue
+            state.make_move(row, col)
+            score = int(evaluate(state, ai_color)) << HISTORY_BITS
             state.undo_move()
-            value = max(value, child_value)
-            alpha = max(alpha, value)
-            if alpha >= beta:
+            if maximizing:
+                order.append((-(score + history) << (2 * MOVE_BITS)) | packed)
+            else:
+                order.append(((score + HISTORY_LIMIT - history) << (2 * MOVE_BITS)) | packed)
+        order.sort()
+        moves = order
+    # The best move from an earlier search of this position goes first
+    if entry is not None and entry[3] is not None:
+        tt_move = from_canonical(entry[3], symmetry, state)
+        tt_packed = pack_move(*tt_move)
+        for index in range(len(moves)):
+            if moves[index] & MOVE_MASK == tt_packed:
+                if index:
+                    moves.insert(0, moves.pop(index))
                 break
-    else:
-        value = float('inf')
-        for move in moves:
-            state.make_move(*move)
+
+    value = -float('inf') if maximizing else float('inf')
+    best_move = None
+    reductions = reduction_table[min(depth, len(reduction_table) - 1)]
+    for index in range(len(moves)):
+        move = moves[index] & MOVE_MASK
+        row, col = (move >> MOVE_BITS) - MOVE_OFFSET, (move & COORD_MASK) - MOVE_OFFSET
+        state.make_move(row, col)
+
+        reduction = 0
+        if depth >= LMR_MIN_DEPTH and index >= LMR_FULL_DEPTH_MOVES \
+                and abs(alpha if maximizing else beta) != float('inf') and not is_tactical(state, row, col):
+            reduction = reductions[min(index, len(reductions) - 1)]
+
+        if reduction:
+            search_stats.reductions += 1
+            # Null-window search at reduced depth: only asks "does this beat the best so far?"
+            if maximizing:
+                child_value = alphaBetaPruning(state, alpha, alpha + 1, depth - 1 - reduction, ai_color, move_counter)
+                surprise = child_value > alpha
+            else:
+                child_value = alphaBetaPruning(state, beta - 1, beta, depth - 1 - reduction, ai_color, move_counter)
+                surprise = child_value < beta
+            if surprise:
+                search_stats.re_searches += 1
+                child_value = alphaBetaPruning(state, alpha, beta, depth - 1, ai_color, move_counter)
+        else:
             child_value = alphaBetaPruning(state, alpha, beta, depth - 1, ai_color, move_counter)
-            state.undo_move()
-            value = min(value, child_value)
+        state.undo_move()
+
+        if (child_value > value) if maximizing else (child_value < value):
+            value = child_value
+            best_move = move
+        if maximizing:
+            alpha = max(alpha, value)
+        else:
             beta = min(beta, value)
-            if alpha >= beta:
-                break
+        if alpha >= beta:
+            history_table[move] = history_table.get(move, 0) + depth * depth
+            break
 
-    transposition_table[state_hash] = (depth, value)
+    if value <= alpha_orig:
+        flag = UPPER
+    elif value >= beta_orig:
+        flag = LOWER
+    else:
+        flag = EXACT
+    if best_move is not None:
+        best_move = to_canonical(unpack_move(best_move), symmetry, state)
+    transposition_table[state_hash] = (depth, value, flag, best_move)
     return value
 
+def _run_length(state, row, col, dr, dc, player):
+    """Count consecutive stones of player from (row, col) in one direction, excluding it"""
+    count = 0
+    r, c = row + dr, col + dc
+    while state.in_bounds(r, c) and state.get(r, c) == player:
+        count += 1
+        r += dr
+        c += dc
+    return count
+
+def is_tactical(state, row, col):
+    """
+    Whether the move just played at (row, col) makes or blocks a line of
+    three or more. Such moves are never reduced.
+    """
+    player = state.get(row, col)
+    opponent = get_opponent(player)
+    for dr, dc in ((0, 1), (1, 0), (1, 1), (1, -1)):
+        if 1 + _run_length(state, row, col, dr, dc, player) + _run_length(state, row, col, -dr, -dc, player) >= 3:
+            return True
+        if _run_length(state, row, col, dr, dc, opponent) + _run_length(state, row, col, -dr, -dc, opponent) >= 2:
+            return True
+    return False
+
+def has_threat(state, recent=4):
+    """Whether a line of three or more runs through any of the most recent moves"""
+    for row, col, player in state.moves_history[-recent:]:
+        if state.get(row, col) != player:
+            continue
+        for dr, dc in ((0, 1), (1, 0), (1, 1), (1, -1)):
+            if 1 + _run_length(state, row, col, dr, dc, player) + _run_length(state, row, col, -dr, -dc, player) >= 3:
+                return True
+    return False
+
 def minimax(state, depth, ai_color, move_counter):
     """
     Minimax algorithm without alpha-beta pruning (in-place, using make_move/undo_move)
     """
     # Increment move counter
     move_counter.increment()
+    active_limits.count_node()
 
     if depth == 0 or state.game_over:
-        return evaluation_state(state, ai_color)
+        return evaluate(state, ai_color)
 
     maximizing = (state.current_player == ai_color)
 
     if maximizing:
         value = -float('inf')
-        for move in state.get_valid_moves():
+        for move in generate_moves(state):
             state.make_move(*move)
             value = max(value, minimax(state, depth - 1, ai_color, move_counter))
             state.undo_move()
         return value
     else:
         value = float('inf')
-        for move in state.get_valid_moves():
+        for move in generate_moves(state):
             state.make_move(*move)
             value = min(value, minimax(state, depth - 1, ai_color, move_counter))
             state.undo_move()
@@ -203,15 +790,15 @@ def minimax(state, depth, ai_color, move_counter):
 
 def first_move(state):
     """Optimized first move function"""
-    x = state.size // 2
+    x = state.size // 2 if state.size else 0
     return (np.random.choice([x - 1, x, x + 1]), np.random.choice([x - 1, x, x + 1])), 1
 
 def second_move(state):
     """Optimized second move function"""
     i, j = state.last_move
-    size = state.size
-    i2 = 1 if i <= size // 2 else -1
-    j2 = 1 if j <= size // 2 else -1
+    center = state.size // 2 if state.size else 0
+    i2 = 1 if i <= center else -1
+    j2 = 1 if j <= center else -1
     return (i + i2, j + j2), 2
 
 # Initialize global counter
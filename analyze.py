@@ -0,0 +1,246 @@
+"""
+Offline game analysis.
+
+Replays recorded games, searches every position with ai_2 under a
+per-position budget and annotates each move with the engine's best move,
+the score swing of the move played and a mistake / blunder flag. Games are
+spread over a pool of worker processes; within a game each side keeps one
+EngineSession, so consecutive positions reuse the transposition table,
+history and principal variation of the previous one.
+
+Scores are from the side to move, clamped to +-FIVE_SCORE. A move's swing
+is how much worse the move played is than the best one, both scored by the
+mover's session from the mover's point of view at the same depth (the
+evaluation is not antisymmetric, so the opponent's score of the next
+position does not compare). A winning move has no swing. Positions with
+fewer than two stones are opening book moves for ai_2 and are not scored.
+
+Games are read from archives (.gmka) or from JSON lines, one game per
+line, either a list of moves (Board.moves_history dumps) or an object with
+"moves" and optionally "size" and "rules". One annotated game is written
+per output line, in the order the games finish:
+
+    python analyze.py games.gmka --workers 8 --depth 3 --time 5 -o analysis.jsonl
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from board import Board
+from eval_fn import FIVE_SCORE
+from rules import FREESTYLE
+from search_limits import SearchLimits, SearchAborted
+import ai_2
+
+DEFAULT_DEPTH = 3
+DEFAULT_TIME = 5.0
+# Swings (in evaluation units) that flag a move; an open three is worth
+# about 1000 and an open four 10000
+MISTAKE_SWING = 1000
+BLUNDER_SWING = 5000
+# Games queued per worker, so huge collections are not read into memory at once
+GAMES_PER_WORKER = 2
+
+
+def clamp_score(value):
+    return max(-FIVE_SCORE, min(FIVE_SCORE, value))
+
+
+def classify(swing):
+    """Flag for a score swing: None, "mistake" or "blunder"."""
+    if swing >= BLUNDER_SWING:
+        return "blunder"
+    if swing >= MISTAKE_SWING:
+        return "mistake"
+    return None
+
+
+def analyze_position(session, board, depth, nodes, time_limit):
+    """
+    Search one position for the side to move.
+
+    Returns:
+        tuple: (best_move, score, SearchLimits) or (None, None, None) for
+            opening book positions
+    """
+    if len(board.moves_history) < 2:
+        return None, None, None
+    limits = SearchLimits(depth=depth, nodes=nodes, hard_time=time_limit)
+    move, value = session.get_best_move(board, depth, board.current_player, limits=limits)
+    if move is None or move == (-1, -1):
+        return None, None, limits
+    return (int(move[0]), int(move[1])), clamp_score(value), limits
+
+
+def score_played(session, board, move, limits, depth, nodes, time_limit):
+    """
+    Score of a move other than the best one, searched by the mover's session
+    as deep as the best move was, or None if the search was cut short.
+    """
+    played_depth = limits.depth_reached or depth
+    played_limits = SearchLimits(nodes=nodes, hard_time=time_limit)
+    try:
+        value = session.score_move(board, move, played_depth, board.current_player, played_limits)
+    except SearchAborted:
+        return None
+    return clamp_score(value)
+
+
+def analyze_game(moves, size=15, rules=FREESTYLE, depth=DEFAULT_DEPTH, nodes=None, time_limit=DEFAULT_TIME):
+    """
+    Annotate every move of a game.
+
+    Args:
+        moves: Sequence of (row, col) or (row, col, player) tuples
+        size (int): Board size
+        rules (str): Rule variant of the game
+        depth (int): Search depth per position
+        nodes (int): Optional node budget per position
+        time_limit (float): Hard time limit per position in seconds
+
+    Returns:
+        list: One annotation dict per move
+    """
+    sessions = {Board.BLACK: ai_2.EngineSession(), Board.WHITE: ai_2.EngineSession()}
+    board = Board(size, rules)
+    annotations = []
+    best, score, limits = analyze_position(sessions[board.current_player], board, depth, nodes, time_limit)
+
+    for ply, move in enumerate(moves):
+        row, col = int(move[0]), int(move[1])
+        player = board.current_player
+        annotation = {
+            "ply": ply, "player": player, "move": [row, col],
+            "best": list(best) if best else None, "score": score,
+            "depth": limits.depth_reached if limits else 0,
+            "nodes": limits.nodes_searched if limits else 0,
+        }
+        if not board.is_valid_move(row, col):
+            annotation["flag"] = "illegal"
+            annotations.append(annotation)
+            break
+
+        played = None
+        if score is not None:
+            if (row, col) == best:
+                played = score
+            else:
+                played = score_played(sessions[player], board, (row, col), limits, depth, nodes, time_limit)
+        board.make_move(row, col)
+
+        if board.game_over:
+            played = FIVE_SCORE if board.winner == player else 0
+            next_best, next_score, next_limits = None, None, None
+        else:
+            next_best, next_score, next_limits = analyze_position(
+                sessions[board.current_player], board, depth, nodes, time_limit)
+
+        swing = None
+        if score is not None and played is not None:
+            swing = max(0, score - played)
+        annotation["played_score"] = played
+        annotation["swing"] = swing
+        annotation["flag"] = classify(swing) if swing is not None else None
+        annotations.append(annotation)
+
+        best, score, limits = next_best, next_score, next_limits
+    return annotations
+
+
+def _init_worker(quiet):
+    # The engine reports every depth on stdout; workers keep quiet by default
+    if quiet:
+        sys.stdout = open(os.devnull, "w")
+
+
+def _analyze_job(index, moves, size, rules, depth, nodes, time_limit):
+    started = time.time()
+    annotations = analyze_game(moves, size, rules, depth, nodes, time_limit)
+    return {
+        "game": index, "size": size, "rules": rules,
+        "time": round(time.time() - started, 3),
+        "blunders": sum(a["flag"] == "blunder" for a in annotations),
+        "mistakes": sum(a["flag"] == "mistake" for a in annotations),
+        "moves": annotations,
+    }
+
+
+def read_game_file(path):
+    """
+    Yield (moves, size, rules) for every game of an archive or JSON-lines file.
+    """
+    if path.endswith(".gmka"):
+        from archive import read_games
+        for game in read_games(path):
+            yield game.moves, game.size, game.rules
+        return
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            game = json.loads(line)
+            if isinstance(game, dict):
+                yield game["moves"], game.get("size", 15), game.get("rules", FREESTYLE)
+            else:
+                yield game, 15, FREESTYLE
+
+
+def analyze_games(games, workers=None, depth=DEFAULT_DEPTH, nodes=None, time_limit=DEFAULT_TIME, quiet=True):
+    """
+    Analyze games on a process pool.
+
+    Args:
+        games: Iterable of (moves, size, rules)
+        workers (int): Worker processes (default: one per CPU)
+
+    Yields:
+        dict: Annotated games, in the order they finish
+    """
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(quiet,)) as executor:
+        pending = set()
+        for index, (moves, size, rules) in enumerate(games):
+            pending.add(executor.submit(_analyze_job, index, [tuple(m[:2]) for m in moves],
+                                        size, rules, depth, nodes, time_limit))
+            if len(pending) >= workers * GAMES_PER_WORKER:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        for future in pending:
+            yield future.result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Annotate recorded games with engine analysis")
+    parser.add_argument("paths", nargs="+", help="Game archives (.gmka) or JSON-lines game files")
+    parser.add_argument("-o", "--output", help="Write annotated games here (default: stdout)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--depth", type=int, default=DEFAULT_DEPTH, help="Search depth per position")
+    parser.add_argument("--nodes", type=int, default=None, help="Node budget per position")
+    parser.add_argument("--time", type=float, default=DEFAULT_TIME, help="Hard time limit per position")
+    parser.add_argument("--verbose", action="store_true", help="Show the engine's search output")
+    args = parser.parse_args()
+
+    games = (game for path in args.paths for game in read_game_file(path))
+    out = open(args.output, "w") if args.output else sys.stdout
+    started = time.time()
+    count = positions = blunders = 0
+    with out if args.output else contextlib.nullcontext():
+        for result in analyze_games(games, args.workers, args.depth, args.nodes, args.time,
+                                    quiet=not args.verbose):
+            out.write(json.dumps(result, separators=(",", ":")) + "\n")
+            count += 1
+            positions += len(result["moves"])
+            blunders += result["blunders"]
+    elapsed = time.time() - started
+    print(f"Analyzed {count} games, {positions} moves in {elapsed:.1f}s "
+          f"({positions / elapsed if elapsed else 0:.1f} moves/s), {blunders} blunders", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
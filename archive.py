@@ -0,0 +1,226 @@
+"""
+Compact binary archive for finished games.
+
+File layout:
+    file header:  b"GMKA" + format version (1 byte)
+    game record:  size (1 byte), result (1 byte), flags (1 byte),
+                  move count (2 bytes), config length (2 bytes),
+                  config JSON, per-move timings (2 bytes each, milliseconds,
+                  only when FLAG_TIMINGS is set), moves (1 byte each)
+
+Each move is stored as the cell index row * size + col, so boards up to
+16x16 fit in one byte per move. The colour of each stone is implied by the
+move order (Black always moves first and players alternate).
+"""
+
+import json
+import struct
+from board import Board
+from rules import FREESTYLE
+
+MAGIC = b"GMKA"
+VERSION = 1
+
+RESULT_UNFINISHED = 0
+RESULT_BLACK = 1
+RESULT_WHITE = 2
+RESULT_DRAW = 3
+
+FLAG_TIMINGS = 1
+
+MAX_TIMING_MS = 0xFFFF
+
+_FILE_HEADER = struct.Struct("<4sB")
+_GAME_HEADER = struct.Struct("<BBBHH")
+
+DEFAULT_ARCHIVE_PATH = "games.gmka"
+
+
+def board_result(board):
+    """
+    Get the archive result code for a board.
+
+    Args:
+        board: Board instance
+
+    Returns:
+        int: One of the RESULT_* constants
+    """
+    if board.is_draw:
+        return RESULT_DRAW
+    if board.winner == Board.BLACK:
+        return RESULT_BLACK
+    if board.winner == Board.WHITE:
+        return RESULT_WHITE
+    return RESULT_UNFINISHED
+
+
+class ArchivedGame:
+    """A single game read back from an archive"""
+
+    __slots__ = ("size", "result", "config", "moves", "timings")
+
+    def __init__(self, size, result, config, moves, timings):
+        self.size = size
+        self.result = result
+        self.config = config
+        self.moves = moves
+        self.timings = timings
+
+    @property
+    def rules(self):
+        """Rule variant recorded in the config (freestyle when absent)."""
+        if isinstance(self.config, dict):
+            return self.config.get("rules", FREESTYLE)
+        return FREESTYLE
+
+    def to_board(self):
+        """Replay the game into a Board without per-move validation."""
+        return Board.from_moves(self.moves, self.size, rules=self.rules)
+
+
+class GameArchiveWriter:
+    """
+    Append-only writer for the game archive.
+
+    The file header is written only when the file is new or empty, so any
+    number of sessions can append to the same archive.
+    """
+
+    def __init__(self, path=DEFAULT_ARCHIVE_PATH):
+        """
+        Open the archive for appending.
+
+        Args:
+            path (str): Path of the archive file
+        """
+        self.path = path
+        self.file = open(path, "ab")
+        if self.file.tell() == 0:
+            self.file.write(_FILE_HEADER.pack(MAGIC, VERSION))
+        self.games_written = 0
+
+    def write_game(self, moves, size=15, result=RESULT_UNFINISHED, config=None, timings=None):
+        """
+        Append a single game.
+
+        Args:
+            moves: Sequence of (row, col) or (row, col, player) tuples
+            size (int): Board size
+            result (int): One of the RESULT_* constants
+            config (dict): Engine/player configuration, stored as JSON
+            timings: Optional per-move think times in seconds
+        """
+        if size * size > 256:
+            raise ValueError(f"Board size {size} does not fit one byte per move")
+        if timings is not None and len(timings) != len(moves):
+            raise ValueError("timings must have one entry per move")
+
+        config_bytes = json.dumps(config, separators=(",", ":")).encode() if config else b""
+        flags = FLAG_TIMINGS if timings is not None else 0
+
+        parts = [_GAME_HEADER.pack(size, result, flags, len(moves), len(config_bytes)), config_bytes]
+        if timings is not None:
+            ms = [min(MAX_TIMING_MS, max(0, int(t * 1000))) for t in timings]
+            parts.append(struct.pack(f"<{len(ms)}H", *ms))
+        parts.append(bytes(move[0] * size + move[1] for move in moves))
+
+        self.file.write(b"".join(parts))
+        self.games_written += 1
+
+    def write_board(self, board, config=None, timings=None):
+        """
+        Append the game played on a board.
+
+        Args:
+            board: Board instance
+            config (dict): Engine/player configuration
+            timings: Optional per-move think times in seconds
+        """
+        self.write_game(board.moves_history, board.size, board_result(board), config, timings)
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def record_game(board, config=None, timings=None, path=DEFAULT_ARCHIVE_PATH):
+    """
+    Append a finished game to the archive (used by the GUI and terminal).
+
+    Args:
+        board: Board instance
+        config (dict): Engine/player configuration
+        timings: Optional per-move think times in seconds
+        path (str): Path of the archive file
+    """
+    with GameArchiveWriter(path) as writer:
+        writer.write_board(board, config, timings)
+
+
+def read_games(path=DEFAULT_ARCHIVE_PATH, decode_config=True):
+    """
+    Stream games from an archive without loading the whole file.
+
+    Args:
+        path (str): Path of the archive file
+        decode_config (bool): Parse the JSON config of each game
+
+    Yields:
+        ArchivedGame: Games in the order they were written
+
+    Raises:
+        ValueError: The file is not an archive, or a record is corrupt or truncated
+    """
+    with open(path, "rb") as f:
+        header = f.read(_FILE_HEADER.size)
+        if not header:
+            return
+        if len(header) < _FILE_HEADER.size:
+            raise ValueError(f"Truncated archive header in {path}")
+        magic, version = _FILE_HEADER.unpack(header)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a game archive")
+        if version != VERSION:
+            raise ValueError(f"Unsupported archive version {version}")
+
+        while True:
+            header = f.read(_GAME_HEADER.size)
+            if not header:
+                return
+            if len(header) < _GAME_HEADER.size:
+                raise ValueError(f"Truncated game record in {path}")
+            size, result, flags, n_moves, config_len = _GAME_HEADER.unpack(header)
+
+            config_bytes = f.read(config_len)
+            if len(config_bytes) < config_len:
+                raise ValueError(f"Truncated game record in {path}")
+            if config_bytes and decode_config:
+                try:
+                    config = json.loads(config_bytes)
+                except ValueError:
+                    raise ValueError(f"Corrupt game record in {path}") from None
+            else:
+                config = config_bytes or None
+
+            timings = None
+            if flags & FLAG_TIMINGS:
+                raw = f.read(2 * n_moves)
+                if len(raw) < 2 * n_moves:
+                    raise ValueError(f"Truncated game record in {path}")
+                timings = [ms / 1000 for ms in struct.unpack(f"<{n_moves}H", raw)]
+
+            cells = f.read(n_moves)
+            if len(cells) < n_moves:
+                raise ValueError(f"Truncated game record in {path}")
+            moves = [divmod(cell, size) for cell in cells]
+
+            yield ArchivedGame(size, result, config, moves, timings)
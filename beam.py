@@ -0,0 +1,175 @@
+"""
+Beam search engine.
+
+Exposes the same get_best_move(state, depth, ai_color, ...) interface as
+ai.py, ai_2.py and mcts.py. Instead of searching every reply, each ply
+keeps only the BEAM_WIDTH best positions, ranked by static evaluation from
+the point of view of the side that just moved:
+
+- Every position in the beam is expanded with its CANDIDATES_PER_NODE most
+  promising moves (forced replies when there are any), preselected with
+  the local move scorer so the static evaluation only runs on those.
+- The kept positions form a tree; leaves keep their static evaluation and
+  the values are backed up by minimax, so the engine still assumes the
+  opponent picks its best reply among those kept.
+
+The cost of a ply is at most BEAM_WIDTH * CANDIDATES_PER_NODE evaluations
+whatever the depth, so it grows linearly with depth. The search stops
+between plies on the soft time limit and at once on the hard limit,
+keeping the plies completed. That makes it useful for fast AI levels and
+for very large boards.
+"""
+
+import os
+from ai import first_move, second_move
+from eval_fn import evaluation_state
+from move_order import score_move
+from threats import forced_moves
+from search_limits import SearchLimits, SearchAborted, BOOK, DEPTH
+
+BEAM_WIDTH = int(os.environ.get("GOMOKU_BEAM_WIDTH", 8))
+CANDIDATES_PER_NODE = 10
+DEFAULT_DEPTH = 6
+
+# Hard time limit (seconds) used when get_best_move is called without limits
+DEFAULT_TIME_LIMIT = 5
+
+
+def limits_from_env():
+    """
+    Search limits for the beam engine: GOMOKU_AI_* limits, with the depth
+    from GOMOKU_BEAM_DEPTH (default DEFAULT_DEPTH) and a DEFAULT_TIME_LIMIT
+    second hard time limit unless GOMOKU_AI_TIME sets one.
+    """
+    limits = SearchLimits.from_env(depth=DEFAULT_DEPTH)
+    depth = os.environ.get("GOMOKU_BEAM_DEPTH")
+    limits.depth = int(depth) if depth else DEFAULT_DEPTH
+    if limits.hard_time is None:
+        limits.hard_time = DEFAULT_TIME_LIMIT
+    return limits
+
+
+class BeamNode:
+    """A kept position of the beam search tree"""
+
+    __slots__ = ("move", "player", "parent", "children", "value", "board")
+
+    def __init__(self, move, player, parent, board, value=0):
+        self.move = move
+        self.player = player  # Player who made `move`
+        self.parent = parent
+        self.children = []
+        self.value = value  # Static evaluation from ai_color's point of view
+        self.board = board  # Dropped once the node has been expanded
+
+
+def candidate_moves(state, n=CANDIDATES_PER_NODE):
+    """The n most promising moves of the side to move, by the local move score"""
+    moves = forced_moves(state)
+    if moves is None:
+        moves = state.get_valid_moves()
+    player = state.current_player
+    scored = sorted(moves, key=lambda move: score_move(state, move[0], move[1], player), reverse=True)
+    return scored[:n]
+
+
+def backed_up_value(node, ai_color):
+    """Minimax value of a node over the kept part of the tree"""
+    if not node.children:
+        return node.value
+    values = [backed_up_value(child, ai_color) for child in node.children]
+    # The player who made the children's moves picks among them
+    if node.children[0].player == ai_color:
+        return max(values)
+    return min(values)
+
+
+def best_root_move(root, ai_color):
+    """(move, value) of the best root child by backed-up value"""
+    best_move, best_value = None, -float('inf')
+    for child in root.children:
+        value = backed_up_value(child, ai_color)
+        if best_move is None or value > best_value:
+            best_move, best_value = child.move, value
+    return best_move, best_value
+
+
+def get_best_move(state, depth, ai_color, use_alphabeta=True, limits=None, width=BEAM_WIDTH):
+    """
+    Get the best move for the AI with beam search
+
+    Args:
+        state: Current board state
+        depth: Number of plies, used when limits does not set one
+        ai_color: AI player's color
+        use_alphabeta: Ignored; accepted for interface compatibility
+        limits: SearchLimits bounding the search (default: depth and a
+            DEFAULT_TIME_LIMIT second hard time limit). Every evaluated
+            position counts as a node. limits.stop_reason tells which
+            limit ended the search.
+        width (int): Positions kept per ply
+
+    Returns:
+        tuple: (best_move, best_value)
+    """
+    if limits is None:
+        limits = SearchLimits(depth=depth, hard_time=DEFAULT_TIME_LIMIT)
+    max_depth = limits.depth if limits.depth is not None else depth
+    limits.start()
+
+    pieces = len(state.moves_history)
+    if pieces == 0:
+        limits.finish(BOOK)
+        return first_move(state)
+    if pieces == 1:
+        limits.finish(BOOK)
+        return second_move(state)
+
+    root = BeamNode(None, None, None, state.copy())
+    frontier = [root]
+    try:
+        for ply in range(1, max(1, max_depth) + 1):
+            if ply > 1 and not limits.can_deepen(ply):
+                break
+            children = []
+            for node in frontier:
+                board = node.board
+                node.board = None
+                if board.game_over:
+                    continue
+                mover = board.current_player
+                for move in candidate_moves(board):
+                    limits.count_node()
+                    child_board = board.copy()
+                    child_board.make_move(*move)
+                    child = BeamNode(move, mover, node, child_board, evaluation_state(child_board, ai_color))
+                    node.children.append(child)
+                    children.append(child)
+            if not children:
+                break
+
+            # Keep the positions best for the side that just moved
+            children.sort(key=lambda child: child.value, reverse=(children[0].player == ai_color))
+            kept = children[:width]
+            for child in children[width:]:
+                child.board = None
+            kept_ids = set(map(id, kept))
+            for node in frontier:
+                node.children = [child for child in node.children if id(child) in kept_ids]
+            frontier = kept
+
+            limits.depth_reached = ply
+            best_move, best_value = best_root_move(root, ai_color)
+            limits.completed_iteration(ply, best_move, best_value, len(root.children))
+            print(f"Beam depth {ply}: kept {len(kept)} of {len(children)} positions, "
+                  f"best {best_move} ({best_value})")
+        limits.finish(DEPTH)
+    except SearchAborted:
+        # Drop the interrupted ply, so every kept line was searched as deep
+        for node in frontier:
+            node.children = []
+
+    if not root.children:
+        moves = candidate_moves(state, 1)
+        return (moves[0] if moves else (-1, -1)), 0
+    return best_root_move(root, ai_color)
@@ -1,3 +1,62 @@
+import numpy as np
+from rules import FREESTYLE, RENJU, is_five, is_forbidden, legal_moves
+
+_MASK64 = (1 << 64) - 1
+_zobrist_keys = {}
+
+
+def zobrist_key(row, col, player):
+    """
+    64-bit Zobrist key of a stone.
+
+    Keys come from a fixed mix (splitmix64) of the coordinates rather than a
+    random table, so they are the same in every process and work for any
+    coordinate, including negative ones on unbounded boards.
+    """
+    key = _zobrist_keys.get((row, col, player))
+    if key is None:
+        # Plain ints: NumPy integers overflow in the 64-bit arithmetic
+        row, col, player = int(row), int(col), int(player)
+        z = (((row * 1000003 + col) * 4 + player) + 0x9E3779B97F4A7C15) & _MASK64
+        z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _MASK64
+        key = z ^ (z >> 31)
+        _zobrist_keys[(row, col, player)] = key
+    return key
+
+
+# The eight symmetries of a square board as maps of (row, col), where flip is
+# the sum of the first and last playable index (row -> flip - row mirrors)
+SYMMETRIES = (
+    lambda row, col, flip: (row, col),                # Identity
+    lambda row, col, flip: (col, flip - row),         # Rotate 90
+    lambda row, col, flip: (flip - row, flip - col),  # Rotate 180
+    lambda row, col, flip: (flip - col, row),         # Rotate 270
+    lambda row, col, flip: (row, flip - col),         # Mirror left-right
+    lambda row, col, flip: (flip - row, col),         # Mirror top-bottom
+    lambda row, col, flip: (col, row),                # Transpose
+    lambda row, col, flip: (flip - col, flip - row),  # Anti-transpose
+)
+_symmetric_keys = {}
+
+
+def symmetric_zobrist_key(row, col, player, flip):
+    """
+    Zobrist keys of a stone under each of the eight symmetries, packed into
+    one integer (bits 64*i to 64*i+63 hold the key under SYMMETRIES[i]).
+
+    XOR-ing this into a board's symmetric_hash keeps the hashes of all eight
+    symmetric variants of the position up to date for the price of one.
+    """
+    key = _symmetric_keys.get((row, col, player, flip))
+    if key is None:
+        key = 0
+        for i, symmetry in enumerate(SYMMETRIES):
+            key |= zobrist_key(*symmetry(row, col, flip), player) << (64 * i)
+        _symmetric_keys[(row, col, player, flip)] = key
+    return key
+
+
 class Board:
     """
     Gomoku Board class that handles game logic. 
@@ -8,15 +67,23 @@ class Board:
     BLACK = 1
     WHITE = 2
     
-    def __init__(self, size=15):
+    def __init__(self, size=15, rules=FREESTYLE):
         """
         Initialize the board with the given size.
         
         Args:
             size (int): Size of the board (default: 15x15)
+            rules (str): Rule variant from rules.py (default: freestyle)
         """
         self.size = size
-        self.board = [[self.EMPTY for _ in range(size)] for _ in range(size)]
+        self.rules = rules
+        # Row and column 0 are not playable, leaving a (size-1)x(size-1) grid
+        self.max_moves = (size - 1) ** 2
+        # The cells live in one contiguous buffer. self.board is a list of
+        # memoryview rows over it (board[row][col] reads and writes ints) and
+        # self.view a read-only ndarray over the same memory, so both always
+        # show the current position without copying.
+        self._attach_cells(bytearray(size * size))
         self.current_player = self.BLACK
         self.last_move = None
         self.game_over = False
@@ -25,10 +92,15 @@ class Board:
         self.moves_history = []
         self.winning_stones = []  # Track winning stones
         self.move_count = 0  # Counter for total moves made
+        self.hash_key = 0  # Zobrist hash of the stones, updated incrementally
+        # Playable cells are 1..size-1, so row -> size - row mirrors the board
+        self.flip = size
+        self.symmetric_hash = 0  # Packed hashes of the symmetric variants
     
     def reset(self):
         """Reset the board to initial state."""
-        self.board = [[self.EMPTY for _ in range(self.size)] for _ in range(self.size)]
+        # Cleared in place, so views of the board stay valid
+        self.cells[:] = bytes(len(self.cells))
         self.current_player = self.BLACK
         self.last_move = None
         self.game_over = False
@@ -37,7 +109,39 @@ class Board:
         self.moves_history = []
         self.winning_stones = []  # Reset winning stones
         self.move_count = 0  # Reset move counter
+        self.hash_key = 0
+        self.symmetric_hash = 0
     
+    def _attach_cells(self, cells):
+        """Use cells (a bytearray of size * size) as the board's storage."""
+        size = self.size
+        self.cells = cells
+        memory = memoryview(cells)
+        self.board = [memory[row * size:(row + 1) * size] for row in range(size)]
+        view = np.frombuffer(cells, dtype=np.int8).reshape(size, size)
+        view.flags.writeable = False
+        self.view = view
+
+    def __array__(self, dtype=None, copy=None):
+        """np.asarray(board) is the read-only view (a copy only if dtype differs)."""
+        if dtype is None or np.dtype(dtype) == self.view.dtype:
+            return self.view.copy() if copy else self.view
+        return self.view.astype(dtype)
+
+    def __buffer__(self, flags):
+        # Buffer protocol on Python 3.12+: memoryview(board) is read-only 2-D
+        return memoryview(self.cells).cast("B", (self.size, self.size)).toreadonly()
+
+    def __getstate__(self):
+        # The memoryview rows and the view are rebuilt from the cells
+        state = self.__dict__.copy()
+        del state["board"], state["view"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._attach_cells(self.cells)
+
     def make_move(self, row, col):
         """
         Make a move on the board.
@@ -55,6 +159,8 @@ class Board:
             
         # Make the move
         self.board[row][col] = self.current_player
+        self.hash_key ^= zobrist_key(row, col, self.current_player)
+        self.symmetric_hash ^= symmetric_zobrist_key(row, col, self.current_player, self.flip)
         self.last_move = (row, col)
         self.moves_history.append((row, col, self.current_player))
         self.move_count += 1  # Increment move counter
@@ -65,8 +171,8 @@ class Board:
             self.winner = self.current_player
             return True
         
-        # Check for draw - if all 196 positions (14x14 grid) are filled
-        if self.move_count >= 196:  # 14x14 playable grid
+        # Check for draw - if all playable positions (14x14 grid on 15x15) are filled
+        if self.move_count >= self.max_moves:
             self.game_over = True
             self.is_draw = True
             return True
@@ -95,7 +201,26 @@ class Board:
             return False
             
         # Check if the position is empty
-        return self.board[row][col] == self.EMPTY
+        if self.board[row][col] != self.EMPTY:
+            return False
+        
+        return self.rules != RENJU or not self.is_forbidden(row, col)
+    
+    def is_forbidden(self, row, col):
+        """Check if the move at the empty cell (row, col) is forbidden (Renju, Black only)."""
+        return self.rules == RENJU and self.current_player == self.BLACK and is_forbidden(self, row, col)
+    
+    def in_bounds(self, row, col):
+        """Check if (row, col) lies on the board."""
+        return 0 <= row < self.size and 0 <= col < self.size
+    
+    def is_playable(self, row, col):
+        """Check if (row, col) is inside the playable grid (row and column 0 are not)."""
+        return 1 <= row < self.size and 1 <= col < self.size
+    
+    def get(self, row, col):
+        """Get the stone at (row, col)."""
+        return self.board[row][col]
     
     def check_win(self, row, col):
         """
@@ -131,7 +256,7 @@ class Board:
                     count += 1
                     stones.append((r, c))
             
-            if count >= 5:
+            if count >= 5 and is_five(count, player, self.rules, self.BLACK):
                 self.winning_stones = stones
                 return True
                 
@@ -148,12 +273,12 @@ class Board:
             return []
             
         valid_moves = []
-        for row in range(1, 15):  
-            for col in range(1, 15):  
+        for row in range(1, self.size):
+            for col in range(1, self.size):
                 if self.board[row][col] == self.EMPTY:
                     valid_moves.append((row, col))
                     
-        return valid_moves
+        return legal_moves(self, valid_moves)
     
     def undo_move(self):
         """
@@ -167,6 +292,8 @@ class Board:
             
         row, col, player = self.moves_history.pop()
         self.board[row][col] = self.EMPTY
+        self.hash_key ^= zobrist_key(row, col, player)
+        self.symmetric_hash ^= symmetric_zobrist_key(row, col, player, self.flip)
         self.current_player = player
         self.game_over = False
         self.winner = None
@@ -185,9 +312,10 @@ class Board:
         Get the current board state.
         
         Returns:
-            list: 2D list representing the board
+            list: 2D list representing the board (a copy; use view to read
+                the live board without copying)
         """
-        return [row[:] for row in self.board]
+        return self.view.tolist()
     
     def get_current_player(self):
         """
@@ -199,10 +327,9 @@ class Board:
         return self.current_player 
         
     def copy(self):
-        """Return a deep copy of the board state for AI search."""
-        import copy
-        new_board = Board(self.size)
-        new_board.board = copy.deepcopy(self.board)
+        """Return a copy of the board state for AI search."""
+        new_board = Board(self.size, self.rules)
+        new_board.cells[:] = self.cells
         new_board.current_player = self.current_player
         new_board.last_move = self.last_move if self.last_move is None else tuple(self.last_move)
         new_board.game_over = self.game_over
@@ -211,10 +338,65 @@ class Board:
         new_board.moves_history = list(self.moves_history)
         new_board.winning_stones = list(self.winning_stones)
         new_board.move_count = self.move_count
+        new_board.hash_key = self.hash_key
+        new_board.symmetric_hash = self.symmetric_hash
         return new_board
 
     def next(self, move):
         """Return a new Board with the move applied (for AI search)."""
         new_board = self.copy()
         new_board.make_move(*move)
-        return new_board 
\ No newline at end of file
+        return new_board
+
+    @classmethod
+    def from_moves(cls, moves, size=15, validate=False, rules=FREESTYLE):
+        """
+        Build a board from a list of moves.
+
+        Trusted input (e.g. games read back from an archive) skips per-move
+        validation: stones are placed directly and only the final move is
+        checked for a win.
+
+        Args:
+            moves: Sequence of (row, col) or (row, col, player) tuples
+            size (int): Size of the board
+            validate (bool): Replay through make_move instead
+            rules (str): Rule variant
+
+        Returns:
+            Board: Board with all moves applied
+        """
+        board = cls(size, rules)
+        if validate:
+            for move in moves:
+                if not board.make_move(move[0], move[1]):
+                    raise ValueError(f"Illegal move {move[:2]}")
+            return board
+
+        cells = board.board
+        history = board.moves_history
+        player = cls.BLACK
+        for move in moves:
+            row, col = move[0], move[1]
+            cells[row][col] = player
+            board.hash_key ^= zobrist_key(row, col, player)
+            board.symmetric_hash ^= symmetric_zobrist_key(row, col, player, board.flip)
+            history.append((row, col, player))
+            player = cls.WHITE if player == cls.BLACK else cls.BLACK
+
+        if not history:
+            return board
+
+        row, col, last_player = history[-1]
+        board.move_count = len(history)
+        board.last_move = (row, col)
+        board.current_player = last_player
+        if board.check_win(row, col):
+            board.game_over = True
+            board.winner = last_player
+        elif board.move_count >= board.max_moves:
+            board.game_over = True
+            board.is_draw = True
+        else:
+            board.current_player = player
+        return board
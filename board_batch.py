@@ -0,0 +1,229 @@
+"""
+Many boards simulated in lockstep.
+
+BoardBatch holds N games as one int8 NumPy array and applies one move per
+game per step, so bulk simulation (random playouts, self-play data) costs a
+handful of array operations per step instead of N Python-level make_move
+calls. Individual games can be exported as regular Board objects.
+"""
+
+import numpy as np
+from board import Board
+
+# Border around the stored boards so lines through any cell can be gathered
+# without bounds checks; never equal to a player.
+_PAD = 4
+_PAD_VALUE = 3
+
+_DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1))
+
+
+def five_in_row(mask):
+    """
+    Find five in a row anywhere on a batch of boards (shifted AND).
+
+    Args:
+        mask: Boolean array of shape (N, size, size), e.g. cells == player
+
+    Returns:
+        np.ndarray: Boolean array of shape (N,)
+    """
+    size = mask.shape[1]
+    n = size - 4
+    found = np.zeros(mask.shape[0], dtype=bool)
+    for line in (
+        lambda k: mask[:, :, k:k + n],                  # Horizontal
+        lambda k: mask[:, k:k + n, :],                  # Vertical
+        lambda k: mask[:, k:k + n, k:k + n],            # Diagonal \
+        lambda k: mask[:, k:k + n, 4 - k:4 - k + n],    # Diagonal /
+    ):
+        run = line(0)
+        for k in range(1, 5):
+            run = run & line(k)
+        found |= run.reshape(run.shape[0], -1).any(axis=1)
+    return found
+
+
+class BoardBatch:
+    """
+    N Gomoku games stored as a (N, size, size) int8 array.
+    """
+
+    def __init__(self, n, size=15):
+        """
+        Create N empty games.
+
+        Args:
+            n (int): Number of games
+            size (int): Size of each board
+        """
+        self.n = n
+        self.size = size
+        padded = size + 2 * _PAD
+        self._padded = np.full((n, padded, padded), _PAD_VALUE, dtype=np.int8)
+        self._padded[:, _PAD:-_PAD, _PAD:-_PAD] = Board.EMPTY
+        # (N, size, size) view of the playing area
+        self.cells = self._padded[:, _PAD:-_PAD, _PAD:-_PAD]
+
+        self.current_player = np.full(n, Board.BLACK, dtype=np.int8)
+        self.done = np.zeros(n, dtype=bool)
+        self.winner = np.zeros(n, dtype=np.int8)  # Board.EMPTY while undecided or drawn
+        self.move_count = np.zeros(n, dtype=np.int32)
+        self.history = np.full((n, size * size), -1, dtype=np.int16)
+
+        self.region = _playable_region(size)
+        self._region_flat = self.region.reshape(-1)
+        self._max_moves = int(self.region.sum())
+        self._rows = np.arange(n)
+        self._lines = _line_offsets(size)
+
+    @classmethod
+    def from_board(cls, board, n):
+        """
+        Start N games from copies of one position.
+
+        Args:
+            board: Board instance
+            n (int): Number of copies
+
+        Returns:
+            BoardBatch
+        """
+        batch = cls(n, board.size)
+        batch.cells[:] = board.view
+        batch.current_player[:] = board.current_player
+        count = len(board.moves_history)
+        batch.move_count[:] = count
+        if count:
+            batch.history[:, :count] = [r * board.size + c for r, c, _ in board.moves_history]
+        if board.game_over:
+            batch.done[:] = True
+            batch.winner[:] = board.winner or Board.EMPTY
+        return batch
+
+    def legal_mask(self):
+        """(N, size * size) mask of legal moves; all False for finished games."""
+        flat = self.cells.reshape(self.n, -1)
+        return (flat == Board.EMPTY) & self._region_flat & ~self.done[:, None]
+
+    def random_moves(self, rng=None):
+        """
+        Pick a uniformly random legal cell for every game.
+
+        Returns:
+            np.ndarray: Flat cell index per game, -1 where there is no legal move
+        """
+        rng = rng or np.random.default_rng()
+        legal = self.legal_mask()
+        keys = rng.random(legal.shape)
+        keys[~legal] = -1
+        moves = keys.argmax(axis=1)
+        moves[~legal.any(axis=1)] = -1
+        return moves
+
+    def step(self, moves):
+        """
+        Apply one move per game.
+
+        Args:
+            moves: Flat cell index (row * size + col) per game; negative
+                entries, finished games and illegal moves are skipped
+
+        Returns:
+            np.ndarray: Boolean mask of the games whose move was applied
+        """
+        moves = np.asarray(moves, dtype=np.int64)
+        size = self.size
+        active = (moves >= 0) & ~self.done
+        safe = np.where(active, moves, 0)
+        flat = self.cells.reshape(self.n, -1)
+        idx = self._rows
+        active &= (flat[idx, safe] == Board.EMPTY) & self._region_flat[safe]
+        if not active.any():
+            return active
+
+        games = idx[active]
+        cells = safe[active]
+        players = self.current_player[active]
+        rows, cols = np.divmod(cells, size)
+        self._padded[games, rows + _PAD, cols + _PAD] = players
+        self.history[games, self.move_count[games]] = cells
+        self.move_count[games] += 1
+
+        won = self._wins_at(games, cells, players)
+        self.done[games[won]] = True
+        self.winner[games[won]] = players[won]
+
+        drawn = ~won & (self.move_count[games] >= self._max_moves)
+        self.done[games[drawn]] = True
+
+        continuing = games[~won & ~drawn]
+        self.current_player[continuing] = np.where(
+            self.current_player[continuing] == Board.BLACK, Board.WHITE, Board.BLACK)
+        return active
+
+    def _wins_at(self, games, cells, players):
+        """Check five in a row through each just-placed stone."""
+        # (G, 4, 9) window of cells along the four lines through the move
+        padded = self._padded.reshape(self.n, -1)
+        lines = padded[games[:, None, None], self._lines[cells]]
+        same = lines == players[:, None, None]
+        won = np.zeros(len(games), dtype=bool)
+        for start in range(5):
+            won |= same[:, :, start:start + 5].all(axis=2).any(axis=1)
+        return won
+
+    def play_random(self, max_plies=None, rng=None):
+        """
+        Play random moves until every game is finished.
+
+        Args:
+            max_plies (int): Stop after this many steps even if games remain
+            rng: Optional numpy Generator
+        """
+        rng = rng or np.random.default_rng()
+        plies = 0
+        while not self.done.all() and (max_plies is None or plies < max_plies):
+            moves = self.random_moves(rng)
+            stuck = (moves < 0) & ~self.done
+            self.done[stuck] = True  # No legal move left: draw
+            if not self.step(moves).any():
+                break
+            plies += 1
+
+    def to_board(self, i):
+        """
+        Export game i as a regular Board.
+
+        Returns:
+            Board
+        """
+        cells = self.history[i, :self.move_count[i]]
+        return Board.from_moves([divmod(int(cell), self.size) for cell in cells], self.size)
+
+    def __len__(self):
+        return self.n
+
+
+def _playable_region(size):
+    """Boolean mask of the cells Board.get_valid_moves allows on an empty board."""
+    region = np.zeros((size, size), dtype=bool)
+    for row, col in Board(size).get_valid_moves():
+        region[row, col] = True
+    return region
+
+
+def _line_offsets(size):
+    """
+    For every cell, flat indices into the padded board of the 9 cells on each
+    of the four lines through it, shape (size * size, 4, 9).
+    """
+    padded = size + 2 * _PAD
+    rows, cols = np.divmod(np.arange(size * size), size)
+    steps = np.arange(-4, 5)
+    offsets = np.empty((size * size, 4, 9), dtype=np.int64)
+    for d, (dr, dc) in enumerate(_DIRECTIONS):
+        r = rows[:, None] + _PAD + dr * steps
+        c = cols[:, None] + _PAD + dc * steps
+        offsets[:, d, :] = r * padded + c
+    return offsets
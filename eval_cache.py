@@ -0,0 +1,89 @@
+"""
+Bounded cache of static evaluations.
+
+The search evaluates the same positions many times: every child for move
+ordering and then again as a leaf, and again on the next iteration. EvalCache
+wraps eval_fn.evaluation_state with a fixed-capacity LRU table keyed by the
+board's Zobrist hash, so repeated evaluations cost a dict lookup while memory
+stays capped.
+
+With symmetric=True the cache is keyed by the symmetry-canonical hash, so
+rotated and mirrored positions share one entry. evaluation_state is only
+approximately symmetric (evaluate_line reads gaps in one direction, and on a
+dense Board the unplayable row and column 0 count as empty cells), so this
+trades exact scores for hit rate and is off by default.
+"""
+
+from collections import OrderedDict
+import eval_fn
+from symmetry import canonical_key
+
+DEFAULT_CAPACITY = 100000
+
+
+class EvalCache:
+    """
+    LRU cache around evaluation_state with hit/miss/eviction counters.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, symmetric=False):
+        """
+        Args:
+            capacity (int): Maximum number of cached evaluations
+            symmetric (bool): Share entries between symmetric positions
+        """
+        self.capacity = capacity
+        self.symmetric = symmetric
+        self.entries = OrderedDict()
+        self.weights_version = eval_fn.weights_version
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def evaluate(self, state, current_color):
+        """
+        Same as eval_fn.evaluation_state, answered from the cache when possible.
+
+        Args:
+            state: Board or SparseBoard
+            current_color: Color the evaluation is for
+        """
+        if self.weights_version != eval_fn.weights_version:
+            # Scores computed with the old weights are stale
+            self.entries.clear()
+            self.weights_version = eval_fn.weights_version
+
+        position = canonical_key(state)[0] if self.symmetric else state.hash_key
+        key = (position, state.size, current_color)
+        entries = self.entries
+        value = entries.get(key)
+        if value is not None:
+            entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        value = eval_fn.evaluation_state(state, current_color)
+        entries[key] = value
+        if len(entries) > self.capacity:
+            entries.popitem(last=False)
+            self.evictions += 1
+        return value
+
+    def clear(self):
+        """Drop all entries (the counters are kept)."""
+        self.entries.clear()
+
+    def reset_stats(self):
+        self.hits = self.misses = self.evictions = 0
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __str__(self):
+        return (f"{len(self.entries)}/{self.capacity} entries, hits {self.hits}, misses {self.misses} "
+                f"({self.hit_rate():.0%} hit rate), evictions {self.evictions}")
@@ -1,8 +1,34 @@
+import json
+import os
 import numpy as np
 from board import Board
 
+FIVE_SCORE = 100000
+FIVE_GAP_SCORE = 8000
+
+# Pattern weights indexed by run length - 1. They can be refitted with
+# tune.py and loaded with load_weights (or the GOMOKU_EVAL_WEIGHTS variable).
+consec_score = (2, 5, 1000, 10000)
+# 3: 0.05
+block_count_score = (0.5, 0.6, 0.01, 0.25)
+not_current_score = (1, 1, 0.2, 0.15)
+empty_space_score = (1, 1.2, 0.9, 0.4)
+
+WEIGHT_NAMES = ("consec_score", "block_count_score", "not_current_score", "empty_space_score")
+
+# Incremented whenever the weights change, so cached evaluations can be dropped
+weights_version = 0
+
+# Runs of more empty cells than this behave exactly like this many in
+# evaluate_line, so sparse lines compress longer gaps down to it
+_MAX_GAP = 4
+
+
 def evaluation_state(state, current_color):
-    values = np.array(state.board)
+    if hasattr(state, "stones"):
+        return evaluation_sparse(state, current_color)
+    # Boards expose a read-only view of their cells; anything else is converted
+    values = state.view if hasattr(state, "view") else np.array(state.board)
     return evaluate_color(values, Board.BLACK, current_color) + \
         evaluate_color(values, Board.WHITE, current_color)
 
@@ -29,6 +55,65 @@ def evaluate_color(values, color, current_color):
     return evaluation * (1 if color == current_color else -1)
 
 
+def evaluation_sparse(state, current_color):
+    """
+    Evaluate a SparseBoard by scanning only the lines that contain stones.
+
+    Gives the same score as evaluation_state on the equivalent dense board,
+    at a cost proportional to the number of stones.
+    """
+    evaluation = 0
+    for line in _sparse_lines(state):
+        for color in (Board.BLACK, Board.WHITE):
+            if color in line:
+                current = color == current_color
+                value = evaluate_line(line, color, current)
+                evaluation += value if current else -value
+    return evaluation
+
+
+def _sparse_lines(state):
+    """Compressed cell values of every line through at least one stone."""
+    size = state.size
+    groups = ({}, {}, {}, {})
+    for (row, col), player in state.stones.items():
+        groups[0].setdefault(row, []).append((col, player))        # Horizontal
+        groups[1].setdefault(col, []).append((row, player))        # Vertical
+        groups[2].setdefault(col - row, []).append((row, player))  # Diagonal \
+        groups[3].setdefault(row + col, []).append((row, player))  # Diagonal /
+
+    lines = []
+    for direction, group in enumerate(groups):
+        for key, stones in group.items():
+            if size is None:
+                lo = hi = None
+            elif direction < 2:
+                lo, hi = 0, size - 1
+            elif direction == 2:
+                lo, hi = max(0, -key), min(size - 1, size - 1 - key)
+            else:
+                lo, hi = max(0, key - size + 1), min(size - 1, key)
+            # evaluate_color skips diagonals too short to hold five
+            if lo is not None and hi - lo + 1 < 5:
+                continue
+            lines.append(_compress_line(sorted(stones), lo, hi))
+    return lines
+
+
+def _compress_line(stones, lo, hi):
+    first = stones[0][0]
+    gap = _MAX_GAP if lo is None else min(first - lo, _MAX_GAP)
+    line = [Board.EMPTY] * gap
+    prev = first - 1
+    for t, player in stones:
+        line.extend([Board.EMPTY] * min(t - prev - 1, _MAX_GAP))
+        line.append(player)
+        prev = t
+    gap = _MAX_GAP if hi is None else min(hi - prev, _MAX_GAP)
+    line.extend([Board.EMPTY] * gap)
+    return line
+
+
 def evaluate_line(line, color, current):
     evaluation = 0
     size = len(line)
@@ -70,14 +155,8 @@ def calc(consec, block_count, is_current, has_empty_space=False):
 
     if consec >= 5:
         if has_empty_space:
-            return 8000
-        return 100000
-
-    consec_score = (2, 5, 1000, 10000)
-    # 3: 0.05
-    block_count_score = (0.5, 0.6, 0.01, 0.25)
-    not_current_score = (1, 1, 0.2, 0.15)
-    empty_space_score = (1, 1.2, 0.9, 0.4)
+            return FIVE_GAP_SCORE
+        return FIVE_SCORE
 
     consec_idx = consec - 1
     value = consec_score[consec_idx]
@@ -88,3 +167,42 @@ def calc(consec, block_count, is_current, has_empty_space=False):
     if has_empty_space:
         value *= empty_space_score[consec_idx]
     return int(value)
+
+
+def get_weights():
+    """Return the current pattern weights as a dict of lists."""
+    return {name: list(globals()[name]) for name in WEIGHT_NAMES}
+
+
+def set_weights(weights):
+    """
+    Replace the pattern weights used by calc.
+
+    Args:
+        weights (dict): Mapping of weight name to a 4-tuple, for any subset
+            of WEIGHT_NAMES
+    """
+    global weights_version
+    weights_version += 1
+    for name, values in weights.items():
+        if name not in WEIGHT_NAMES:
+            raise ValueError(f"Unknown weight '{name}'")
+        if len(values) != 4:
+            raise ValueError(f"Weight '{name}' needs 4 values")
+        globals()[name] = tuple(float(v) for v in values)
+
+
+def load_weights(path):
+    """Load pattern weights written by tune.py."""
+    with open(path) as f:
+        set_weights(json.load(f))
+
+
+def save_weights(path, weights=None):
+    """Write pattern weights (the current ones by default) as JSON."""
+    with open(path, "w") as f:
+        json.dump(weights or get_weights(), f, indent=2)
+
+
+if os.environ.get("GOMOKU_EVAL_WEIGHTS"):
+    load_weights(os.environ["GOMOKU_EVAL_WEIGHTS"])
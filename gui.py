@@ -4,13 +4,38 @@ import math
 from PIL import Image, ImageTk
 from customtkinter import CTkImage
 import os
+import queue
 import threading
 import time
+import ai_2
+import beam
 from ai import get_best_move
+from archive import record_game
+from search_limits import SearchLimits
+from time_manager import GameClock, TimeManager
+from telemetry import record_move
+import rules
 
 # Keep global references to prevent garbage collection
 _images = {}
 
+# Analysis mode: how often the panel and overlays are refreshed while the AI
+# is thinking, and how many candidate moves are shown
+ANALYSIS_REFRESH_MS = 250
+ANALYSIS_LINES = 3
+ANALYSIS_COLORS = ("#39ff14", "#00eaff", "#ff00cc")
+
+# Spectator mode (AI vs AI): a producer thread plays the engine moves into a
+# queue and the board applies whatever has arrived at most SPECTATOR_FPS
+# times a second. The speed is the pause between engine moves in seconds.
+SPECTATOR_FPS = 30
+SPECTATOR_SPEEDS = {"1x": 1.0, "2x": 0.5, "5x": 0.2, "Max": 0.0}
+SPECTATOR_DEFAULT_SPEED = "1x"
+
+# Game modes where the AI plays White against the human, and AI vs AI modes
+AI_VS_HUMAN_MODES = ("ai_vs_human", "ai_vs_human_minmax", "ai_vs_human_beam")
+AI_VS_AI_MODES = ("ai_vs_ai", "ai_vs_ai_minmax", "ai_vs_ai_beam")
+
 def create_game_ui(root, return_to_menu_callback, game_mode="human_vs_human"):
     """
     Create the game UI
@@ -51,18 +76,53 @@ class GomokuGUI:
         # AI settings
         self.ai_thinking = False
         self.ai_thread = None
-        self.ai_depth = 2 # AI search depth
+        # AI search limits, configurable through GOMOKU_AI_* environment variables
+        self.ai_limits = SearchLimits.from_env(depth=2)
+        self.ai_depth = self.ai_limits.depth # AI search depth
+        # Optional game clock from GOMOKU_CLOCK ("300+2"); the AI then budgets its time from it
+        self.clock = GameClock.from_env()
+        self.time_manager = TimeManager.from_env(self.clock, self.ai_limits.nodes) if self.clock else None
+        # Beam search engine limits (GOMOKU_BEAM_DEPTH, default 6 plies, 5 seconds)
+        self.beam_limits = beam.limits_from_env()
+        
+        # Analysis mode: the AI thread streams a SearchInfo per completed depth
+        # into the queue and the GUI renders the latest one at a fixed rate
+        self.analysis_enabled = False
+        self.analysis_queue = queue.Queue()
+        self.analysis_info = None
+        self.analysis_polling = False
+        
+        # Spectator mode for AI vs AI games
+        self.spectating = game_mode in AI_VS_AI_MODES
+        self.spectator_queue = queue.Queue()
+        self.spectator_stop = None
+        self.spectator_generation = 0
+        self.spectator_delay = SPECTATOR_SPEEDS[SPECTATOR_DEFAULT_SPEED]
         
         # Determine which AI algorithm to use
         self.use_alphabeta = True
         self.ai_vs_ai_mixed = False
+        self.beam_colors = ()  # Colors played by the beam search engine
         
         if game_mode == "ai_vs_human_minmax":
             self.use_alphabeta = False
         elif game_mode == "ai_vs_ai_minmax":
             self.ai_vs_ai_mixed = True  # First player uses MinMax, second uses Alpha-Beta
+        elif game_mode == "ai_vs_human_beam":
+            self.beam_colors = (Board.WHITE,)
+        elif game_mode == "ai_vs_ai_beam":
+            self.beam_colors = (Board.BLACK,)  # Beam search vs Alpha-Beta
             
-        self.board = Board(15)  # Only 15x15 playable
+        self.board = Board(15, rules.from_env())  # Only 15x15 playable; rules from GOMOKU_RULES
+        
+        # Per-move think times and the engines that moved, saved with the game to the archive
+        self.move_times = []
+        self.engines_used = set()
+        self.last_move_time = time.time()
+        if self.clock:
+            self.clock.start(self.board.current_player)
+        self.lost_on_time = None
+        
         self.cell_size = cell_size
         self.canvas_size = cell_size * board_size + 110
         self.margin = 30
@@ -130,16 +190,20 @@ class GomokuGUI:
         self.draw_board()
         
         # Start AI vs AI game if that mode is selected
-        if self.game_mode == "ai_vs_ai" or self.game_mode == "ai_vs_ai_minmax":
+        if self.game_mode in AI_VS_AI_MODES:
             if self.game_mode == "ai_vs_ai_minmax":
                 self.status_label.configure(text="MiniMax vs Alpha-Beta Game Starting...")
+            elif self.game_mode == "ai_vs_ai_beam":
+                self.status_label.configure(text="Beam Search vs Alpha-Beta Game Starting...")
             else:
                 self.status_label.configure(text="AI vs AI Game Starting...")
             self.root.after(1000, self.make_ai_move)
         # If AI plays second (as Player 2), wait for human's first move
-        elif self.game_mode == "ai_vs_human" or self.game_mode == "ai_vs_human_minmax":
+        elif self.game_mode in AI_VS_HUMAN_MODES:
             if self.game_mode == "ai_vs_human_minmax":
                 self.status_label.configure(text="Your Turn vs MiniMax (Black)")
+            elif self.game_mode == "ai_vs_human_beam":
+                self.status_label.configure(text="Your Turn vs Beam Search (Black)")
             else:
                 self.status_label.configure(text="Your Turn vs Alpha-Beta (Black)")
         
@@ -241,6 +305,113 @@ class GomokuGUI:
         )
         self.menu_button.pack(fill="x", pady=5)
         
+        # Analysis panel
+        self.analysis_frame = ctk.CTkFrame(self.control_frame, fg_color="#181c2b")
+        self.analysis_frame.pack(fill="x", padx=10, pady=10)
+        
+        self.analysis_switch = ctk.CTkSwitch(
+            self.analysis_frame,
+            text="Live Analysis",
+            command=self.toggle_analysis,
+            font=("Arial", 14, "bold"),
+            text_color="#fff",
+            progress_color="#00eaff"
+        )
+        self.analysis_switch.pack(anchor="w", pady=5)
+        
+        self.analysis_label = ctk.CTkLabel(
+            self.analysis_frame,
+            text="",
+            font=("Courier", 13),
+            text_color="#00eaff",
+            justify="left",
+            anchor="w"
+        )
+        self.analysis_label.pack(fill="x", pady=(0, 10))
+        
+        # Spectator speed for AI vs AI games
+        if self.spectating:
+            self.speed_frame = ctk.CTkFrame(self.control_frame, fg_color="#181c2b")
+            self.speed_frame.pack(fill="x", padx=10, pady=10)
+            
+            self.speed_label = ctk.CTkLabel(
+                self.speed_frame,
+                text="Speed",
+                font=("Arial", 14, "bold"),
+                text_color="#fff"
+            )
+            self.speed_label.pack(anchor="w")
+            
+            self.speed_selector = ctk.CTkSegmentedButton(
+                self.speed_frame,
+                values=list(SPECTATOR_SPEEDS),
+                command=self.set_spectator_speed,
+                font=("Arial", 13, "bold"),
+                selected_color="#00eaff",
+                selected_hover_color="#00b8d4",
+                text_color="black"
+            )
+            self.speed_selector.set(SPECTATOR_DEFAULT_SPEED)
+            self.speed_selector.pack(fill="x", pady=5)
+        
+    def toggle_analysis(self):
+        """Turn live analysis on or off"""
+        self.analysis_enabled = bool(self.analysis_switch.get())
+        if not self.analysis_enabled:
+            self.analysis_info = None
+            self.analysis_label.configure(text="")
+            self.draw_board()
+        else:
+            self.analysis_label.configure(text="Analysis shows on the AI's turn")
+    
+    def poll_analysis(self):
+        """Render the newest search info, at most once per ANALYSIS_REFRESH_MS"""
+        latest = None
+        try:
+            while True:
+                latest = self.analysis_queue.get_nowait()
+        except queue.Empty:
+            pass
+        
+        if latest is not None and self.analysis_enabled:
+            self.analysis_info = latest
+            self.render_analysis()
+        
+        if self.ai_thinking:
+            self.root.after(ANALYSIS_REFRESH_MS, self.poll_analysis)
+        else:
+            self.analysis_polling = False
+    
+    def render_analysis(self):
+        """Show the current analysis in the panel and on the board"""
+        info = self.analysis_info
+        lines = [f"Depth {info.depth}  {info.nodes} nodes  {info.nps:.0f} n/s"]
+        for rank, (move, value, pv) in enumerate(info.lines, 1):
+            line = " ".join(f"{r},{c}" for r, c in pv)
+            lines.append(f"{rank}. {value:>8.0f}  {line}")
+        self.analysis_label.configure(text="\n".join(lines))
+        self.draw_analysis_overlay()
+    
+    def draw_analysis_overlay(self):
+        """Mark the candidate moves of the current analysis on the board"""
+        self.canvas.delete("analysis")
+        if not self.analysis_enabled or not self.analysis_info or not self.ai_thinking:
+            return
+        radius = self.cell_size // 2 - 6
+        for (move, value, _), color in zip(self.analysis_info.lines, ANALYSIS_COLORS):
+            row, col = move
+            x = self.margin + col * self.cell_size
+            y = self.margin + row * self.cell_size
+            self.canvas.create_oval(
+                x - radius, y - radius,
+                x + radius, y + radius,
+                outline=color, width=3, tags="analysis"
+            )
+            self.canvas.create_text(
+                x, y, text=f"{value:.0f}", fill=color,
+                font=("Arial", 9, "bold"), tags="analysis"
+            )
+        
     def return_to_menu(self):
         """Return to the main menu"""
         # Cancel any ongoing AI operations
@@ -250,6 +421,7 @@ class GomokuGUI:
     
     def stop_ai_thread(self):
         """Stop any running AI thread"""
+        self.stop_spectator()
         if self.ai_thread and self.ai_thread.is_alive():
             self.ai_thinking = False
             self.ai_thread.join(0.1)  # Try to join but don't block
@@ -321,6 +493,7 @@ class GomokuGUI:
                     outline="#ff00cc",
                     width=2
                 )
+        self.draw_analysis_overlay()
         self.update_status()
         self.update_turn_indicator()
     
@@ -342,13 +515,17 @@ class GomokuGUI:
             elif self.board.winner == Board.BLACK:
                 if self.game_mode == "ai_vs_ai_minmax":
                     self.status_label.configure(text="MiniMax AI Wins!")
+                elif self.game_mode == "ai_vs_ai_beam":
+                    self.status_label.configure(text="Beam AI Wins!")
                 else:
                     self.status_label.configure(text="Player 1 Wins!")
             else:
-                if self.game_mode == "ai_vs_ai_minmax":
+                if self.game_mode in ("ai_vs_ai_minmax", "ai_vs_ai_beam"):
                     self.status_label.configure(text="Alpha-Beta AI Wins!")
                 else:
                     self.status_label.configure(text="Player 2 Wins!")
+            if self.lost_on_time:
+                self.status_label.configure(text=self.status_label.cget("text")[:-1] + " on time!")
         else:
             # Handle different game modes
             if self.game_mode == "human_vs_human":
@@ -356,17 +533,19 @@ class GomokuGUI:
                     self.status_label.configure(text="Player 1's Turn")
                 else:
                     self.status_label.configure(text="Player 2's Turn")
-            elif self.game_mode == "ai_vs_human" or self.game_mode == "ai_vs_human_minmax":
+            elif self.game_mode in AI_VS_HUMAN_MODES:
                 if self.board.current_player == Board.WHITE:
                     # AI is always player 2 (White)
-                    ai_type = "MiniMax" if self.game_mode == "ai_vs_human_minmax" else "Alpha-Beta"
+                    ai_type = {"ai_vs_human_minmax": "MiniMax", "ai_vs_human_beam": "Beam"}.get(
+                        self.game_mode, "Alpha-Beta")
                     self.status_label.configure(text=f"{ai_type} AI is thinking...")
                 else:
                     self.status_label.configure(text="Your Turn")
-            elif self.game_mode == "ai_vs_ai" or self.game_mode == "ai_vs_ai_minmax":
-                if self.game_mode == "ai_vs_ai_minmax":
+            elif self.game_mode in AI_VS_AI_MODES:
+                if self.game_mode in ("ai_vs_ai_minmax", "ai_vs_ai_beam"):
                     if self.board.current_player == Board.BLACK:
-                        self.status_label.configure(text="MiniMax AI is thinking...")
+                        black_type = "MiniMax" if self.game_mode == "ai_vs_ai_minmax" else "Beam"
+                        self.status_label.configure(text=f"{black_type} AI is thinking...")
                     else:
                         self.status_label.configure(text="Alpha-Beta AI is thinking...")
                 else:
@@ -381,9 +560,8 @@ class GomokuGUI:
             return
             
         # If it's AI's turn in the current game mode, ignore clicks
-        if (self.game_mode == "ai_vs_human" and self.board.current_player == Board.WHITE) or \
-           (self.game_mode == "ai_vs_human_minmax" and self.board.current_player == Board.WHITE) or \
-           self.game_mode == "ai_vs_ai" or self.game_mode == "ai_vs_ai_minmax":
+        if (self.game_mode in AI_VS_HUMAN_MODES and self.board.current_player == Board.WHITE) or \
+           self.game_mode in AI_VS_AI_MODES:
             return
             
         col = round((event.x - self.margin) / self.cell_size)
@@ -391,14 +569,16 @@ class GomokuGUI:
         # Only allow play in 1-14 (inner 15x15)
         if 1 <= row < 15 and 1 <= col < 15:
             if self.board.make_move(row, col):
+                self.record_move_time()
                 self.draw_board()
                 
                 # If it's now AI's turn, make the AI move
                 if not self.board.game_over:
-                    if (self.game_mode == "ai_vs_human" and self.board.current_player == Board.WHITE) or \
-                       (self.game_mode == "ai_vs_human_minmax" and self.board.current_player == Board.WHITE) or \
-                       self.game_mode == "ai_vs_ai" or self.game_mode == "ai_vs_ai_minmax":
+                    if (self.game_mode in AI_VS_HUMAN_MODES and self.board.current_player == Board.WHITE) or \
+                       self.game_mode in AI_VS_AI_MODES:
                         self.root.after(500, self.make_ai_move)
+            elif self.board.get(row, col) == Board.EMPTY and self.board.is_forbidden(row, col):
+                self.status_label.configure(text="Forbidden move for Black (Renju)")
     
     def make_ai_move(self):
         """Make an AI move"""
@@ -408,59 +588,233 @@ class GomokuGUI:
         self.ai_thinking = True
         self.update_status()  # Show thinking status
         
+        if self.analysis_enabled:
+            self.analysis_info = None
+            if not self.analysis_polling:
+                self.analysis_polling = True
+                self.root.after(ANALYSIS_REFRESH_MS, self.poll_analysis)
+        
+        # AI vs AI games are played by the spectator producer
+        if self.spectating:
+            self.start_spectator()
+            return
+        
         # Use a thread to avoid blocking the GUI
         self.ai_thread = threading.Thread(target=self._ai_move_thread)
         self.ai_thread.daemon = True
         self.ai_thread.start()
     
+    def search_move(self, board, ai_color):
+        """
+        Search the AI move for ai_color (called from AI threads)
+        
+        Args:
+            board: The board to search, not touched by the GUI meanwhile
+            ai_color: The color to move
+            
+        Returns:
+            tuple: The move (row, col) and the name of the engine that chose it
+        """
+        # Determine which algorithm to use
+        use_alphabeta = self.use_alphabeta
+        
+        # For AI vs AI with mixed algorithms (MiniMax vs Alpha-Beta)
+        if self.ai_vs_ai_mixed:
+            if ai_color == Board.BLACK:
+                use_alphabeta = False  # Black player uses MiniMax
+            else:
+                use_alphabeta = True   # White player uses Alpha-Beta
+        
+        # Under a game clock the time manager sets this move's limits; every
+        # search gets its own, as searches of a stopped producer may overlap
+        limits = self.time_manager.limits_for(board, ai_color) if self.time_manager else self.ai_limits.copy()
+        
+        # Get best move from AI algorithm; analysis mode and clocked games use
+        # the iterative deepening engine, which reports every depth and
+        # stops when the time manager says so
+        if ai_color in self.beam_colors:
+            engine = "beam"
+            if self.time_manager:
+                limits.depth = self.beam_limits.depth
+            else:
+                limits = self.beam_limits.copy()
+            move, _ = beam.get_best_move(board, limits.depth, ai_color, limits=limits)
+        elif self.analysis_enabled:
+            engine = "ai_2"
+            move, _ = ai_2.get_best_move(board, self.ai_depth, ai_color, use_alphabeta, limits,
+                                         on_depth=self.analysis_queue.put, multi_pv=ANALYSIS_LINES)
+        elif self.time_manager:
+            engine = "ai_2"
+            move, _ = ai_2.get_best_move(board, limits.depth, ai_color, use_alphabeta, limits)
+        else:
+            engine = "ai"
+            move, _ = get_best_move(board, self.ai_depth, ai_color, use_alphabeta, limits)
+        record_move(engine, limits, board)
+        return move, engine
+    
     def _ai_move_thread(self):
         """Thread function to calculate and apply AI move"""
         try:
             # Choose AI color based on current player
-            ai_color = self.board.current_player
-            
-            # Determine which algorithm to use
-            use_alphabeta = self.use_alphabeta
-            
-            # For AI vs AI with mixed algorithms (MiniMax vs Alpha-Beta)
-            if self.ai_vs_ai_mixed:
-                if ai_color == Board.BLACK:
-                    use_alphabeta = False  # Black player uses MiniMax
-                else:
-                    use_alphabeta = True   # White player uses Alpha-Beta
-            
-            # Get best move from AI algorithm
-            move, _ = get_best_move(self.board, self.ai_depth, ai_color, use_alphabeta)
+            move, engine = self.search_move(self.board, self.board.current_player)
             
             # Schedule the move to be made on the main GUI thread
-            self.root.after(0, lambda: self._apply_ai_move(move))
+            self.root.after(0, lambda: self._apply_ai_move(move, engine))
         except Exception as e:
             print(f"AI error: {e}")
             self.ai_thinking = False
     
-    def _apply_ai_move(self, move):
+    def _apply_ai_move(self, move, engine):
         """Apply the AI move to the board (called from main thread)"""
         if not self.board.game_over and move:
             row, col = move
             if self.board.make_move(row, col):
+                self.engines_used.add(engine)
+                self.record_move_time()
                 self.draw_board()
-                
-                # If it's AI vs AI and the game isn't over, schedule the next AI move
-                if (self.game_mode == "ai_vs_ai" or self.game_mode == "ai_vs_ai_minmax") and not self.board.game_over:
-                    self.root.after(1000, self.make_ai_move)
                     
         self.ai_thinking = False
     
+    def start_spectator(self):
+        """Start the producer thread playing the AI vs AI game from the current position"""
+        self.stop_spectator()
+        self.ai_thinking = True
+        self.spectator_generation += 1
+        self.spectator_stop = threading.Event()
+        
+        # The producer searches and plays on its own copy of the board
+        self.ai_thread = threading.Thread(
+            target=self._spectator_thread,
+            args=(self.board.copy(), self.spectator_generation, self.spectator_stop)
+        )
+        self.ai_thread.daemon = True
+        self.ai_thread.start()
+        self.root.after(1000 // SPECTATOR_FPS, self.poll_spectator, self.spectator_generation)
+    
+    def stop_spectator(self):
+        """Stop the spectator producer; moves it still sends are discarded"""
+        if self.spectator_stop:
+            self.spectator_stop.set()
+            self.spectator_stop = None
+            self.ai_thinking = False
+    
+    def set_spectator_speed(self, speed):
+        """Set the pause between engine moves from the speed selector"""
+        self.spectator_delay = SPECTATOR_SPEEDS[speed]
+    
+    def _spectator_thread(self, board, generation, stop):
+        """Producer: play engine moves into the spectator queue until the game ends"""
+        try:
+            while not board.game_over and not stop.is_set():
+                color = board.current_player
+                started = time.time()
+                # The producer runs the clock, as the GUI applies moves later
+                if self.clock:
+                    self.clock.start(color)
+                move, engine = self.search_move(board, color)
+                if self.clock:
+                    self.clock.stop()
+                if stop.is_set() or not move or not board.make_move(*move):
+                    break
+                self.spectator_queue.put((generation, move, time.time() - started, engine))
+                if self.clock and self.clock.flagged(color):
+                    break
+                if self.spectator_delay:
+                    stop.wait(self.spectator_delay)
+        except Exception as e:
+            print(f"AI error: {e}")
+        # End of this producer's moves
+        self.spectator_queue.put((generation, None, 0, None))
+    
+    def poll_spectator(self, generation):
+        """Apply the engine moves that arrived since the last frame and draw only the new stones"""
+        if generation != self.spectator_generation or self.spectator_stop is None:
+            return  # Stopped, or a newer producer has its own polling
+        moves = []
+        finished = False
+        try:
+            while True:
+                produced_by, move, think_time, engine = self.spectator_queue.get_nowait()
+                if produced_by != generation:
+                    continue  # From a producer stopped by undo, reset or the menu
+                if move is None:
+                    finished = True
+                else:
+                    moves.append((move, think_time, engine))
+        except queue.Empty:
+            pass
+        
+        for (row, col), think_time, engine in moves:
+            if self.board.game_over or not self.board.make_move(row, col):
+                break
+            self.engines_used.add(engine)
+            self.record_move_time(think_time)
+            self.draw_stone(row, col, self.board.moves_history[-1][2])
+        
+        if finished or self.board.game_over:
+            self.stop_spectator()
+            self.draw_board()
+            return
+        if moves:
+            self.update_status()
+            self.update_turn_indicator()
+        self.root.after(1000 // SPECTATOR_FPS, self.poll_spectator, generation)
+    
+    def record_move_time(self, think_time=None):
+        """
+        Record the think time of the move just made and archive finished games
+        
+        Args:
+            think_time: Measured by the spectator producer; by default the
+                time since the previous move
+        """
+        now = time.time()
+        self.move_times.append(now - self.last_move_time if think_time is None else think_time)
+        self.last_move_time = now
+        
+        if self.clock:
+            # The player who just moved is the one whose clock is running;
+            # in spectator mode the producer has already stopped it
+            mover = self.board.moves_history[-1][2]
+            if think_time is None:
+                self.clock.stop()
+            if self.clock.flagged(mover) and not self.board.game_over:
+                self.board.game_over = True
+                self.board.winner = Board.WHITE if mover == Board.BLACK else Board.BLACK
+                self.lost_on_time = mover
+            elif not self.board.game_over and think_time is None:
+                self.clock.start(self.board.current_player)
+        
+        if self.board.game_over:
+            config = {"mode": self.game_mode, "depth": self.ai_depth, "rules": self.board.rules}
+            if self.engines_used:
+                config["engine"] = ",".join(sorted(self.engines_used))
+            if self.beam_colors:
+                config["beam_depth"] = self.beam_limits.depth
+            if self.clock:
+                config["clock"] = f"{self.clock.total:g}+{self.clock.increment:g}"
+            try:
+                record_game(self.board, config, self.move_times)
+            except OSError as e:
+                print(f"Could not archive game: {e}")
+    
     def reset_game(self):
         """Reset the game"""
         self.stop_ai_thread()  # Stop any running AI threads
         self.board.reset()
+        self.move_times = []
+        self.engines_used = set()
+        self.last_move_time = time.time()
+        if self.clock:
+            self.clock.reset()
+            self.clock.start(self.board.current_player)
+        self.lost_on_time = None
         self.draw_board()
         self.update_turn_indicator()
         
         # If AI is first player, start its move
         if not self.board.game_over:
-            if self.game_mode == "ai_vs_ai" or self.game_mode == "ai_vs_ai_minmax":
+            if self.game_mode in AI_VS_AI_MODES:
                 self.root.after(1000, self.make_ai_move)
             # Human now plays first in ai_vs_human mode, so no need to start AI move
     
@@ -469,18 +823,28 @@ class GomokuGUI:
         self.stop_ai_thread()  # Stop any running AI threads
         
         # For AI vs AI, undo twice to get back to the same player's turn
-        if self.game_mode == "ai_vs_ai" or self.game_mode == "ai_vs_ai_minmax":
+        if self.game_mode in AI_VS_AI_MODES:
             self.board.undo_move()
             self.board.undo_move()
         # For human vs AI, undo twice if it's human's turn (to get back to human's turn)
-        elif (self.game_mode == "ai_vs_human" or self.game_mode == "ai_vs_human_minmax") and self.board.current_player == Board.BLACK:
+        elif self.game_mode in AI_VS_HUMAN_MODES and self.board.current_player == Board.BLACK:
             self.board.undo_move()
             self.board.undo_move()
         else:
             self.board.undo_move()
             
+        del self.move_times[len(self.board.moves_history):]
+        self.last_move_time = time.time()
+        if self.clock:
+            # The undone moves' time stays spent; the clock runs for the side to move
+            self.clock.start(self.board.current_player)
+        self.lost_on_time = None
         self.draw_board()
         self.update_turn_indicator()
+        
+        # Resume the AI vs AI game from the earlier position
+        if self.spectating and not self.board.game_over:
+            self.root.after(1000, self.make_ai_move)
     
     def update_turn_indicator(self):
         """Update the turn label and image to show Player 1/2 and their stone image"""
@@ -489,6 +853,8 @@ class GomokuGUI:
                 player_text = "AI 1"
             elif self.game_mode == "ai_vs_ai_minmax":
                 player_text = "MiniMax AI"
+            elif self.game_mode == "ai_vs_ai_beam":
+                player_text = "Beam AI"
             else:
                 player_text = "Player 1" if self.game_mode == "human_vs_human" else "You"
             self.turn_label.configure(text=player_text)
@@ -499,9 +865,11 @@ class GomokuGUI:
                 player_text = "Alpha-Beta AI"
             elif self.game_mode == "ai_vs_human_minmax":
                 player_text = "MiniMax AI"
+            elif self.game_mode == "ai_vs_human_beam":
+                player_text = "Beam AI"
             elif self.game_mode == "ai_vs_ai":
                 player_text = "AI 2"
-            elif self.game_mode == "ai_vs_ai_minmax":
+            elif self.game_mode in ("ai_vs_ai_minmax", "ai_vs_ai_beam"):
                 player_text = "Alpha-Beta AI"
             else:
                 player_text = "Player 2"
@@ -168,6 +168,13 @@ def create_ai_selection_menu(root, show_game_callback, opponent_type):
             # This case would be for AI vs AI
             show_game_callback("ai_vs_ai")  # Default AI vs AI uses alpha-beta
     
+    def start_with_beam():
+        if opponent_type == "human":
+            show_game_callback("ai_vs_human_beam")
+        else:
+            # Beam search plays Black against Alpha-Beta
+            show_game_callback("ai_vs_ai_beam")
+    
     def return_to_main_menu():
         # Instead of calling create_main_menu directly, use the same pattern as in GomokuApp
         # First clear the window
@@ -181,9 +188,11 @@ def create_ai_selection_menu(root, show_game_callback, opponent_type):
     if opponent_type == "human":
         btn1_text = "Human vs MiniMax"
         btn2_text = "Human vs Alpha-Beta"
+        btn3_text = "Human vs Beam Search"
     else:
         btn1_text = "MiniMax vs Alpha-Beta"
         btn2_text = "Alpha-Beta vs Alpha-Beta"
+        btn3_text = "Beam vs Alpha-Beta"
     
     # Create buttons
     btn1 = ctk.CTkButton(menu_frame, text=btn1_text, font=btn_font, height=50, 
@@ -195,6 +204,11 @@ def create_ai_selection_menu(root, show_game_callback, opponent_type):
                          fg_color=btn_fg, hover_color=btn_hover, text_color="black", 
                          command=start_with_alphabeta)
     btn2.pack(fill="x", padx=40, pady=10)
+
+    btn3 = ctk.CTkButton(menu_frame, text=btn3_text, font=btn_font, height=50, 
+                         fg_color=btn_fg, hover_color=btn_hover, text_color="black", 
+                         command=start_with_beam)
+    btn3.pack(fill="x", padx=40, pady=10)
     
     # Back button
     back_btn = ctk.CTkButton(menu_frame, text="Back to Main Menu", font=btn_font, height=50, 
@@ -0,0 +1,256 @@
+"""
+Monte Carlo Tree Search engine.
+
+Exposes the same get_best_move(state, depth, ai_color, ...) interface as
+ai.py and ai_2.py, with depth reinterpreted as a search budget of
+depth * ITERATIONS_PER_DEPTH iterations (optionally capped by SearchLimits,
+whose node budget counts iterations and whose soft and hard time limits both
+simply stop the search), so it is an anytime engine: more budget simply means
+more iterations.
+
+- Selection uses UCT.
+- Expansion only considers empty cells near existing stones.
+- Each expanded leaf is scored by a batch of random playouts run in lockstep
+  with BoardBatch instead of one Python-level playout at a time. BoardBatch
+  needs a fixed-size dense board, so on a SparseBoard the playouts are
+  played one at a time among the cells near stones.
+- The tree is kept between calls and re-rooted at the current position when
+  the game continues from the previously searched one.
+"""
+
+import math
+import numpy as np
+from board import Board
+from ai import get_opponent, first_move, second_move
+from board_batch import BoardBatch
+from search_limits import SearchLimits, BOOK, DEPTH, SOFT_TIME
+
+ITERATIONS_PER_DEPTH = 200
+PLAYOUT_BATCH = 16
+MAX_PLAYOUT_PLIES = 60
+EXPANSION_RADIUS = 2
+EXPLORATION = 1.4
+
+_rng = np.random.default_rng()
+
+# Root of the tree from the previous search, reused on the next call
+_last_root = None
+_last_history = None
+
+
+class Node:
+    """A node of the search tree"""
+
+    __slots__ = ("move", "parent", "children", "untried", "visits", "wins", "player", "terminal")
+
+    def __init__(self, move, parent, player):
+        self.move = move
+        self.parent = parent
+        self.children = {}
+        self.untried = None  # Filled lazily on first expansion
+        self.visits = 0
+        self.wins = 0.0  # From the point of view of `player`
+        self.player = player  # Player who made `move`
+        self.terminal = False
+
+    def uct_child(self):
+        log_visits = math.log(self.visits)
+        best, best_score = None, -float('inf')
+        for child in self.children.values():
+            score = child.wins / child.visits + EXPLORATION * math.sqrt(log_visits / child.visits)
+            if score > best_score:
+                best, best_score = child, score
+        return best
+
+
+def candidate_moves(state, radius=EXPANSION_RADIUS):
+    """Valid moves within `radius` of an existing stone."""
+    valid = state.get_valid_moves()
+    if not state.moves_history or hasattr(state, "stones"):
+        # A SparseBoard only generates cells near its stones already
+        return valid
+    board = state.board
+    size = state.size
+    candidates = []
+    for row, col in valid:
+        near = False
+        for r in range(max(0, row - radius), min(size, row + radius + 1)):
+            for c in range(max(0, col - radius), min(size, col + radius + 1)):
+                if board[r][c] != Board.EMPTY:
+                    near = True
+                    break
+            if near:
+                break
+        if near:
+            candidates.append((row, col))
+    return candidates or valid
+
+
+def batched_playouts(state, batch=PLAYOUT_BATCH, max_plies=MAX_PLAYOUT_PLIES):
+    """
+    Play `batch` random games from one position in lockstep.
+
+    Args:
+        state: Board to start from
+        batch (int): Number of playouts
+        max_plies (int): Playouts still running after this many plies count as draws
+
+    Returns:
+        tuple: (black_wins, white_wins) over the batch
+    """
+    if hasattr(state, "stones"):
+        return sparse_playouts(state, batch, max_plies)
+    games = BoardBatch.from_board(state, batch)
+    games.play_random(max_plies, _rng)
+    return int(np.count_nonzero(games.winner == Board.BLACK)), int(np.count_nonzero(games.winner == Board.WHITE))
+
+
+def sparse_playouts(state, batch=PLAYOUT_BATCH, max_plies=MAX_PLAYOUT_PLIES):
+    """
+    Play `batch` random games from a SparseBoard one after another.
+
+    Moves are drawn from the cells near stones, so playouts also work on
+    unbounded boards.
+
+    Returns:
+        tuple: (black_wins, white_wins) over the batch
+    """
+    board = state.copy()
+    wins = {Board.BLACK: 0, Board.WHITE: 0}
+    for _ in range(batch):
+        played = 0
+        while not board.game_over and played < max_plies:
+            moves = board.get_valid_moves()
+            if not moves:
+                break
+            board.make_move(*moves[_rng.integers(len(moves))])
+            played += 1
+        if board.winner in wins:
+            wins[board.winner] += 1
+        for _ in range(played):
+            board.undo_move()
+    return wins[Board.BLACK], wins[Board.WHITE]
+
+
+def _reuse_tree(state):
+    """Find the node for the current position in the previous tree, if any."""
+    global _last_root, _last_history
+    if _last_root is None:
+        return None
+    history = [(r, c) for r, c, _ in state.moves_history]
+    if history[:len(_last_history)] != _last_history:
+        return None
+    node = _last_root
+    for move in history[len(_last_history):]:
+        node = node.children.get(move)
+        if node is None:
+            return None
+    node.parent = None
+    return node
+
+
+def get_best_move(state, depth, ai_color, use_alphabeta=True, time_limit=None, limits=None):
+    """
+    Get the best move for the AI using Monte Carlo Tree Search
+
+    Args:
+        state: Current board state
+        depth: Search budget, in units of ITERATIONS_PER_DEPTH iterations
+        ai_color: AI player's color
+        use_alphabeta: Unused, kept for interface compatibility
+        time_limit: Optional time limit in seconds, used when limits is not given
+        limits: Optional SearchLimits; limits.stop_reason tells which limit
+            ended the search
+
+    Returns:
+        tuple: (best_move, best_value) with the value being the win rate
+    """
+    global _last_root, _last_history
+
+    if limits is None:
+        limits = SearchLimits(depth=depth, hard_time=time_limit)
+    if limits.depth is not None:
+        depth = limits.depth
+    limits.start()
+
+    pieces = len(state.moves_history)
+    if pieces == 0:
+        limits.finish(BOOK)
+        return first_move(state)
+    if pieces == 1:
+        limits.finish(BOOK)
+        return second_move(state)
+
+    root = _reuse_tree(state)
+    if root is None:
+        root = Node(None, None, get_opponent(state.current_player))
+
+    board = state.copy()
+    iterations = max(1, depth) * ITERATIONS_PER_DEPTH
+
+    completed = 0
+    for _ in range(iterations):
+        reason = limits.hard_limit_reached()
+        if reason is None and limits.soft_time_passed():
+            reason = SOFT_TIME
+        if reason:
+            limits.finish(reason)
+            break
+        limits.nodes_searched += 1
+        completed += 1
+
+        node = root
+        played = 0
+
+        # Selection
+        while node.untried is not None and not node.untried and node.children and not node.terminal:
+            node = node.uct_child()
+            board.make_move(*node.move)
+            played += 1
+
+        # Expansion
+        if not node.terminal and not board.game_over:
+            if node.untried is None:
+                node.untried = candidate_moves(board)
+                _rng.shuffle(node.untried)
+            if node.untried:
+                move = tuple(node.untried.pop())
+                player = board.current_player
+                board.make_move(*move)
+                played += 1
+                child = Node(move, node, player)
+                child.terminal = board.game_over
+                node.children[move] = child
+                node = child
+
+        # Simulation
+        if board.game_over:
+            black_wins = PLAYOUT_BATCH if board.winner == Board.BLACK else 0
+            white_wins = PLAYOUT_BATCH if board.winner == Board.WHITE else 0
+        else:
+            black_wins, white_wins = batched_playouts(board)
+        draws = PLAYOUT_BATCH - black_wins - white_wins
+
+        # Backpropagation
+        while node is not None:
+            node.visits += PLAYOUT_BATCH
+            wins = black_wins if node.player == Board.BLACK else white_wins
+            node.wins += wins + 0.5 * draws
+            node = node.parent
+
+        for _ in range(played):
+            board.undo_move()
+
+    limits.finish(DEPTH)
+    if not root.children:
+        moves = candidate_moves(state)
+        return (moves[0] if moves else (-1, -1)), 0.0
+
+    best = max(root.children.values(), key=lambda child: child.visits)
+    print(f"MCTS: {completed} iterations, best move visited {best.visits // PLAYOUT_BATCH} times")
+
+    # Keep the subtree for the next call
+    _last_root = root
+    _last_history = [(r, c) for r, c, _ in state.moves_history]
+
+    return best.move, best.wins / best.visits
@@ -0,0 +1,106 @@
+"""
+Local move scoring for move ordering.
+
+score_move() rates an empty cell for the side about to play there from the
+stones on the four lines through it alone: every five-cell window
+containing the cell that holds stones of only one color adds an attack
+score (own stones: the move extends them) or a defense score (opponent
+stones: the move blocks them), by the number of stones in it. Windows with
+both colors or off-board cells add nothing, empty ones a little.
+
+Each line is read as the 9 cells within four steps of the move and scored
+once per distinct line (the scores are memoized), so a move costs four
+short reads and lookups however large the board is, instead of playing it
+and evaluating the whole board.
+
+Usage:
+    moves.sort(key=lambda move: score_move(board, move[0], move[1], board.current_player),
+               reverse=True)
+"""
+
+from board import Board
+
+DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1))
+
+# Cells read on each side of the move
+REACH = 4
+_OFF_BOARD = 3
+
+# Window scores by number of stones already in the window
+EMPTY_WINDOW_SCORE = 7
+ATTACK_SCORES = (EMPTY_WINDOW_SCORE, 35, 800, 15000, 800000)
+DEFENSE_SCORES = (EMPTY_WINDOW_SCORE, 15, 400, 1800, 100000)
+
+_line_scores = {}
+_lines = {}
+
+
+def _line_cells(state, row, col):
+    """Cells of the four lines through (row, col), None where not playable; cached per board shape."""
+    key = (type(state), state.size, row, col)
+    lines = _lines.get(key)
+    if lines is None:
+        lines = []
+        for dr, dc in DIRECTIONS:
+            cells = []
+            for k in range(-REACH, REACH + 1):
+                r, c = row + k * dr, col + k * dc
+                cells.append((r, c) if state.is_playable(r, c) else None)
+            lines.append(tuple(cells))
+        lines = _lines[key] = tuple(lines)
+    return lines
+
+
+def line_scores(line):
+    """
+    Scores of playing the centre of a line.
+
+    Args:
+        line: 2 * REACH + 1 cell values (Board.EMPTY, BLACK, WHITE or off board)
+
+    Returns:
+        tuple: Indexed by player: (unused, score for Black, score for White)
+    """
+    scores = _line_scores.get(line)
+    if scores is not None:
+        return scores
+    black = white = 0
+    for start in range(REACH + 1):
+        window = line[start:start + 5]
+        if _OFF_BOARD in window:
+            continue
+        blacks = window.count(Board.BLACK)
+        whites = window.count(Board.WHITE)
+        if blacks and whites:
+            continue
+        if whites:
+            white += ATTACK_SCORES[whites]
+            black += DEFENSE_SCORES[whites]
+        else:
+            black += ATTACK_SCORES[blacks]
+            white += DEFENSE_SCORES[blacks]
+    scores = _line_scores[line] = (0, black, white)
+    return scores
+
+
+def score_move(state, row, col, player):
+    """
+    Attack plus defense value of player playing the empty cell (row, col).
+
+    Args:
+        state: Board or SparseBoard
+        player: The color about to play
+
+    Returns:
+        int: Higher is more promising
+    """
+    stones = getattr(state, "stones", None)
+    grid = state.board if stones is None else None
+    score = 0
+    for cells in _line_cells(state, row, col):
+        if grid is not None:
+            line = tuple([_OFF_BOARD if cell is None else grid[cell[0]][cell[1]] for cell in cells])
+        else:
+            line = tuple([_OFF_BOARD if cell is None else stones.get(cell, Board.EMPTY) for cell in cells])
+        score += line_scores(line)[player]
+    return score
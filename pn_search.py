@@ -0,0 +1,374 @@
+"""
+Proof-number search.
+
+Decides whether a position is a proven win for the side to move (or a
+proven loss) instead of scoring it heuristically. The search works in
+threat space: the attacker may only play moves that win, block a four or
+make a four or an open three, and the defender only the replies those
+threats allow (plus counter-fours), so a proof is a sequence of threats the
+defender cannot escape. Positions where the defender is left free are
+disproven, which makes "unknown" the answer for quiet positions.
+
+The proof tree is grown best-first by proof and disproof numbers within a
+node budget. New nodes start from their number of legal threat moves
+rather than 1, which steers the search towards threats with few replies.
+Proven positions are kept in a bounded ProofTable, keyed by the
+symmetry-canonical hash, so repeated, transposed, rotated and mirrored
+positions are solved once. Keys also hold the rule variant and board size,
+as a win under one set of rules may be forbidden or no win under another.
+
+Usage:
+    result = solve(board)
+    if result.result == WIN:
+        print(result.line)
+"""
+
+import time
+from collections import OrderedDict
+from board import Board
+from eval_fn import FIVE_SCORE
+from threats import scan, forcing_moves
+from symmetry import canonical_key
+from rules import legal_moves
+
+WIN = "win"
+LOSS = "loss"
+UNKNOWN = "unknown"
+
+# Proof and disproof numbers of solved nodes
+INF = 10 ** 9
+
+DEFAULT_NODE_LIMIT = 20000
+DEFAULT_TABLE_CAPACITY = 100000
+# Threat sequences longer than this are not followed
+MAX_PROOF_DEPTH = 24
+
+# get_best_move pre-check: budget, and the value reported for a proven win
+PRECHECK_NODE_LIMIT = 400
+PROVEN_WIN_VALUE = FIVE_SCORE
+
+
+def get_opponent(color):
+    return Board.WHITE if color == Board.BLACK else Board.BLACK
+
+
+class ProofTable:
+    """
+    Bounded LRU table of proven positions.
+
+    Only proofs are stored: a disproof may be due to the depth or node
+    limits and would not hold in a longer search.
+    """
+
+    def __init__(self, capacity=DEFAULT_TABLE_CAPACITY):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        """True if the position is proven, None if unknown"""
+        proven = self.entries.get(key)
+        if proven is not None:
+            self.entries.move_to_end(key)
+        return proven
+
+    def put(self, key, proven=True):
+        self.entries[key] = proven
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class ProofResult:
+    """Outcome of a proof-number search"""
+
+    def __init__(self, result, line, nodes, elapsed):
+        """
+        Args:
+            result (str): WIN or LOSS for the side to move, or UNKNOWN
+            line (list): Moves of the proof, starting from the position
+            nodes (int): Tree nodes created
+            elapsed (float): Seconds spent
+        """
+        self.result = result
+        self.line = line
+        self.nodes = nodes
+        self.elapsed = elapsed
+
+    def __repr__(self):
+        return f"ProofResult({self.result}, line={self.line}, nodes={self.nodes})"
+
+
+class PNNode:
+    """A node of the proof tree"""
+
+    __slots__ = ("move", "parent", "children", "moves", "pn", "dn", "is_or", "depth")
+
+    def __init__(self, move, parent, is_or, depth):
+        self.move = move
+        self.parent = parent
+        self.children = None  # None until expanded
+        self.moves = None     # Moves to expand, found when the node is created
+        self.pn = 1
+        self.dn = 1
+        self.is_or = is_or    # Attacker to move
+        self.depth = depth
+
+    def set_proven(self):
+        self.pn, self.dn = 0, INF
+
+    def set_disproven(self):
+        self.pn, self.dn = INF, 0
+
+    def update(self):
+        """Recompute the numbers from the children."""
+        children = self.children
+        if self.is_or:
+            self.pn = min(child.pn for child in children)
+            self.dn = min(INF, sum(child.dn for child in children))
+        else:
+            self.pn = min(INF, sum(child.pn for child in children))
+            self.dn = min(child.dn for child in children)
+
+
+def attacker_moves(state, attacker):
+    """
+    Threat moves for the attacker (who is to move).
+
+    Returns:
+        list: A winning move, the blocks of a defender four, or moves making
+            fours and (when the defender has no open three) open threes
+    """
+    threats = scan(state)
+    own, theirs = threats[attacker], threats[get_opponent(attacker)]
+    if own.fives:
+        return legal_moves(state, sorted(own.fives))[:1]
+    if theirs.fives:
+        return legal_moves(state, sorted(theirs.fives))
+    moves = own.open_fours | own.fours
+    if not theirs.open_fours:
+        # An open three is too slow against the defender's own open three
+        moves |= own.threes
+    return legal_moves(state, sorted(moves))
+
+
+def defender_moves(state, attacker):
+    """
+    Replies allowed to the defender (who is to move).
+
+    Returns:
+        list: The replies (empty if all of them are forbidden), or None when
+            the defender is not under threat (or can win at once), so the
+            attacker's last move was not forcing
+    """
+    defender = get_opponent(attacker)
+    threats = scan(state)
+    own, theirs = threats[defender], threats[attacker]
+    if own.fives:
+        return None
+    if theirs.fives:
+        return legal_moves(state, sorted(theirs.fives))
+    if theirs.open_fours:
+        return legal_moves(state, sorted(theirs.three_blocks | own.fours | own.open_fours))
+    return None
+
+
+def _key(state, attacker):
+    return (canonical_key(state)[0], state.current_player, attacker, state.rules, state.size)
+
+
+def _evaluate(node, state, attacker, table):
+    """Solve a new node if possible, otherwise find its moves and initial numbers."""
+    node.children = []
+    if state.game_over:
+        if state.winner == attacker:
+            node.set_proven()
+        else:
+            node.set_disproven()
+        return
+
+    if table.get(_key(state, attacker)):
+        node.set_proven()
+        return
+
+    if node.depth >= MAX_PROOF_DEPTH:
+        node.set_disproven()
+        return
+
+    if node.is_or:
+        moves = attacker_moves(state, attacker)
+    else:
+        moves = defender_moves(state, attacker)
+    if moves is None or (node.is_or and not moves):
+        node.set_disproven()
+        return
+    if not moves:
+        # Every reply to the threat is forbidden (Renju)
+        node.set_proven()
+        return
+
+    node.moves = moves
+    node.children = None
+    # The attacker needs one good move, the defender has to refute them all
+    if node.is_or:
+        node.pn, node.dn = 1, len(moves)
+    else:
+        node.pn, node.dn = len(moves), 1
+
+
+def _expand(node, state, attacker, table):
+    """Create and evaluate the children of node."""
+    children = []
+    for move in node.moves:
+        state.make_move(*move)
+        child = PNNode(move, node, not node.is_or, node.depth + 1)
+        _evaluate(child, state, attacker, table)
+        state.undo_move()
+        children.append(child)
+    node.children = children
+    node.moves = None
+    node.update()
+
+
+def _select(root, state):
+    """Walk down to the most-proving node, playing its moves on state."""
+    node = root
+    path = []
+    while node.children:
+        if node.is_or:
+            node = min(node.children, key=lambda child: child.pn)
+        else:
+            node = min(node.children, key=lambda child: child.dn)
+        state.make_move(*node.move)
+        path.append(node)
+    return node, path
+
+
+def _proof_line(root):
+    """Moves of the proof: the attacker's proving move and the defender's longest resistance."""
+    line = []
+    node = root
+    while node.children:
+        proven = [child for child in node.children if child.pn == 0]
+        if not proven:
+            break
+        if node.is_or:
+            node = proven[0]
+        else:
+            node = max(proven, key=_subtree_size)
+        line.append(node.move)
+    return line
+
+
+def _subtree_size(node):
+    if not node.children:
+        return 1
+    return 1 + sum(_subtree_size(child) for child in node.children)
+
+
+def prove(state, attacker, max_nodes=DEFAULT_NODE_LIMIT, table=None):
+    """
+    Try to prove that attacker wins from state by continuous threats.
+
+    Args:
+        state: Board to search (restored before returning)
+        attacker: Player trying to win
+        max_nodes (int): Budget of tree nodes
+        table (ProofTable): Table of proven positions, shared between calls
+
+    Returns:
+        tuple: (proven, line, nodes) where proven is True, False (disproven
+            within the threat space) or None (budget exhausted)
+    """
+    if table is None:
+        table = ProofTable()
+    root = PNNode(None, None, state.current_player == attacker, 0)
+    _evaluate(root, state, attacker, table)
+    nodes = 1
+
+    while root.pn and root.dn and nodes < max_nodes:
+        node, path = _select(root, state)
+        _expand(node, state, attacker, table)
+        nodes += len(node.children)
+        if node.pn == 0:
+            table.put(_key(state, attacker))
+        for _ in path:
+            state.undo_move()
+        # Back the numbers up to the root
+        for ancestor in reversed(path[:-1]):
+            ancestor.update()
+        if path:
+            root.update()
+
+    if root.pn == 0:
+        table.put(_key(state, attacker))
+        return True, _proof_line(root), nodes
+    if root.dn == 0:
+        return False, [], nodes
+    return None, [], nodes
+
+
+def solve(state, max_nodes=DEFAULT_NODE_LIMIT, table=None):
+    """
+    Decide whether the side to move has a proven win or loss.
+
+    Half the budget goes to proving a win; if that fails, the rest goes to
+    proving that the opponent's threats cannot be escaped.
+
+    Args:
+        state: Board (restored before returning)
+        max_nodes (int): Total budget of tree nodes
+        table (ProofTable): Optional table shared between calls
+
+    Returns:
+        ProofResult
+    """
+    start = time.time()
+    if table is None:
+        table = ProofTable()
+    player = state.current_player
+    if state.game_over:
+        return ProofResult(UNKNOWN, [], 0, 0.0)
+
+    proven, line, nodes = prove(state, player, max_nodes // 2, table)
+    if proven:
+        return ProofResult(WIN, line, nodes, time.time() - start)
+
+    proven, line, more = prove(state, get_opponent(player), max_nodes - nodes, table)
+    nodes += more
+    if proven:
+        return ProofResult(LOSS, line, nodes, time.time() - start)
+    return ProofResult(UNKNOWN, [], nodes, time.time() - start)
+
+
+def precheck(state, max_nodes=PRECHECK_NODE_LIMIT, table=None):
+    """
+    Cheap win check for get_best_move, run only when the side to move has
+    forcing moves.
+
+    Returns:
+        tuple: (move, PROVEN_WIN_VALUE) for a proven win, otherwise None
+    """
+    if state.game_over or len(state.moves_history) < 5:
+        return None
+    moves, _ = forcing_moves(state)
+    if not moves:
+        return None
+    proven, line, nodes = prove(state, state.current_player, max_nodes, table)
+    if proven and line:
+        print(f"Proven win in {len(line)} plies ({nodes} nodes): {line}")
+        return line[0], PROVEN_WIN_VALUE
+    return None
+
+
+if __name__ == "__main__":
+    import sys
+    from archive import read_games
+
+    # Solve the final positions of archived games: python pn_search.py games.gmka
+    path = sys.argv[1] if len(sys.argv) > 1 else "games.gmka"
+    for i, game in enumerate(read_games(path)):
+        board = Board.from_moves(game.moves[:-1], game.size, rules=game.rules)
+        print(i, solve(board))
@@ -0,0 +1,99 @@
+"""
+Threat-only quiescence search.
+
+At the depth horizon the engines would otherwise score a position
+statically even when a four or an open three is about to change it. This
+search keeps extending forcing moves only (wins, forced blocks of fours,
+own fours and open threes, blocks of open threes) until the position is
+quiet, the ply limit is hit or the node cap runs out, and only then uses
+evaluation_state.
+"""
+
+from eval_fn import evaluation_state
+from threats import forcing_moves
+
+# Per-leaf limits: a quiescence search never visits more than
+# QUIESCENCE_NODE_LIMIT nodes or goes QUIESCENCE_MAX_PLY plies deep
+QUIESCENCE_NODE_LIMIT = 32
+QUIESCENCE_MAX_PLY = 8
+# Open threes are only made in the first plies; deeper down only fours and
+# blocks are followed, which keeps the extension narrow
+QUIESCENCE_THREE_PLY = 1
+# Forcing moves are found on the lines through this many recent moves, as in
+# the main search's forced_moves, instead of scanning the whole board
+QUIESCENCE_RECENT = 4
+
+
+class QuiescenceBudget:
+    """Node cap for one quiescence search"""
+    def __init__(self, max_nodes=QUIESCENCE_NODE_LIMIT):
+        self.max_nodes = max_nodes
+        self.nodes = 0
+
+    def exhausted(self):
+        return self.nodes >= self.max_nodes
+
+
+def quiescence_search(state, alpha, beta, ai_color, budget=None, ply=0, max_ply=QUIESCENCE_MAX_PLY,
+                      evaluate=evaluation_state):
+    """
+    Search forcing moves until the position is quiet (in-place, using make_move/undo_move).
+
+    Args:
+        state: Board at the depth horizon
+        alpha, beta: Search window, from ai_color's point of view
+        ai_color: AI player's color
+        budget: QuiescenceBudget shared by the whole quiescence tree
+        ply (int): Current quiescence ply
+        max_ply (int): Maximum quiescence plies
+        evaluate: Static evaluation function, e.g. a cached one
+
+    Returns:
+        Score from ai_color's point of view
+    """
+    if budget is None:
+        budget = QuiescenceBudget()
+    budget.nodes += 1
+
+    stand_pat = evaluate(state, ai_color)
+    if state.game_over or ply >= max_ply or budget.exhausted():
+        return stand_pat
+
+    moves, forced = forcing_moves(state, include_threes=ply < QUIESCENCE_THREE_PLY, recent=QUIESCENCE_RECENT)
+    if not moves:
+        return stand_pat
+
+    maximizing = (state.current_player == ai_color)
+    if forced:
+        # No standing pat: the side to move has to win or block
+        value = -float('inf') if maximizing else float('inf')
+    else:
+        # The side to move may ignore its optional threats
+        value = stand_pat
+        if maximizing:
+            if value >= beta:
+                return value
+            alpha = max(alpha, value)
+        else:
+            if value <= alpha:
+                return value
+            beta = min(beta, value)
+
+    for move in moves:
+        if budget.exhausted():
+            break
+        state.make_move(*move)
+        child_value = quiescence_search(state, alpha, beta, ai_color, budget, ply + 1, max_ply, evaluate)
+        state.undo_move()
+        if maximizing:
+            value = max(value, child_value)
+            alpha = max(alpha, value)
+        else:
+            value = min(value, child_value)
+            beta = min(beta, value)
+        if alpha >= beta:
+            break
+
+    if value in (float('inf'), -float('inf')):
+        return stand_pat
+    return value
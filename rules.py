@@ -0,0 +1,197 @@
+"""
+Rule variants.
+
+FREESTYLE: five or more in a row wins (the original rules).
+STANDARD:  exactly five wins; an overline does not.
+RENJU:     exactly five wins for Black, five or more for White, and Black
+           may not play a forbidden move: a double-three, a double-four or
+           an overline (unless the move also makes exactly five).
+
+Forbidden moves are found from the line patterns through the cell alone:
+each of the four lines is read as an 11-cell window around it and
+classified once per distinct window (the analysis is memoized), so a check
+costs four window reads instead of trying the move and searching the
+board. A three only counts when one of its straight-four points is itself
+allowed; that check recurses at most MAX_THREE_DEPTH times.
+
+Usage:
+    board = Board(15, rules=RENJU)
+    board.is_valid_move(row, col)  # False for Black's forbidden moves
+"""
+
+import os
+
+FREESTYLE = "freestyle"
+STANDARD = "standard"
+RENJU = "renju"
+RULES = (FREESTYLE, STANDARD, RENJU)
+
+DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1))
+
+# Cells read on each side of the move
+WINDOW = 5
+# Window cell values
+EMPTY, OWN, BLOCKED = 0, 1, 2
+# Nesting of the "is the three's straight-four point allowed" check
+MAX_THREE_DEPTH = 2
+
+_line_analysis = {}
+_windows = {}
+
+
+def from_env(default=FREESTYLE):
+    """Rule set named by GOMOKU_RULES."""
+    rules = os.environ.get("GOMOKU_RULES", default).lower()
+    if rules not in RULES:
+        raise ValueError(f"Unknown rules '{rules}', expected one of {', '.join(RULES)}")
+    return rules
+
+
+def is_five(count, player, rules, black=1):
+    """Whether a run of count stones of player wins under rules."""
+    if rules == FREESTYLE:
+        return count >= 5
+    if rules == RENJU and player != black:
+        return count >= 5
+    return count == 5
+
+
+def _window(state, row, col, dr, dc):
+    """Cells of the window around (row, col), None where not playable; cached per board shape."""
+    key = (type(state), state.size, row, col, dr, dc)
+    cells = _windows.get(key)
+    if cells is None:
+        cells = []
+        for k in range(-WINDOW, WINDOW + 1):
+            r, c = row + k * dr, col + k * dc
+            cells.append((r, c) if state.is_playable(r, c) else None)
+        cells = _windows[key] = tuple(cells)
+    return cells
+
+
+def read_line(state, row, col, dr, dc, player, placed=()):
+    """
+    Window of the line through (row, col), with player's stone at the centre.
+
+    Args:
+        placed: Extra cells treated as player's stones
+
+    Returns:
+        tuple: 2 * WINDOW + 1 cells of EMPTY, OWN or BLOCKED (opponent
+            stones and cells off the playable board)
+    """
+    stones = getattr(state, "stones", None)
+    grid = state.board if stones is None else None
+    line = []
+    for cell in _window(state, row, col, dr, dc):
+        if cell is None:
+            line.append(BLOCKED)
+            continue
+        if cell in placed:
+            line.append(OWN)
+            continue
+        stone = stones.get(cell, EMPTY) if grid is None else grid[cell[0]][cell[1]]
+        line.append(EMPTY if stone == EMPTY else OWN if stone == player else BLOCKED)
+    line[WINDOW] = OWN
+    return tuple(line)
+
+
+def _run(line, i):
+    """Length of the run of OWN cells through index i."""
+    start = i
+    while start > 0 and line[start - 1] == OWN:
+        start -= 1
+    end = i
+    while end < len(line) - 1 and line[end + 1] == OWN:
+        end += 1
+    return start, end
+
+
+def _five_points(line):
+    """Empty cells that would make exactly five together with the centre."""
+    points = []
+    for i, cell in enumerate(line):
+        if cell != EMPTY or abs(i - WINDOW) > 4:
+            continue
+        filled = line[:i] + (OWN,) + line[i + 1:]
+        start, end = _run(filled, i)
+        if end - start + 1 == 5 and start <= WINDOW <= end:
+            points.append(i)
+    return points
+
+
+def _is_straight_four(line, points):
+    return len(points) == 2 and points[1] - points[0] == 5 and \
+        all(line[k] == OWN for k in range(points[0] + 1, points[1]))
+
+
+def analyze_line(line):
+    """
+    Classify a window for the stone at its centre.
+
+    Returns:
+        tuple: (five, overline, fours, three_points) where fours is the
+            number of fours through the centre (a straight four counts once,
+            two separate fours on one line twice) and three_points the
+            offsets from the centre that would make a straight four
+    """
+    result = _line_analysis.get(line)
+    if result is not None:
+        return result
+
+    start, end = _run(line, WINDOW)
+    run = end - start + 1
+    five, overline, fours, three_points = run == 5, run > 5, 0, ()
+    if not five and not overline:
+        points = _five_points(line)
+        fours = 1 if _is_straight_four(line, points) else len(points)
+        if not fours:
+            three_points = tuple(
+                i - WINDOW for i, cell in enumerate(line)
+                if cell == EMPTY and abs(i - WINDOW) <= 3
+                and _is_straight_four(line[:i] + (OWN,) + line[i + 1:],
+                                      _five_points(line[:i] + (OWN,) + line[i + 1:])))
+    result = (five, overline, fours, three_points)
+    _line_analysis[line] = result
+    return result
+
+
+def is_forbidden(state, row, col, placed=(), depth=0):
+    """
+    Whether Black may not play at the empty cell (row, col) under Renju rules.
+
+    Args:
+        state: Board or SparseBoard
+        placed: Cells treated as Black stones (used by the three check)
+        depth (int): Nesting of the three check
+    """
+    black = state.BLACK
+    lines = [analyze_line(read_line(state, row, col, dr, dc, black, placed)) for dr, dc in DIRECTIONS]
+    if any(five for five, _, _, _ in lines):
+        return False
+    if any(overline for _, overline, _, _ in lines):
+        return True
+    if sum(fours for _, _, fours, _ in lines) >= 2:
+        return True
+
+    threes = [(direction, points) for direction, (_, _, _, points) in zip(DIRECTIONS, lines) if points]
+    if len(threes) < 2:
+        return False
+    if depth >= MAX_THREE_DEPTH:
+        return True
+    # A three is real only if it can become a straight four with an allowed move
+    inner = placed + ((row, col),)
+    real = 0
+    for (dr, dc), points in threes:
+        if any(not is_forbidden(state, row + k * dr, col + k * dc, inner, depth + 1) for k in points):
+            real += 1
+            if real >= 2:
+                return True
+    return False
+
+
+def legal_moves(state, moves):
+    """Drop the moves the side to move may not play (Black's forbidden moves in Renju)."""
+    if getattr(state, "rules", FREESTYLE) != RENJU or state.current_player != state.BLACK:
+        return moves
+    return [move for move in moves if not is_forbidden(state, move[0], move[1])]
@@ -0,0 +1,166 @@
+"""
+Search limits shared by all engines.
+
+A SearchLimits object bounds one search by any combination of maximum depth,
+node count, soft and hard time limits and an absolute deadline. Engines call
+start() when they begin, count_node() for every node (which raises
+SearchAborted once a hard limit is hit) and can_deepen() before starting a
+new iteration, and record in stop_reason which limit ended the search.
+Iterative engines also report every completed iteration through
+completed_iteration(), which time managers (see time_manager) use to stop
+early or extend the search.
+
+Deployments can set the limits used by the GUI and terminal with the
+GOMOKU_AI_DEPTH, GOMOKU_AI_NODES, GOMOKU_AI_SOFT_TIME, GOMOKU_AI_TIME and
+GOMOKU_AI_DEADLINE environment variables.
+"""
+
+import os
+import time
+
+# Values of SearchLimits.stop_reason
+DEPTH = "depth"          # Reached the maximum depth (or searched everything)
+NODES = "nodes"          # Node budget used up
+SOFT_TIME = "soft_time"  # Soft time limit passed, no new iteration started
+HARD_TIME = "hard_time"  # Hard time limit passed, search aborted
+DEADLINE = "deadline"    # Absolute deadline passed, search aborted
+BOOK = "book"            # Opening move played without searching
+PROVEN = "proven"        # Proof-number pre-check found a forced win
+STABLE = "stable"        # Time manager: best move stable, remaining time saved
+FORCED = "forced"        # Time manager: only one move to consider
+
+
+class SearchAborted(Exception):
+    """Raised inside a search when a hard limit is hit"""
+
+
+class SearchLimits:
+    """
+    Limits for a single search.
+    """
+
+    def __init__(self, depth=None, nodes=None, soft_time=None, hard_time=None, deadline=None):
+        """
+        Args:
+            depth (int): Maximum search depth
+            nodes (int): Maximum number of nodes
+            soft_time (float): Seconds after which no new iteration is started
+            hard_time (float): Seconds after which the search is aborted
+            deadline (float): Absolute time.time() at which the search is aborted
+        """
+        self.depth = depth
+        self.nodes = nodes
+        self.soft_time = soft_time
+        self.hard_time = hard_time
+        self.deadline = deadline
+        self.start()
+
+    @classmethod
+    def from_env(cls, depth=2):
+        """
+        Build limits from GOMOKU_AI_* environment variables.
+
+        Args:
+            depth (int): Depth used when GOMOKU_AI_DEPTH is not set
+        """
+        def read(name, convert):
+            value = os.environ.get(name)
+            return convert(value) if value else None
+
+        env_depth = read("GOMOKU_AI_DEPTH", int)
+        return cls(depth=env_depth if env_depth is not None else depth,
+                   nodes=read("GOMOKU_AI_NODES", int),
+                   soft_time=read("GOMOKU_AI_SOFT_TIME", float),
+                   hard_time=read("GOMOKU_AI_TIME", float),
+                   deadline=read("GOMOKU_AI_DEADLINE", float))
+
+    def copy(self):
+        """Fresh limits with the same settings, for a search of its own."""
+        return SearchLimits(self.depth, self.nodes, self.soft_time, self.hard_time, self.deadline)
+
+    def start(self):
+        """Reset the counters at the start of a search."""
+        self.start_time = time.time()
+        self.nodes_searched = 0
+        self.depth_reached = 0
+        self.stop_reason = None
+        hard_stops = []
+        if self.hard_time is not None:
+            hard_stops.append((self.start_time + self.hard_time, HARD_TIME))
+        if self.deadline is not None:
+            hard_stops.append((self.deadline, DEADLINE))
+        self._hard_stop = min(hard_stops) if hard_stops else None
+
+    def elapsed(self):
+        return time.time() - self.start_time
+
+    def stop(self, reason):
+        """Record why the search stopped and abort it."""
+        self.stop_reason = reason
+        raise SearchAborted(reason)
+
+    def finish(self, reason=DEPTH):
+        """Record why the search ended, unless a limit already did."""
+        if self.stop_reason is None:
+            self.stop_reason = reason
+
+    def hard_limit_reached(self):
+        """
+        Check the node budget and the hard time limits.
+
+        Returns:
+            str: The limit that was hit, or None
+        """
+        if self.nodes is not None and self.nodes_searched >= self.nodes:
+            return NODES
+        if self._hard_stop is not None and time.time() >= self._hard_stop[0]:
+            return self._hard_stop[1]
+        return None
+
+    def count_node(self):
+        """Count one node; raises SearchAborted once a hard limit is hit."""
+        self.nodes_searched += 1
+        reason = self.hard_limit_reached()
+        if reason:
+            self.stop(reason)
+
+    def completed_iteration(self, depth, best_move, best_value, root_moves):
+        """
+        Called by iterative engines after each completed depth.
+
+        Plain limits ignore it; time_manager.TimedLimits adjusts its soft
+        time limit from it.
+
+        Args:
+            depth (int): Depth just completed
+            best_move: Best move at that depth
+            best_value: Its value
+            root_moves (int): Number of root moves searched
+        """
+
+    def soft_time_passed(self):
+        return self.soft_time is not None and self.elapsed() >= self.soft_time
+
+    def can_deepen(self, depth):
+        """
+        Whether an iteration at the given depth may start.
+
+        The first iteration is always allowed so a move is always found.
+        """
+        if self.depth is not None and depth > self.depth:
+            self.finish(DEPTH)
+            return False
+        if depth <= 1:
+            return True
+        reason = self.hard_limit_reached()
+        if reason:
+            self.finish(reason)
+            return False
+        if self.soft_time_passed():
+            self.finish(SOFT_TIME)
+            return False
+        return True
+
+    def __repr__(self):
+        return (f"SearchLimits(depth={self.depth}, nodes={self.nodes}, soft_time={self.soft_time}, "
+                f"hard_time={self.hard_time}, deadline={self.deadline})")
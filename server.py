@@ -0,0 +1,436 @@
+"""
+Asyncio engine server.
+
+Hosts many concurrent games over a JSON-lines protocol (TCP or Unix socket)
+and runs engine searches in a bounded pool of worker processes. Each request
+is one JSON object per line and gets exactly one JSON response line back,
+echoing the request "id" if one was given:
+
+    {"id": 1, "op": "new_game"}                      -> {"id": 1, "ok": true, "game": 1}
+    {"op": "new_game", "size": 15, "rules": "renju"}
+    {"op": "move", "game": 1, "row": 7, "col": 7}   -> {"ok": true, "game_over": false, ...}
+    {"op": "ai_move", "game": 1, "engine": "ai_2", "depth": 2, "time_limit": 10}
+    {"op": "ai_move", "game": 1, "engine": "ai_2", "depth": 6, "nodes": 5000}
+    {"op": "state", "game": 1}
+    {"op": "close", "game": 1}
+    {"op": "metrics"}
+
+Searches beyond the pool size wait in a bounded queue; once the queue is full
+new searches are rejected immediately with "busy" so clients can back off
+instead of piling up latency.
+
+"ai_move" accepts the SearchLimits fields "nodes", "soft_time" and
+"hard_time" besides "depth". The engine's hard time limit never exceeds the
+request's "time_limit", and the response reports which limit ended the
+search as "stop_reason". Malformed fields get an "ok": false reply naming
+the field, like any other bad request. With --shared-tt the ai_2 workers search with one
+transposition table in shared memory. With GOMOKU_TELEMETRY set, the workers log every
+search (see telemetry).
+
+Usage:
+    python server.py --port 8765 --workers 4
+    python server.py --unix /tmp/gomoku.sock
+    python server.py --workers 8 --shared-tt 1048576
+"""
+
+import argparse
+import asyncio
+import contextlib
+import importlib
+import json
+import math
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from board import Board
+from search_limits import SearchLimits
+from shared_tt import SharedTranspositionTable
+from telemetry import record_move
+from rules import FREESTYLE, RULES
+
+# Engine modules that can be requested by name; each exposes get_best_move
+ENGINES = ("ai", "ai_2", "mcts", "beam")
+
+DEFAULT_ENGINE = "ai_2"
+# Board sizes a game may be created with
+MIN_SIZE = 5
+MAX_SIZE = 100
+DEFAULT_DEPTH = 2
+DEFAULT_TIME_LIMIT = 30.0
+# Extra seconds a search may take past its time limit before the request times out
+RESPONSE_GRACE = 2.0
+
+
+def init_worker(table):
+    """Worker process initializer: search ai_2 positions with the shared table."""
+    import ai_2
+    ai_2.use_shared_table(table)
+
+
+def run_search(moves, size, engine, depth, use_alphabeta, nodes=None, soft_time=None, hard_time=None,
+               rules=FREESTYLE):
+    """
+    Run a search in a worker process.
+
+    Args:
+        moves: List of (row, col) moves played so far
+        size (int): Board size
+        engine (str): Engine module name
+        depth (int): Search depth
+        use_alphabeta (bool): Use alpha-beta instead of plain minimax
+        nodes (int): Optional node budget
+        soft_time (float): Optional soft time limit in seconds
+        hard_time (float): Optional hard time limit in seconds
+        rules (str): Rule variant of the game
+
+    Returns:
+        tuple: (row, col, value, stop_reason)
+    """
+    board = Board.from_moves(moves, size, rules=rules)
+    get_best_move = importlib.import_module(engine).get_best_move
+    limits = SearchLimits(depth=depth, nodes=nodes, soft_time=soft_time, hard_time=hard_time)
+    # The engines report their progress on stdout, which is the server's
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        move, value = get_best_move(board, depth, board.current_player, use_alphabeta, limits=limits)
+    record_move(engine, limits, board)
+    return int(move[0]), int(move[1]), float(value), limits.stop_reason
+
+
+class ServerMetrics:
+    """Request counters and a sliding window of search latencies"""
+
+    def __init__(self, window=1000):
+        self.started = time.time()
+        self.requests = 0
+        self.searches = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.latencies = deque(maxlen=window)
+
+    def snapshot(self, in_flight, queued, workers, games):
+        latencies = sorted(self.latencies)
+
+        def percentile(p):
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))], 4)
+
+        uptime = time.time() - self.started
+        return {
+            "uptime": round(uptime, 1),
+            "games": games,
+            "workers": workers,
+            "in_flight": in_flight,
+            "queued": queued,
+            "requests": self.requests,
+            "searches": self.searches,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "searches_per_sec": round(self.searches / uptime, 3) if uptime else 0.0,
+            "latency_p50": percentile(0.5),
+            "latency_p90": percentile(0.9),
+            "latency_p99": percentile(0.99),
+        }
+
+
+class GameSession:
+    """A single hosted game"""
+
+    def __init__(self, game_id, size, rules=FREESTYLE):
+        self.id = game_id
+        self.board = Board(size, rules)
+        # Only one search or move may touch the board at a time
+        self.lock = asyncio.Lock()
+
+    def state(self):
+        board = self.board
+        return {
+            "game": self.id,
+            "size": board.size,
+            "rules": board.rules,
+            "moves": [[r, c] for r, c, _ in board.moves_history],
+            "current_player": board.current_player,
+            "game_over": board.game_over,
+            "winner": board.winner,
+            "is_draw": board.is_draw,
+        }
+
+
+class RequestError(Exception):
+    """Error reported back to the client instead of closing the connection"""
+
+
+# Default of required request fields
+REQUIRED = object()
+
+
+def int_field(request, name, default=REQUIRED):
+    """
+    An integer field of a request.
+
+    Args:
+        request (dict): The request
+        name (str): Field name
+        default: Value of a missing field; missing required fields are errors
+
+    Raises:
+        RequestError: The field is missing and required, or not an integer
+    """
+    value = request.get(name)
+    if value is None:
+        if default is REQUIRED:
+            raise RequestError(f"Missing '{name}'")
+        return default
+    if isinstance(value, (bool, float)) or not isinstance(value, (int, str)):
+        raise RequestError(f"'{name}' must be an integer")
+    try:
+        return int(value)
+    except ValueError:
+        raise RequestError(f"'{name}' must be an integer") from None
+
+
+def float_field(request, name, default=REQUIRED):
+    """A finite number field of a request, like int_field."""
+    value = request.get(name)
+    if value is None:
+        if default is REQUIRED:
+            raise RequestError(f"Missing '{name}'")
+        return default
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise RequestError(f"'{name}' must be a number")
+    try:
+        value = float(value)
+    except ValueError:
+        raise RequestError(f"'{name}' must be a number") from None
+    if not math.isfinite(value):
+        raise RequestError(f"'{name}' must be a number")
+    return value
+
+
+class EngineServer:
+    """
+    Serves many games from one process and a bounded worker pool.
+    """
+
+    def __init__(self, workers=4, max_queue=64, default_time_limit=DEFAULT_TIME_LIMIT, shared_tt=None):
+        """
+        Args:
+            workers (int): Number of engine worker processes
+            max_queue (int): Searches allowed to wait for a free worker
+            default_time_limit (float): Per-request time limit in seconds
+            shared_tt (int): Entries of a transposition table shared by the
+                workers, or None for a private table per worker
+        """
+        self.workers = workers
+        self.max_queue = max_queue
+        self.default_time_limit = default_time_limit
+        self.shared_table = None
+        if shared_tt:
+            self.shared_table = SharedTranspositionTable(shared_tt)
+            self.executor = ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                                initargs=(self.shared_table,))
+        else:
+            self.executor = ProcessPoolExecutor(max_workers=workers)
+        self.slots = asyncio.Semaphore(workers)
+        self.in_flight = 0
+        self.queued = 0
+        self.games = {}
+        self.next_game_id = 1
+        self.metrics = ServerMetrics()
+
+    async def handle_connection(self, reader, writer):
+        """Read requests line by line; each one is answered as soon as it completes."""
+        write_lock = asyncio.Lock()
+        tasks = set()
+
+        async def respond(line):
+            response = await self.handle_line(line)
+            async with write_lock:
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                task = asyncio.ensure_future(respond(line))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def handle_line(self, line):
+        self.metrics.requests += 1
+        request_id = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise RequestError("Request must be a JSON object")
+            request_id = request.get("id")
+            response = await self.dispatch(request)
+            response["ok"] = True
+        except (RequestError, ValueError) as e:
+            response = {"ok": False, "error": str(e)}
+        except Exception as e:
+            self.metrics.errors += 1
+            response = {"ok": False, "error": f"Internal error: {e}"}
+        if request_id is not None:
+            response["id"] = request_id
+        return response
+
+    async def dispatch(self, request):
+        op = request.get("op")
+        if op == "new_game":
+            size = int_field(request, "size", 15)
+            if not MIN_SIZE <= size <= MAX_SIZE:
+                raise RequestError(f"'size' must be between {MIN_SIZE} and {MAX_SIZE}")
+            rules = request.get("rules", FREESTYLE)
+            if not isinstance(rules, str) or rules not in RULES:
+                raise RequestError(f"Unknown rules '{rules}'")
+            game = GameSession(self.next_game_id, size, rules)
+            self.games[game.id] = game
+            self.next_game_id += 1
+            return {"game": game.id}
+        if op == "metrics":
+            return self.metrics.snapshot(self.in_flight, self.queued, self.workers, len(self.games))
+
+        game_id = request.get("game")
+        if isinstance(game_id, bool) or not isinstance(game_id, (int, str)):
+            raise RequestError("'game' must be a game id")
+        game = self.games.get(game_id)
+        if game is None:
+            raise RequestError("Unknown game")
+
+        if op == "state":
+            return game.state()
+        if op == "close":
+            del self.games[game.id]
+            return {"game": game.id}
+        if op == "move":
+            async with game.lock:
+                row, col = int_field(request, "row"), int_field(request, "col")
+                if not game.board.make_move(row, col):
+                    raise RequestError("Illegal move")
+                return game.state()
+        if op == "ai_move":
+            return await self.ai_move(game, request)
+        raise RequestError(f"Unknown op '{op}'")
+
+    async def ai_move(self, game, request):
+        engine = request.get("engine", DEFAULT_ENGINE)
+        if not isinstance(engine, str) or engine not in ENGINES:
+            raise RequestError(f"Unknown engine '{engine}'")
+        depth = int_field(request, "depth", DEFAULT_DEPTH)
+        use_alphabeta = bool(request.get("alphabeta", True))
+        time_limit = float_field(request, "time_limit", self.default_time_limit)
+        nodes = int_field(request, "nodes", None)
+        soft_time = float_field(request, "soft_time", None)
+        hard_time = min(float_field(request, "hard_time", time_limit), time_limit)
+        apply_move = bool(request.get("apply", True))
+
+        async with game.lock:
+            if game.board.game_over:
+                raise RequestError("Game is over")
+            moves = [(r, c) for r, c, _ in game.board.moves_history]
+            row, col, value, stop_reason, elapsed = await self.search(
+                moves, game.board.size, engine, depth, use_alphabeta, time_limit,
+                nodes, soft_time, hard_time, game.board.rules)
+            if apply_move:
+                game.board.make_move(row, col)
+            response = game.state()
+        response.update({"move": [row, col], "value": value, "stop_reason": stop_reason,
+                         "elapsed": round(elapsed, 4)})
+        return response
+
+    async def search(self, moves, size, engine, depth, use_alphabeta, time_limit,
+                     nodes=None, soft_time=None, hard_time=None, rules=FREESTYLE):
+        """Run a search on the pool, queueing if all workers are busy."""
+        if self.slots.locked() and self.queued >= self.max_queue:
+            self.metrics.rejected += 1
+            raise RequestError("busy")
+
+        start = time.perf_counter()
+        self.queued += 1
+        try:
+            await self.slots.acquire()
+        finally:
+            self.queued -= 1
+
+        loop = asyncio.get_running_loop()
+        self.in_flight += 1
+        future = loop.run_in_executor(self.executor, run_search, moves, size, engine, depth, use_alphabeta,
+                                      nodes, soft_time, hard_time, rules)
+
+        def release(_):
+            # The worker stays busy until the search really finishes, even if
+            # the client already got a timeout, so only free the slot then
+            self.in_flight -= 1
+            self.slots.release()
+
+        future.add_done_callback(release)
+        try:
+            row, col, value, stop_reason = await asyncio.wait_for(asyncio.shield(future),
+                                                                  time_limit + RESPONSE_GRACE)
+        except asyncio.TimeoutError:
+            self.metrics.timeouts += 1
+            raise RequestError("Search timed out")
+
+        elapsed = time.perf_counter() - start
+        self.metrics.searches += 1
+        self.metrics.latencies.append(elapsed)
+        return row, col, value, stop_reason, elapsed
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        if self.shared_table is not None:
+            self.shared_table.close()
+            self.shared_table.unlink()
+
+
+async def serve(host="127.0.0.1", port=8765, unix_path=None, workers=4, max_queue=64,
+                time_limit=DEFAULT_TIME_LIMIT, shared_tt=None):
+    engine_server = EngineServer(workers, max_queue, time_limit, shared_tt)
+    if unix_path:
+        server = await asyncio.start_unix_server(engine_server.handle_connection, path=unix_path)
+        print(f"Serving on {unix_path} with {workers} workers")
+    else:
+        server = await asyncio.start_server(engine_server.handle_connection, host, port)
+        print(f"Serving on {host}:{port} with {workers} workers")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        engine_server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve Gomoku engine moves over JSON lines")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="Listen on a Unix socket instead of TCP")
+    parser.add_argument("--workers", type=int, default=4, help="Engine worker processes")
+    parser.add_argument("--max-queue", type=int, default=64, help="Searches allowed to wait for a worker")
+    parser.add_argument("--time-limit", type=float, default=DEFAULT_TIME_LIMIT,
+                        help="Default per-request time limit in seconds")
+    parser.add_argument("--shared-tt", type=int, metavar="ENTRIES",
+                        help="Share one transposition table of this many entries between the workers")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.unix, args.workers, args.max_queue, args.time_limit,
+                          args.shared_tt))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
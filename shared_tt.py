@@ -0,0 +1,197 @@
+"""
+Transposition table in shared memory.
+
+A fixed-size table of packed entries in multiprocessing.shared_memory that
+any number of local processes can attach to, so search workers share what
+they find instead of each filling its own dict. It has the same get /
+item assignment / len / clear interface as the dict ai_2 uses, with the
+same keys ((hash, current player)) and entries ((depth, value, flag,
+best_move)). Values and bounds are from the searching AI's point of view,
+so an EngineSession searches through for_color(ai_color, rules, size), a
+view whose keys also fold in that color and the game variant; Black's and
+White's searches never read each other's entries, and neither do games
+under other rules or on other board sizes.
+
+Each slot is two 64-bit words: the packed entry and the position key XOR-ed
+with it. Writes need no lock; a reader recomputes the key from both words
+and treats a mismatch (another position, or two processes writing the same
+slot at once) as a miss. Packed entry layout, from the low bits up:
+
+    depth  8 bits
+    flag   2 bits
+    move  16 bits  row and col as signed bytes, 0xFFFF for no move
+    value 38 bits  signed; +-inf are stored as the extremes
+
+Usage:
+    table = SharedTranspositionTable(1 << 20)      # in the parent
+    worker_table = SharedTranspositionTable.attach(table.name)
+    black_entries = worker_table.for_color(Board.BLACK, board.rules, board.size)
+    ...
+    table.close(); table.unlink()
+"""
+
+from multiprocessing import resource_tracker, shared_memory
+import numpy as np
+from board import Board, zobrist_key
+from rules import FREESTYLE, RULES
+
+DEFAULT_ENTRIES = 1 << 20
+
+_MASK64 = (1 << 64) - 1
+_DEPTH_BITS, _FLAG_BITS, _MOVE_BITS, _VALUE_BITS = 8, 2, 16, 38
+_FLAG_SHIFT = _DEPTH_BITS
+_MOVE_SHIFT = _FLAG_SHIFT + _FLAG_BITS
+_VALUE_SHIFT = _MOVE_SHIFT + _MOVE_BITS
+_NO_MOVE = (1 << _MOVE_BITS) - 1
+_VALUE_LIMIT = (1 << (_VALUE_BITS - 1)) - 1
+# Keys of the side to move, so (hash, player) folds into 64 bits
+_SIDE_KEYS = {Board.BLACK: 0, Board.WHITE: zobrist_key(-1, -1, Board.WHITE)}
+# Keys of the searching AI's color, which values and bounds are relative to
+_COLOR_KEYS = {Board.BLACK: zobrist_key(-2, -2, Board.BLACK), Board.WHITE: zobrist_key(-2, -2, Board.WHITE)}
+
+
+def variant_key(rules, size):
+    """Key of a rule variant and board size (size None for unbounded boards)."""
+    return zobrist_key(-3 - RULES.index(rules), -1 if size is None else size, 0)
+
+
+def pack_entry(depth, value, flag, move):
+    """Pack a (depth, value, flag, best_move) entry into 64 bits."""
+    depth = max(0, min(depth, (1 << _DEPTH_BITS) - 1))
+    if value == float('inf'):
+        value = _VALUE_LIMIT
+    elif value == -float('inf'):
+        value = -_VALUE_LIMIT
+    else:
+        value = max(-_VALUE_LIMIT + 1, min(int(round(value)), _VALUE_LIMIT - 1))
+    if move is None or not (-128 <= move[0] < 128 and -128 <= move[1] < 128):
+        packed_move = _NO_MOVE
+    else:
+        packed_move = ((move[0] & 0xFF) << 8) | (move[1] & 0xFF)
+    return (depth | (flag << _FLAG_SHIFT) | (packed_move << _MOVE_SHIFT)
+            | ((value & ((1 << _VALUE_BITS) - 1)) << _VALUE_SHIFT))
+
+
+def unpack_entry(data):
+    """Inverse of pack_entry."""
+    depth = data & ((1 << _DEPTH_BITS) - 1)
+    flag = (data >> _FLAG_SHIFT) & ((1 << _FLAG_BITS) - 1)
+    packed_move = (data >> _MOVE_SHIFT) & _NO_MOVE
+    value = data >> _VALUE_SHIFT
+    if value > _VALUE_LIMIT:
+        value -= 1 << _VALUE_BITS
+    if value == _VALUE_LIMIT:
+        value = float('inf')
+    elif value == -_VALUE_LIMIT:
+        value = -float('inf')
+    if packed_move == _NO_MOVE:
+        move = None
+    else:
+        row, col = packed_move >> 8, packed_move & 0xFF
+        move = (row - 256 if row >= 128 else row, col - 256 if col >= 128 else col)
+    return depth, value, flag, move
+
+
+class SharedTranspositionTable:
+    """
+    Lock-free transposition table shared between processes.
+    """
+
+    def __init__(self, entries=DEFAULT_ENTRIES, name=None, create=True):
+        """
+        Args:
+            entries (int): Number of slots, rounded up to a power of two
+            name (str): Shared memory block to attach to when create is False
+            create (bool): Create a new block instead of attaching to one
+        """
+        size = 1
+        while size < entries:
+            size *= 2
+        if create:
+            self.shm = shared_memory.SharedMemory(create=True, size=size * 16)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            # Only the creator frees the block; without this the resource
+            # tracker would unlink it when the first attached process exits
+            resource_tracker.unregister(self.shm._name, "shared_memory")
+            size = self.shm.size // 16
+        self.entries = size
+        self.mask = size - 1
+        # Column 0: key ^ data, column 1: data
+        self.slots = np.ndarray((size, 2), dtype=np.uint64, buffer=self.shm.buf)
+        if create:
+            self.slots[:] = 0
+        self.owner = create
+
+    @classmethod
+    def attach(cls, name):
+        """Attach to a table created by another process."""
+        return cls(name=name, create=False)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def __reduce__(self):
+        # Pickled tables (e.g. passed to pool workers) attach to the same memory
+        return (SharedTranspositionTable.attach, (self.name,))
+
+    # XOR-ed into every key; set per AI color and game variant by for_color
+    color_key = 0
+
+    def for_color(self, ai_color, rules=FREESTYLE, size=15):
+        """
+        View of the table for searches by ai_color.
+
+        Views share the memory, but their keys differ by color, rules and
+        board size, so entries stored from one color's point of view, or for
+        another variant, are never read.
+
+        Args:
+            ai_color (int): Color of the searching AI
+            rules (str): Rule variant of the game
+            size (int): Board size, None for unbounded boards
+        """
+        view = object.__new__(SharedTranspositionTable)
+        view.__dict__.update(self.__dict__)
+        view.color_key = _COLOR_KEYS.get(ai_color, 0) ^ variant_key(rules, size)
+        view.owner = False
+        return view
+
+    def _key(self, state_hash):
+        key, player = state_hash
+        return (key ^ _SIDE_KEYS.get(player, 0) ^ self.color_key) & _MASK64
+
+    def get(self, state_hash, default=None):
+        key = self._key(state_hash)
+        check, data = self.slots[key & self.mask]
+        check, data = int(check), int(data)
+        if data == 0 or check ^ data != key:
+            return default
+        return unpack_entry(data)
+
+    def __setitem__(self, state_hash, entry):
+        key = self._key(state_hash)
+        index = key & self.mask
+        data = pack_entry(*entry)
+        old_check, old_data = self.slots[index]
+        old_check, old_data = int(old_check), int(old_data)
+        # Keep a deeper entry of the same position
+        if old_check ^ old_data == key and (old_data & ((1 << _DEPTH_BITS) - 1)) > entry[0]:
+            return
+        self.slots[index] = (key ^ data, data)
+
+    def __len__(self):
+        return int(np.count_nonzero(self.slots[:, 1]))
+
+    def clear(self):
+        self.slots[:] = 0
+
+    def close(self):
+        """Detach this process from the table."""
+        self.slots = None
+        self.shm.close()
+
+    def unlink(self):
+        """Free the shared memory (call once, from the creating process)."""
+        self.shm.unlink()
@@ -0,0 +1,307 @@
+"""
+Sparse Gomoku board for large and unbounded boards.
+
+SparseBoard has the same interface as board.Board, but stores only the
+occupied cells in a dict and keeps a bounding box of the stones, so the cost
+of a move, of move generation and of evaluation (see
+eval_fn.evaluation_sparse) scales with the number of stones rather than with
+the board area. With size=None the board is unbounded ("infinite" freestyle
+Gomoku) and coordinates may be negative.
+"""
+
+from board import Board, zobrist_key, symmetric_zobrist_key
+from rules import FREESTYLE, RENJU, is_five, is_forbidden, legal_moves
+
+# Candidate moves are the empty cells within this distance of a stone
+NEIGHBOR_RADIUS = 2
+
+
+class SparseBoard:
+    """
+    Gomoku board storing only occupied cells.
+    """
+
+    EMPTY = Board.EMPTY
+    BLACK = Board.BLACK
+    WHITE = Board.WHITE
+
+    def __init__(self, size=None, rules=FREESTYLE):
+        """
+        Initialize the board.
+
+        Args:
+            size (int): Board size, or None for an unbounded board
+            rules (str): Rule variant from rules.py (default: freestyle)
+        """
+        self.size = size
+        self.rules = rules
+        self.max_moves = size * size if size else None
+        # row -> flip - row mirrors the board (about the origin when unbounded)
+        self.flip = size - 1 if size else 0
+        self.reset()
+
+    def reset(self):
+        """Reset the board to initial state."""
+        self.stones = {}  # (row, col) -> player
+        # Number of stones within NEIGHBOR_RADIUS of each cell
+        self.neighbors = {}
+        self.min_row = self.max_row = self.min_col = self.max_col = None
+        self.current_player = self.BLACK
+        self.last_move = None
+        self.game_over = False
+        self.winner = None
+        self.is_draw = False
+        self.moves_history = []
+        self.winning_stones = []
+        self.move_count = 0
+        self.hash_key = 0  # Zobrist hash of the stones, as in Board
+        self.symmetric_hash = 0
+
+    def get(self, row, col):
+        """Get the stone at (row, col), EMPTY if none."""
+        return self.stones.get((row, col), self.EMPTY)
+
+    def in_bounds(self, row, col):
+        """Check if (row, col) lies on the board (always true when unbounded)."""
+        return self.size is None or (0 <= row < self.size and 0 <= col < self.size)
+
+    def is_playable(self, row, col):
+        """Check if (row, col) may be played; every cell of a sparse board can."""
+        return self.in_bounds(row, col)
+
+    def make_move(self, row, col):
+        """
+        Make a move on the board.
+
+        Args:
+            row (int): Row index
+            col (int): Column index
+
+        Returns:
+            bool: True if move was successful, False otherwise
+        """
+        if not self.is_valid_move(row, col):
+            return False
+
+        self._place(row, col, self.current_player)
+        self.last_move = (row, col)
+        self.moves_history.append((row, col, self.current_player))
+        self.move_count += 1
+
+        if self.check_win(row, col):
+            self.game_over = True
+            self.winner = self.current_player
+            return True
+
+        if self.max_moves is not None and self.move_count >= self.max_moves:
+            self.game_over = True
+            self.is_draw = True
+            return True
+
+        self.current_player = self.WHITE if self.current_player == self.BLACK else self.BLACK
+        return True
+
+    def is_valid_move(self, row, col):
+        """
+        Check if the move is valid.
+
+        Args:
+            row (int): Row index
+            col (int): Column index
+
+        Returns:
+            bool: True if move is valid, False otherwise
+        """
+        if self.game_over:
+            return False
+        if not self.in_bounds(row, col):
+            return False
+        if (row, col) in self.stones:
+            return False
+        return self.rules != RENJU or not self.is_forbidden(row, col)
+
+    def is_forbidden(self, row, col):
+        """Check if the move at the empty cell (row, col) is forbidden (Renju, Black only)."""
+        return self.rules == RENJU and self.current_player == self.BLACK and is_forbidden(self, row, col)
+
+    def check_win(self, row, col):
+        """
+        Check if the last move made at (row, col) wins the game.
+
+        Args:
+            row (int): Row index of the last move
+            col (int): Column index of the last move
+
+        Returns:
+            bool: True if the player wins, False otherwise
+        """
+        stones = self.stones
+        player = stones[(row, col)]
+        for dr, dc in ((0, 1), (1, 0), (1, 1), (1, -1)):
+            line = [(row, col)]
+            for sign in (1, -1):
+                r, c = row + sign * dr, col + sign * dc
+                while stones.get((r, c)) == player:
+                    line.append((r, c))
+                    r += sign * dr
+                    c += sign * dc
+            if len(line) >= 5 and is_five(len(line), player, self.rules, self.BLACK):
+                self.winning_stones = line
+                return True
+        return False
+
+    def get_valid_moves(self):
+        """
+        Get candidate moves: empty cells near existing stones.
+
+        Unlike Board.get_valid_moves this does not enumerate the whole board,
+        which would be impossible on an unbounded one.
+
+        Returns:
+            list: List of (row, col) tuples
+        """
+        if self.game_over:
+            return []
+        if not self.stones:
+            center = self.size // 2 if self.size else 0
+            return [(center, center)]
+        stones = self.stones
+        return legal_moves(self, [cell for cell, count in self.neighbors.items() if count and cell not in stones])
+
+    def undo_move(self):
+        """
+        Undo the last move.
+
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        if not self.moves_history:
+            return False
+
+        row, col, player = self.moves_history.pop()
+        self._remove(row, col)
+        self.current_player = player
+        self.game_over = False
+        self.winner = None
+        self.is_draw = False
+        self.move_count -= 1
+
+        if self.moves_history:
+            self.last_move = (self.moves_history[-1][0], self.moves_history[-1][1])
+        else:
+            self.last_move = None
+
+        return True
+
+    def _place(self, row, col, player):
+        self.stones[(row, col)] = player
+        self.hash_key ^= zobrist_key(row, col, player)
+        self.symmetric_hash ^= symmetric_zobrist_key(row, col, player, self.flip)
+        self._update_neighbors(row, col, 1)
+        if self.min_row is None:
+            self.min_row = self.max_row = row
+            self.min_col = self.max_col = col
+        else:
+            self.min_row = min(self.min_row, row)
+            self.max_row = max(self.max_row, row)
+            self.min_col = min(self.min_col, col)
+            self.max_col = max(self.max_col, col)
+
+    def _remove(self, row, col):
+        player = self.stones.pop((row, col))
+        self.hash_key ^= zobrist_key(row, col, player)
+        self.symmetric_hash ^= symmetric_zobrist_key(row, col, player, self.flip)
+        self._update_neighbors(row, col, -1)
+        if not self.stones:
+            self.min_row = self.max_row = self.min_col = self.max_col = None
+        elif row in (self.min_row, self.max_row) or col in (self.min_col, self.max_col):
+            # Only shrink the box when the removed stone was on its edge
+            rows = [r for r, _ in self.stones]
+            cols = [c for _, c in self.stones]
+            self.min_row, self.max_row = min(rows), max(rows)
+            self.min_col, self.max_col = min(cols), max(cols)
+
+    def _update_neighbors(self, row, col, delta):
+        neighbors = self.neighbors
+        for r in range(row - NEIGHBOR_RADIUS, row + NEIGHBOR_RADIUS + 1):
+            for c in range(col - NEIGHBOR_RADIUS, col + NEIGHBOR_RADIUS + 1):
+                if not self.in_bounds(r, c):
+                    continue
+                count = neighbors.get((r, c), 0) + delta
+                if count:
+                    neighbors[(r, c)] = count
+                else:
+                    del neighbors[(r, c)]
+
+    def bounding_box(self):
+        """
+        Get the bounding box of the stones.
+
+        Returns:
+            tuple: (min_row, max_row, min_col, max_col), or None if empty
+        """
+        if self.min_row is None:
+            return None
+        return self.min_row, self.max_row, self.min_col, self.max_col
+
+    def get_board_state(self):
+        """
+        Get the current board state.
+
+        Returns:
+            dict: Mapping of (row, col) to player for every stone
+        """
+        return dict(self.stones)
+
+    def get_current_player(self):
+        """
+        Get the current player.
+
+        Returns:
+            int: Current player (BLACK or WHITE)
+        """
+        return self.current_player
+
+    def copy(self):
+        """Return a copy of the board state for AI search."""
+        new_board = SparseBoard(self.size, self.rules)
+        new_board.stones = dict(self.stones)
+        new_board.neighbors = dict(self.neighbors)
+        new_board.min_row, new_board.max_row = self.min_row, self.max_row
+        new_board.min_col, new_board.max_col = self.min_col, self.max_col
+        new_board.current_player = self.current_player
+        new_board.last_move = self.last_move
+        new_board.game_over = self.game_over
+        new_board.winner = self.winner
+        new_board.is_draw = self.is_draw
+        new_board.moves_history = list(self.moves_history)
+        new_board.winning_stones = list(self.winning_stones)
+        new_board.move_count = self.move_count
+        new_board.hash_key = self.hash_key
+        new_board.symmetric_hash = self.symmetric_hash
+        return new_board
+
+    def next(self, move):
+        """Return a new board with the move applied (for AI search)."""
+        new_board = self.copy()
+        new_board.make_move(*move)
+        return new_board
+
+    @classmethod
+    def from_moves(cls, moves, size=None, rules=FREESTYLE):
+        """
+        Build a board by replaying a list of moves.
+
+        Args:
+            moves: Sequence of (row, col) or (row, col, player) tuples
+            size (int): Board size, or None for an unbounded board
+            rules (str): Rule variant
+
+        Returns:
+            SparseBoard
+        """
+        board = cls(size, rules)
+        for move in moves:
+            if not board.make_move(move[0], move[1]):
+                raise ValueError(f"Illegal move {move[:2]}")
+        return board
@@ -0,0 +1,76 @@
+"""
+Symmetry-canonical position keys.
+
+A Gomoku position and its seven rotations and reflections have the same
+game-theoretic value, and the best move of one maps to the best move of the
+others. Boards keep the Zobrist hashes of all eight variants up to date
+incrementally, packed into one integer (board.symmetric_hash); the canonical key of a position is
+the smallest of them, so every variant finds the same table entry. Moves
+stored with a canonical key are kept in the canonical frame with
+to_canonical and mapped back onto the actual board with from_canonical.
+
+Usage:
+    key, symmetry = canonical_key(board)
+    table[key] = to_canonical(best_move, symmetry, board)
+    ...
+    move = from_canonical(table[key], symmetry, board)
+"""
+
+from board import SYMMETRIES
+
+_MASK64 = (1 << 64) - 1
+
+# Rotating by 90 and by 270 degrees undo each other, the rest undo themselves
+INVERSE = (0, 3, 2, 1, 4, 5, 6, 7)
+
+
+def canonical_key(state):
+    """
+    Canonical hash of the position.
+
+    Returns:
+        tuple: (key, symmetry) where symmetry maps the board onto the
+            canonical variant
+    """
+    packed = state.symmetric_hash
+    keys = [(packed >> (64 * i)) & _MASK64 for i in range(len(SYMMETRIES))]
+    key = min(keys)
+    return key, keys.index(key)
+
+
+def transform(move, symmetry, state):
+    """Apply one of the eight symmetries to a (row, col) move."""
+    return SYMMETRIES[symmetry](move[0], move[1], state.flip)
+
+
+def to_canonical(move, symmetry, state):
+    """Map a move on the board into the canonical frame (None stays None)."""
+    if move is None:
+        return None
+    return transform(move, symmetry, state)
+
+
+def from_canonical(move, symmetry, state):
+    """Map a move from the canonical frame back onto the board (None stays None)."""
+    if move is None:
+        return None
+    return transform(move, INVERSE[symmetry], state)
+
+
+def canonical_moves(moves, state):
+    """
+    Canonical form of a move sequence, e.g. as the key of an opening book.
+
+    Args:
+        moves: (row, col) moves played from the empty board
+        state: Board the moves belong to (for its size)
+
+    Returns:
+        tuple: (canonical moves, symmetry) with the same choice of variant
+            as canonical_key on the resulting position
+    """
+    board = type(state)(state.size)
+    for move in moves:
+        board.make_move(*move)
+    _, symmetry = canonical_key(board)
+    return tuple(transform(move, symmetry, state) for move in moves), symmetry
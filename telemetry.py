@@ -0,0 +1,243 @@
+"""
+Per-move engine telemetry.
+
+Opt-in: when GOMOKU_TELEMETRY is set to a file path, the GUI, terminal and
+engine server append one compact JSON line per engine move with the engine,
+its limits, the depth reached, nodes, time, transposition table hit rate
+and the position. The file is rotated once it passes
+GOMOKU_TELEMETRY_MAX_BYTES (default 5 MB), keeping TELEMETRY_BACKUPS older
+files as path.1, path.2, ...
+
+The report aggregates latency and nodes/sec percentiles by engine, engine
+version and game phase, and lists the slowest positions:
+
+    GOMOKU_TELEMETRY=telemetry.jsonl python main.py
+    python telemetry.py telemetry.jsonl --slowest 10
+
+The server's worker processes share the file; lines are appended with a
+single write, but rotation is not coordinated between processes, so a line
+may land in a file that was just rotated.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024
+TELEMETRY_BACKUPS = 3
+
+# Game phases by number of stones on the board when the engine moved
+PHASES = ((8, "opening"), (40, "middlegame"), (None, "endgame"))
+
+_versions = {}
+
+
+def engine_version(engine):
+    """
+    Short hash of an engine module's source, so records from different
+    versions of an engine are reported separately.
+    """
+    version = _versions.get(engine)
+    if version is None:
+        module = sys.modules.get(engine)
+        path = getattr(module, "__file__", None)
+        try:
+            with open(path, "rb") as f:
+                version = hashlib.sha1(f.read()).hexdigest()[:8]
+        except (OSError, TypeError):
+            version = "unknown"
+        _versions[engine] = version
+    return version
+
+
+def game_phase(stones):
+    for limit, phase in PHASES:
+        if limit is None or stones <= limit:
+            return phase
+
+
+class TelemetryWriter:
+    """Appends records to a size-rotated JSON-lines file"""
+
+    def __init__(self, path, max_bytes=DEFAULT_MAX_BYTES, backups=TELEMETRY_BACKUPS):
+        """
+        Args:
+            path (str): File to append to
+            max_bytes (int): Rotate before the file grows past this size
+            backups (int): Number of rotated files to keep
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+
+    def write(self, record):
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            size = 0
+        if size and size + len(line) > self.max_bytes:
+            self.rotate()
+        with open(self.path, "a") as f:
+            f.write(line)
+
+    def rotate(self):
+        """Shift path.1 -> path.2 ... and path -> path.1, dropping the oldest."""
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}"):
+                os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        if self.backups:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+
+_writer = None
+
+
+def get_writer():
+    """The writer configured by GOMOKU_TELEMETRY, or None when telemetry is off."""
+    global _writer
+    path = os.environ.get("GOMOKU_TELEMETRY")
+    if not path:
+        return None
+    if _writer is None or _writer.path != path:
+        max_bytes = os.environ.get("GOMOKU_TELEMETRY_MAX_BYTES")
+        _writer = TelemetryWriter(path, int(max_bytes) if max_bytes else DEFAULT_MAX_BYTES)
+    return _writer
+
+
+def make_record(engine, limits, state):
+    """
+    Build the telemetry record of a finished search.
+
+    Args:
+        engine (str): Engine module name, e.g. "ai_2"
+        limits: SearchLimits the search ran with
+        state: Board the engine searched (before its move is played)
+    """
+    elapsed = limits.elapsed()
+    stats = getattr(sys.modules.get(engine), "search_stats", None)
+    tt_hit_rate = stats.tt_hit_rate() if hasattr(stats, "tt_hit_rate") else None
+    moves = []
+    for row, col, _ in state.moves_history:
+        moves += (int(row), int(col))
+    return {
+        "ts": round(time.time(), 3),
+        "engine": engine,
+        "version": engine_version(engine),
+        "limits": {"depth": limits.depth, "nodes": limits.nodes,
+                   "soft_time": limits.soft_time, "hard_time": limits.hard_time},
+        "depth": limits.depth_reached,
+        "nodes": limits.nodes_searched,
+        "time": round(elapsed, 4),
+        "nps": round(limits.nodes_searched / elapsed) if elapsed else 0,
+        "tt_hit_rate": round(tt_hit_rate, 3) if tt_hit_rate is not None else None,
+        "stop": limits.stop_reason,
+        "stones": len(state.moves_history),
+        "size": state.size,
+        "moves": moves,
+    }
+
+
+def record_move(engine, limits, state):
+    """Append a record for the search just finished, if telemetry is on."""
+    writer = get_writer()
+    if writer is None:
+        return
+    try:
+        writer.write(make_record(engine, limits, state))
+    except OSError as e:
+        print(f"Could not write telemetry: {e}")
+
+
+def read_records(paths):
+    """Yield the records of telemetry files, skipping damaged lines."""
+    for path in paths:
+        with open(path) as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+
+def percentile(values, p):
+    """Nearest-rank percentile of sorted values."""
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(p * len(values)))]
+
+
+def report(records, slowest=0):
+    """
+    Aggregate records by engine, version and game phase.
+
+    Returns:
+        tuple: (rows, slowest records) where each row is a dict of counts
+            and latency / nodes-per-second percentiles
+    """
+    groups = {}
+    records = list(records)
+    for record in records:
+        key = (record["engine"], record.get("version", "unknown"), game_phase(record["stones"]))
+        groups.setdefault(key, []).append(record)
+
+    phase_order = [phase for _, phase in PHASES]
+    rows = []
+    for (engine, version, phase), group in sorted(
+            groups.items(), key=lambda item: (item[0][0], item[0][1], phase_order.index(item[0][2]))):
+        times = sorted(r["time"] for r in group)
+        nps = sorted(r["nps"] for r in group)
+        depths = [r["depth"] for r in group]
+        rows.append({
+            "engine": engine, "version": version, "phase": phase, "moves": len(group),
+            "time_p50": percentile(times, 0.5), "time_p90": percentile(times, 0.9),
+            "time_p99": percentile(times, 0.99), "time_max": times[-1],
+            "nps_p10": percentile(nps, 0.1), "nps_p50": percentile(nps, 0.5),
+            "depth_avg": sum(depths) / len(depths),
+        })
+    slow = sorted(records, key=lambda r: r["time"], reverse=True)[:slowest]
+    return rows, slow
+
+
+def existing_files(path):
+    """The rotated backups of path (oldest first) followed by path itself."""
+    backups = [f"{path}.{i}" for i in range(TELEMETRY_BACKUPS, 0, -1)]
+    return [p for p in backups + [path] if os.path.exists(p)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report engine telemetry")
+    parser.add_argument("paths", nargs="*", default=["telemetry.jsonl"],
+                        help="Telemetry files (rotated backups are included)")
+    parser.add_argument("--slowest", type=int, default=5, help="List the N slowest moves")
+    args = parser.parse_args()
+
+    files = [p for path in args.paths for p in existing_files(path)]
+    if not files:
+        print("No telemetry files found")
+        return
+    rows, slow = report(read_records(files), args.slowest)
+
+    print(f"{'engine':8} {'version':8} {'phase':10} {'moves':>6} {'p50 s':>8} {'p90 s':>8} "
+          f"{'p99 s':>8} {'max s':>8} {'p10 n/s':>8} {'p50 n/s':>8} {'depth':>6}")
+    for row in rows:
+        print(f"{row['engine']:8} {row['version']:8} {row['phase']:10} {row['moves']:>6} "
+              f"{row['time_p50']:>8.3f} {row['time_p90']:>8.3f} {row['time_p99']:>8.3f} "
+              f"{row['time_max']:>8.3f} {row['nps_p10']:>8} {row['nps_p50']:>8} {row['depth_avg']:>6.1f}")
+
+    if slow:
+        print("\nSlowest moves:")
+        for record in slow:
+            moves = record.get("moves", [])
+            pairs = [(moves[i], moves[i + 1]) for i in range(0, len(moves), 2)]
+            print(f"{record['time']:.3f}s {record['engine']} depth {record['depth']} "
+                  f"{record['nodes']} nodes ({record['stop']}): {pairs}")
+
+
+if __name__ == "__main__":
+    main()
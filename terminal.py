@@ -1,14 +1,32 @@
 import numpy as np
 from board import Board
 from ai import get_best_move
+import ai_2
+import beam
+from archive import record_game
+from search_limits import SearchLimits
+from time_manager import GameClock, TimeManager
+from telemetry import record_move
+import rules
 import os
 import time
 
 class GomokuTerminal:
     def __init__(self):
-        self.board = Board(15)
+        # Rule variant, from GOMOKU_RULES (freestyle, standard or renju)
+        self.board = Board(15, rules.from_env())
         self.game_mode = None
-        self.ai_depth = 2
+        # AI search limits, configurable through GOMOKU_AI_* environment variables
+        self.ai_limits = SearchLimits.from_env(depth=2)
+        self.ai_depth = self.ai_limits.depth
+        # Optional game clock from GOMOKU_CLOCK ("300+2"); the AI then budgets its time from it
+        self.clock = GameClock.from_env()
+        self.time_manager = TimeManager.from_env(self.clock, self.ai_limits.nodes) if self.clock else None
+        # Beam search engine limits (GOMOKU_BEAM_DEPTH, default 6 plies, 5 seconds)
+        self.beam_limits = beam.limits_from_env()
+        self.move_times = []  # Per-move think times, saved with the game
+        self.engines_used = set()  # Engines that made moves, saved with the game
+        self.lost_on_time = None
         
     def clear_screen(self):
         """Clear the terminal screen"""
@@ -29,6 +47,22 @@ class GomokuTerminal:
                 else:
                     print(" _ ", end="")
             print()
+        if self.clock:
+            print(f"\nClock: {self.clock}")
+    
+    def start_clock(self):
+        if self.clock:
+            self.clock.start(self.board.current_player)
+
+    def stop_clock(self, color):
+        """Stop the clock after color's move; a flagged player loses on time."""
+        if not self.clock:
+            return
+        self.clock.stop()
+        if self.clock.flagged(color) and not self.board.game_over:
+            self.board.game_over = True
+            self.board.winner = Board.WHITE if color == Board.BLACK else Board.BLACK
+            self.lost_on_time = color
     
     def get_human_move(self):
         """Get valid move input from human player"""
@@ -48,21 +82,46 @@ class GomokuTerminal:
             except ValueError:
                 print("Please enter valid numbers")
     
-    def make_ai_move(self, use_alphabeta=True):
+    def make_ai_move(self, use_alphabeta=True, use_beam=False):
         """Make AI move using the specified algorithm"""
-        print(f"\n{'Alpha-Beta' if use_alphabeta else 'MiniMax'} AI is thinking...")
+        if use_beam:
+            print("\nBeam Search AI is thinking...")
+        else:
+            print(f"\n{'Alpha-Beta' if use_alphabeta else 'MiniMax'} AI is thinking...")
         start_time = time.time()
+        color = self.board.current_player
+        self.start_clock()
+        limits = self.time_manager.limits_for(self.board, color) if self.time_manager else self.ai_limits
         
-        move, _ = get_best_move(
-            self.board, 
-            self.ai_depth, 
-            self.board.current_player, 
-            use_alphabeta
-        )
+        if use_beam:
+            engine = "beam"
+            if self.time_manager:
+                limits.depth = self.beam_limits.depth
+            else:
+                limits = self.beam_limits
+            move, _ = beam.get_best_move(self.board, limits.depth, color, limits=limits)
+        elif self.time_manager:
+            # Under a clock the iterative deepening engine lets time end the search
+            engine = "ai_2"
+            move, _ = ai_2.get_best_move(self.board, limits.depth, color, use_alphabeta, limits)
+        else:
+            engine = "ai"
+            move, _ = get_best_move(
+                self.board, 
+                self.ai_depth, 
+                color, 
+                use_alphabeta,
+                limits
+            )
         
         think_time = time.time() - start_time
-        print(f"AI placed at {move[0]}, {move[1]} (took {think_time:.1f}s)")
+        print(f"AI placed at {move[0]}, {move[1]} (took {think_time:.1f}s, "
+              f"stopped by {limits.stop_reason} limit)")
+        record_move(engine, limits, self.board)
+        self.engines_used.add(engine)
         self.board.make_move(*move)
+        self.stop_clock(color)
+        self.move_times.append(think_time)
     
     def select_game_mode(self):
         """Let user select game mode"""
@@ -72,12 +131,14 @@ class GomokuTerminal:
         print("1. Human vs MiniMax AI")
         print("2. Human vs Alpha-Beta AI")
         print("3. MiniMax AI vs Alpha-Beta AI")
+        print("4. Human vs Beam Search AI")
+        print("5. Beam Search AI vs Alpha-Beta AI")
         
         while True:
-            choice = input("Enter choice (1-3): ")
-            if choice in ['1', '2', '3']:
+            choice = input("Enter choice (1-5): ")
+            if choice in ['1', '2', '3', '4', '5']:
                 return int(choice)
-            print("Invalid choice, please enter 1, 2 or 3")
+            print("Invalid choice, please enter 1 to 5")
     
     def play(self):
         """Main game loop"""
@@ -87,32 +148,56 @@ class GomokuTerminal:
         # 1 = Human (Black) vs MiniMax (White)
         # 2 = Human (Black) vs Alpha-Beta (White)
         # 3 = MiniMax (Black) vs Alpha-Beta (White)
+        # 4 = Human (Black) vs Beam Search (White)
+        # 5 = Beam Search (Black) vs Alpha-Beta (White)
         
         while not self.board.game_over:
             self.clear_screen()
             self.print_board()
             
-            if mode == 3:  # AI vs AI
+            if mode in (3, 5):  # AI vs AI
                 input("\nPress Enter for next move...")
-                use_alphabeta = (self.board.current_player == Board.WHITE)
-                self.make_ai_move(use_alphabeta)
+                black = (self.board.current_player == Board.BLACK)
+                if mode == 3:
+                    self.make_ai_move(use_alphabeta=not black)
+                else:
+                    self.make_ai_move(use_beam=black)
                 continue
                 
-            if (mode == 1 and self.board.current_player == Board.WHITE) or \
-               (mode == 2 and self.board.current_player == Board.WHITE):
+            if mode in (1, 2, 4) and self.board.current_player == Board.WHITE:
                 # AI's turn
                 use_alphabeta = (mode == 2)
-                self.make_ai_move(use_alphabeta)
+                self.make_ai_move(use_alphabeta, use_beam=(mode == 4))
             else:
                 # Human's turn
                 print(f"\nYour turn ({'Black (X)' if self.board.current_player == Board.BLACK else 'White (O)'})")
+                start_time = time.time()
+                color = self.board.current_player
+                self.start_clock()
                 while True:
                     row, col = self.get_human_move()
                     if self.board.make_move(row, col):
                         break
-                    print("Invalid move - try again")
+                    if self.board.in_bounds(row, col) and self.board.get(row, col) == Board.EMPTY \
+                            and self.board.is_forbidden(row, col):
+                        print("Forbidden move for Black (Renju) - try again")
+                    else:
+                        print("Invalid move - try again")
+                self.stop_clock(color)
+                self.move_times.append(time.time() - start_time)
         
         # Game over
+        config = {"mode": mode, "engine": ",".join(sorted(self.engines_used)), "depth": self.ai_depth,
+                  "rules": self.board.rules}
+        if mode in (4, 5):
+            config["beam_depth"] = self.beam_limits.depth
+        if self.clock:
+            config["clock"] = f"{self.clock.total:g}+{self.clock.increment:g}"
+        try:
+            record_game(self.board, config, self.move_times)
+        except OSError as e:
+            print(f"Could not archive game: {e}")
+        
         self.clear_screen()
         self.print_board()
         
@@ -120,7 +205,7 @@ class GomokuTerminal:
             print("\nGame ended in a draw!")
         else:
             winner = "Black (X)" if self.board.winner == Board.BLACK else "White (O)"
-            print(f"\n{winner} wins!")
+            print(f"\n{winner} wins{' on time' if self.lost_on_time else ''}!")
         
         input("\nPress Enter to exit...")
 
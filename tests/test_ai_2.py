@@ -0,0 +1,45 @@
+import pytest
+
+import ai_2
+from board import Board
+from search_limits import SearchLimits
+from sparse_board import SparseBoard
+
+# Black's closed four on a diagonal, White to move; the block is at (4, 4)
+FOUR = [(0, 0), (-1, -1), (1, 1), (-6, 6), (2, 2), (-6, 4), (3, 3)]
+
+
+def test_pack_move_round_trip():
+    for move in [(0, 0), (7, 7), (150, 299), (-5, 3), (-ai_2.MOVE_OFFSET, ai_2.MOVE_OFFSET - 1)]:
+        assert ai_2.unpack_move(ai_2.pack_move(*move)) == move
+
+
+def test_pack_move_rejects_out_of_range():
+    with pytest.raises(ValueError):
+        ai_2.pack_move(ai_2.MOVE_OFFSET, 0)
+
+
+@pytest.mark.parametrize("size, offset", [(301, 150), (None, 200), (None, -1000)])
+def test_search_on_large_sparse_board(size, offset):
+    moves = [(offset + r, offset + c) for r, c in FOUR]
+    board = SparseBoard.from_moves(moves, size)
+    move, _ = ai_2.EngineSession().get_best_move(board, 2, board.current_player,
+                                                 limits=SearchLimits(depth=2))
+    # Black has a four on the diagonal; White must block it
+    assert move == (offset + 4, offset + 4)
+    assert board.is_valid_move(*move)
+
+
+def test_dense_board_search_unchanged():
+    board = Board.from_moves([(7 + r, 7 + c) for r, c in FOUR], 15)
+    move, _ = ai_2.EngineSession().get_best_move(board, 2, board.current_player,
+                                                 limits=SearchLimits(depth=2))
+    assert move == (11, 11)
+
+
+def test_quiet_search_on_large_sparse_board():
+    board = SparseBoard.from_moves([(150, 150), (150, 151), (151, 150)], 301)
+    move, _ = ai_2.EngineSession().get_best_move(board, 2, board.current_player,
+                                                 limits=SearchLimits(depth=2))
+    assert board.is_valid_move(*move)
+    assert max(abs(move[0] - 150), abs(move[1] - 150)) <= 3
@@ -0,0 +1,16 @@
+from archive import GameArchiveWriter, read_games
+from board import Board
+from rules import FREESTYLE, RENJU
+
+
+def test_replayed_games_keep_their_rules(tmp_path):
+    path = str(tmp_path / "games.gmka")
+    moves = [(7, 7), (0, 0), (7, 8)]
+    with GameArchiveWriter(path) as writer:
+        writer.write_board(Board.from_moves(moves, 15, rules=RENJU), {"rules": RENJU})
+        writer.write_board(Board.from_moves(moves, 15))
+    renju, freestyle = read_games(path)
+    assert renju.to_board().rules == RENJU
+    assert freestyle.to_board().rules == FREESTYLE
+    undecoded = next(read_games(path, decode_config=False))
+    assert undecoded.rules == FREESTYLE
@@ -0,0 +1,14 @@
+from board import Board
+from pn_search import ProofTable, _key
+from rules import FREESTYLE, RENJU
+
+
+def test_proofs_are_not_shared_across_rules():
+    moves = [(7, 7), (0, 0), (7, 8), (0, 2), (7, 9), (0, 4)]
+    freestyle = Board.from_moves(moves, 15)
+    renju = Board.from_moves(moves, 15, rules=RENJU)
+    table = ProofTable()
+    table.put(_key(freestyle, Board.BLACK))
+    assert table.get(_key(freestyle, Board.BLACK))
+    assert table.get(_key(renju, Board.BLACK)) is None
+    assert table.get(_key(Board.from_moves(moves, 19, rules=FREESTYLE), Board.BLACK)) is None
@@ -0,0 +1,84 @@
+import asyncio
+import json
+
+import pytest
+
+from server import EngineServer
+
+
+@pytest.fixture
+def server():
+    server = EngineServer(workers=1)
+    yield server
+    server.executor.shutdown()
+
+
+def send(server, request):
+    return asyncio.run(server.handle_line(json.dumps(request)))
+
+
+def assert_bad_request(server, request, message):
+    response = send(server, request)
+    assert response["ok"] is False
+    assert message in response["error"]
+    assert server.metrics.errors == 0
+
+
+@pytest.mark.parametrize("size", [[15], "x", 15.5, True, 0, 1000])
+def test_new_game_rejects_bad_size(server, size):
+    assert_bad_request(server, {"op": "new_game", "size": size}, "'size'")
+
+
+def test_new_game_rejects_bad_rules(server):
+    assert_bad_request(server, {"op": "new_game", "rules": ["renju"]}, "Unknown rules")
+
+
+@pytest.mark.parametrize("game", [[1], {"id": 1}, True, 1.0])
+def test_rejects_bad_game_id(server, game):
+    send(server, {"op": "new_game"})
+    assert_bad_request(server, {"op": "move", "game": game, "row": 7, "col": 7}, "'game'")
+
+
+def test_unknown_game(server):
+    assert_bad_request(server, {"op": "state", "game": "1"}, "Unknown game")
+
+
+@pytest.mark.parametrize("field", ["row", "col"])
+@pytest.mark.parametrize("value", [None, [7], "x", 7.5, False])
+def test_move_rejects_bad_coordinates(server, field, value):
+    game = send(server, {"op": "new_game"})["game"]
+    request = {"op": "move", "game": game, "row": 7, "col": 7}
+    if value is None:
+        del request[field]
+    else:
+        request[field] = value
+    assert_bad_request(server, request, f"'{field}'")
+
+
+@pytest.mark.parametrize("field", ["depth", "nodes"])
+@pytest.mark.parametrize("value", [[2], "x", 2.5, True, {}])
+def test_ai_move_rejects_bad_integer_fields(server, field, value):
+    game = send(server, {"op": "new_game"})["game"]
+    assert_bad_request(server, {"op": "ai_move", "game": game, field: value}, f"'{field}'")
+
+
+@pytest.mark.parametrize("field", ["time_limit", "soft_time", "hard_time"])
+@pytest.mark.parametrize("value", [[2], "x", True, {}, "nan", "inf"])
+def test_ai_move_rejects_bad_number_fields(server, field, value):
+    game = send(server, {"op": "new_game"})["game"]
+    assert_bad_request(server, {"op": "ai_move", "game": game, field: value}, f"'{field}'")
+
+
+def test_ai_move_rejects_bad_engine(server):
+    game = send(server, {"op": "new_game"})["game"]
+    assert_bad_request(server, {"op": "ai_move", "game": game, "engine": ["ai"]}, "Unknown engine")
+
+
+def test_valid_move_and_search(server):
+    game = send(server, {"op": "new_game", "size": "15"})["game"]
+    assert send(server, {"op": "move", "game": game, "row": "7", "col": 7})["ok"]
+    response = send(server, {"op": "ai_move", "game": game, "engine": "ai_2", "depth": 1,
+                             "time_limit": 5, "nodes": "500"})
+    assert response["ok"], response
+    assert len(response["move"]) == 2
+    assert server.metrics.errors == 0
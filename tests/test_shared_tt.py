@@ -0,0 +1,19 @@
+from board import Board
+from rules import FREESTYLE, RENJU
+from shared_tt import SharedTranspositionTable
+
+
+def test_entries_are_not_shared_across_variants():
+    table = SharedTranspositionTable(1 << 10)
+    try:
+        state_hash = (Board(15).hash_key, Board.BLACK)
+        entry = (3, 10, 0, (7, 7))
+        table.for_color(Board.BLACK, FREESTYLE, 15)[state_hash] = entry
+        assert table.for_color(Board.BLACK, FREESTYLE, 15).get(state_hash) == entry
+        assert table.for_color(Board.WHITE, FREESTYLE, 15).get(state_hash) is None
+        assert table.for_color(Board.BLACK, RENJU, 15).get(state_hash) is None
+        assert table.for_color(Board.BLACK, FREESTYLE, 19).get(state_hash) is None
+        assert table.for_color(Board.BLACK, FREESTYLE, None).get(state_hash) is None
+    finally:
+        table.close()
+        table.unlink()
@@ -0,0 +1,386 @@
+"""
+Threat detection.
+
+scan() finds, for both players at once, every cell where one more stone
+makes five, an open four, a four or an open three. recent_threats() does
+the same for only the lines through the last few moves, cheaply enough for
+every search node. forcing_moves() turns either into the move list used by
+quiescence search (winning moves, forced blocks of the opponent's fours,
+then the side to move's own fours and open threes), and forced_moves()
+uses recent_threats() to restrict move generation. analyze_move() classifies a single move,
+including double threats.
+
+Works on both Board and SparseBoard through their get/in_bounds/is_playable
+accessors.
+"""
+
+import itertools
+import re
+from board import Board
+from rules import legal_moves
+
+NONE = 0
+OPEN_THREE = 1
+FOUR = 2
+OPEN_FOUR = 3
+FIVE = 4
+
+DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1))
+
+# Lines are read 5 cells each side of the move, enough for every 6-cell
+# window containing it
+REACH = 5
+_CENTER = REACH
+
+_OFF_BOARD = 3
+
+# Map cell values to pattern characters from one player's point of view:
+# 'x' own stone, '.' empty, 'o' opponent stone or off the board
+_TABLES = {
+    Board.BLACK: bytes.maketrans(bytes([Board.EMPTY, Board.BLACK, Board.WHITE, _OFF_BOARD]), b".xoo"),
+    Board.WHITE: bytes.maketrans(bytes([Board.EMPTY, Board.BLACK, Board.WHITE, _OFF_BOARD]), b".oxo"),
+}
+
+
+def get_opponent(color):
+    return Board.WHITE if color == Board.BLACK else Board.BLACK
+
+
+def read_line(state, row, col, dr, dc, reach=REACH):
+    """Cell values from -reach to +reach along a direction, unplayable cells as _OFF_BOARD."""
+    values = bytearray(2 * reach + 1)
+    for i in range(-reach, reach + 1):
+        r, c = row + i * dr, col + i * dc
+        values[i + reach] = state.get(r, c) if state.is_playable(r, c) else _OFF_BOARD
+    return values
+
+
+def line_threat(line, player):
+    """
+    Classify the pattern made by placing player at the centre of a line.
+
+    Args:
+        line: bytearray from read_line (the centre cell is overwritten)
+        player: Player placing the stone
+
+    Returns:
+        int: NONE, OPEN_THREE, FOUR, OPEN_FOUR or FIVE
+    """
+    pattern = bytes(line).translate(_TABLES[player])
+    pattern = pattern[:_CENTER] + b"x" + pattern[_CENTER + 1:]
+
+    if b"xxxxx" in pattern:
+        return FIVE
+
+    # Squares that would complete five through this stone
+    completions = set()
+    for start in range(_CENTER - 4, _CENTER + 1):
+        window = pattern[start:start + 5]
+        if window.count(b"x") == 4 and window.count(b".") == 1:
+            completions.add(start + window.index(b"."))
+    if len(completions) >= 2:
+        return OPEN_FOUR
+    if completions:
+        return FOUR
+
+    # Open three: a 6-cell window with empty ends and three stones plus one
+    # gap inside, so one more stone makes an open four
+    for start in range(_CENTER - 4, _CENTER):
+        window = pattern[start:start + 6]
+        if window[0] == 46 and window[5] == 46:  # b"."
+            inner = window[1:5]
+            if inner.count(b"x") == 3 and inner.count(b".") == 1:
+                return OPEN_THREE
+    return NONE
+
+
+def analyze_move(state, row, col, player):
+    """
+    Threats a move would create for player.
+
+    Returns:
+        tuple: (level, fours, threes) where level is the strongest threat
+            and fours/threes count the directions with a four (open or not)
+            and with an open three
+    """
+    level = NONE
+    fours = threes = 0
+    for dr, dc in DIRECTIONS:
+        threat = line_threat(read_line(state, row, col, dr, dc), player)
+        if threat > level:
+            level = threat
+        if threat >= FOUR:
+            fours += 1
+        elif threat == OPEN_THREE:
+            threes += 1
+    # Two fours, or a four and an open three, cannot both be stopped
+    if level < OPEN_FOUR and (fours >= 2 or (fours and threes)):
+        level = OPEN_FOUR
+    return level, fours, threes
+
+
+def candidate_cells(state, radius=2):
+    """Playable empty cells within radius of any stone."""
+    cells = set()
+    for row, col, _ in state.moves_history:
+        for r in range(row - radius, row + radius + 1):
+            for c in range(col - radius, col + radius + 1):
+                if state.is_playable(r, c) and state.get(r, c) == Board.EMPTY:
+                    cells.add((r, c))
+    return cells
+
+
+def _window_patterns(width, stones, ends_empty=False):
+    """Regex (as a lookahead, so matches overlap) for windows with `stones` x and the rest '.'"""
+    inner = width - 2 if ends_empty else width
+    options = []
+    for placed in itertools.combinations(range(inner), stones):
+        cells = ["x" if i in placed else "\\." for i in range(inner)]
+        options.append("".join(cells))
+    body = "(" + "|".join(options) + ")"
+    if ends_empty:
+        body = "\\." + body + "\\."
+    return re.compile(("(?=" + body + ")").encode())
+
+
+# Windows where one more stone makes five
+_FIVE_RE = _window_patterns(5, 4)
+# Windows where one more stone makes a four
+_FOUR_RE = _window_patterns(5, 3)
+# Windows where one more stone makes an open (straight) four
+_OPEN_FOUR_RE = _window_patterns(6, 3, ends_empty=True)
+# Windows where one more stone makes an open three
+_OPEN_THREE_RE = _window_patterns(6, 2, ends_empty=True)
+
+_line_cache = {}
+
+
+class PlayerThreats:
+    """Cells where one more stone gives a player each kind of threat"""
+
+    __slots__ = ("fives", "open_fours", "fours", "threes", "three_blocks")
+
+    def __init__(self):
+        self.fives = set()         # Completes five: must be blocked by the opponent
+        self.open_fours = set()    # Makes a straight four: the player has an open three
+        self.fours = set()         # Makes a (blockable) four
+        self.threes = set()        # Makes an open three
+        self.three_blocks = set()  # Empty cells of the open threes: the opponent's defences
+
+
+def _match_threats(pattern, threats, cell_at):
+    """
+    Add the threat cells found in one translated line pattern.
+
+    Args:
+        pattern (bytes): Line from one player's point of view ('x', '.', 'o')
+        threats (PlayerThreats): Sets to add to
+        cell_at: Function mapping an index of pattern to a (row, col) cell
+    """
+    for regex, target, offset in ((_FIVE_RE, threats.fives, 0), (_FOUR_RE, threats.fours, 0),
+                                  (_OPEN_FOUR_RE, threats.open_fours, 1),
+                                  (_OPEN_THREE_RE, threats.threes, 1)):
+        for match in regex.finditer(pattern):
+            window = match.group(1)
+            start = match.start() + offset
+            gap = window.find(b".")
+            while gap != -1:
+                target.add(cell_at(start + gap))
+                gap = window.find(b".", gap + 1)
+            if regex is _OPEN_FOUR_RE:
+                # Every empty cell of an open three's window defends it
+                for i in range(6):
+                    if pattern[match.start() + i] == 46:  # b"."
+                        threats.three_blocks.add(cell_at(match.start() + i))
+
+
+def _region(state):
+    """Rectangle of cells to scan: the whole board, or the stones' box plus a margin."""
+    if not hasattr(state, "stones"):
+        return 0, state.size - 1, 0, state.size - 1
+    box = state.bounding_box()
+    if box is None:
+        return None
+    r0, r1, c0, c1 = box[0] - REACH, box[1] + REACH, box[2] - REACH, box[3] + REACH
+    if state.size is not None:
+        r0, c0 = max(r0, 0), max(c0, 0)
+        r1, c1 = min(r1, state.size - 1), min(c1, state.size - 1)
+    return r0, r1, c0, c1
+
+
+def _line_layout(height, width):
+    """
+    Index lists gathering every row, column and diagonal of a height x width
+    grid into one sequence, separated by an off-board marker (index -1).
+    """
+    key = (height, width)
+    if key not in _line_cache:
+        lines = [[r * width + c for c in range(width)] for r in range(height)]
+        lines += [[r * width + c for r in range(height)] for c in range(width)]
+        for k in range(-(height - 1), width):
+            lines.append([r * width + r + k for r in range(height) if 0 <= r + k < width])
+        for k in range(0, height + width - 1):
+            lines.append([r * width + k - r for r in range(height) if 0 <= k - r < width])
+        order = []
+        for line in lines:
+            if len(line) >= 5:
+                order.extend(line)
+                order.append(-1)
+        _line_cache[key] = order
+    return _line_cache[key]
+
+
+def scan(state):
+    """
+    Find every threat cell for both players by pattern-matching whole lines.
+
+    All rows, columns and diagonals are joined into one byte string per
+    player and searched with regular expressions, which is much cheaper
+    than analysing every candidate cell separately.
+
+    Returns:
+        dict: {Board.BLACK: PlayerThreats, Board.WHITE: PlayerThreats}
+    """
+    result = {Board.BLACK: PlayerThreats(), Board.WHITE: PlayerThreats()}
+    region = _region(state)
+    if region is None:
+        return result
+    r0, r1, c0, c1 = region
+    height, width = r1 - r0 + 1, c1 - c0 + 1
+
+    cells = bytearray(height * width + 1)
+    cells[-1] = _OFF_BOARD  # Target of the separator index -1
+    for r in range(r0, r1 + 1):
+        base = (r - r0) * width
+        for c in range(c0, c1 + 1):
+            if not state.is_playable(r, c):
+                cells[base + c - c0] = _OFF_BOARD
+            else:
+                cells[base + c - c0] = state.get(r, c)
+
+    order = _line_layout(height, width)
+    joined = bytes(cells[i] for i in order)
+
+    def cell_at(i):
+        return r0 + order[i] // width, c0 + order[i] % width
+
+    for player, threats in result.items():
+        _match_threats(joined.translate(_TABLES[player]), threats, cell_at)
+        threats.fours -= threats.fives
+    return result
+
+
+def recent_threats(state, recent=4):
+    """
+    Threat cells on the lines through the most recent moves.
+
+    A new threat always involves the stone that made it, so between them
+    the lines through the last few moves hold every threat that can still
+    matter. Far cheaper than scan() as only 2 * REACH + 1 cells are read
+    per line.
+
+    Args:
+        state: Board or SparseBoard
+        recent (int): Number of most recent moves to look at
+
+    Returns:
+        dict: {Board.BLACK: PlayerThreats, Board.WHITE: PlayerThreats}
+    """
+    result = {Board.BLACK: PlayerThreats(), Board.WHITE: PlayerThreats()}
+    # All lines joined into one string, each followed by an off-board
+    # separator, so each pattern is matched once per player
+    origins = []
+    joined = bytearray()
+    for row, col, _ in state.moves_history[-recent:]:
+        for dr, dc in DIRECTIONS:
+            origins.append((row - REACH * dr, col - REACH * dc, dr, dc))
+            joined += read_line(state, row, col, dr, dc)
+            joined.append(_OFF_BOARD)
+    joined = bytes(joined)
+    stride = 2 * REACH + 2
+
+    def cell_at(i):
+        r, c, dr, dc = origins[i // stride]
+        i %= stride
+        return r + i * dr, c + i * dc
+
+    for player, threats in result.items():
+        _match_threats(joined.translate(_TABLES[player]), threats, cell_at)
+    for threats in result.values():
+        threats.fours -= threats.fives
+    return result
+
+
+def forced_moves(state, recent=4):
+    """
+    The moves the side to move is restricted to, if any.
+
+    - It can win: only a winning move.
+    - The opponent has a four: only the blocking squares.
+    - The opponent has an open three: the squares defending it, or own
+      fours and open fours that gain a tempo.
+
+    Args:
+        state: Board or SparseBoard
+        recent (int): Number of most recent moves whose lines are checked
+
+    Returns:
+        list: Sorted moves, or None when nothing is forced and every
+            candidate has to be considered
+    """
+    if state.game_over or not state.moves_history:
+        return None
+    player = state.current_player
+    threats = recent_threats(state, recent)
+    own, theirs = threats[player], threats[get_opponent(player)]
+
+    if own.fives:
+        moves = [min(own.fives)]
+    elif theirs.fives:
+        moves = sorted(theirs.fives)
+    elif theirs.open_fours:
+        moves = sorted(theirs.three_blocks | own.fours | own.open_fours)
+    else:
+        return None
+    # Forbidden moves (Renju) cannot be played; if no reply is left, nothing is forced
+    return legal_moves(state, moves) or None
+
+
+def forcing_moves(state, include_threes=True, recent=None):
+    """
+    Forcing moves for the side to move.
+
+    Args:
+        state: Board or SparseBoard
+        include_threes (bool): Also return moves making an open three
+        recent (int): Only look at the lines through this many most recent
+            moves (recent_threats) instead of scanning the whole board
+
+    Returns:
+        tuple: (moves, forced) where forced is True when the side to move
+            must play one of the moves (it can win, or must block a four),
+            and False when the moves are optional attacks/defences
+    """
+    if state.game_over:
+        return [], False
+    player = state.current_player
+    threats = scan(state) if recent is None else recent_threats(state, recent)
+    own, theirs = threats[player], threats[get_opponent(player)]
+
+    if own.fives:
+        return legal_moves(state, sorted(own.fives))[:1], True
+    if theirs.fives:
+        return legal_moves(state, sorted(theirs.fives)), True
+
+    # Own open fours (unstoppable), own fours, blocks of the opponent's open
+    # threes, then own open threes
+    moves = sorted(own.open_fours)
+    seen = set(moves)
+    groups = [own.fours, theirs.open_fours]
+    if include_threes:
+        groups.append(own.threes)
+    for group in groups:
+        for move in sorted(group - seen):
+            moves.append(move)
+            seen.add(move)
+    return legal_moves(state, moves), False
@@ -0,0 +1,215 @@
+"""
+Game clock and adaptive time management.
+
+GameClock keeps each player's remaining time under a total + increment
+time control. TimeManager turns the remaining time into SearchLimits for
+one move:
+
+- The move gets the remaining time divided by the estimated number of
+  moves still to play, plus most of the increment, as its soft limit
+  (no new iteration is started after it), and a few times that, capped at
+  a fraction of the remaining time, as its hard limit.
+- The returned TimedLimits watches the engine's iterations: a forced reply
+  stops the search at once, a best move that stays the same for
+  STABLE_ITERATIONS iterations cuts the soft limit, and a sharp score drop
+  stretches it (never past the hard limit) to look for a way out.
+
+Usage:
+    clock = GameClock(300, increment=2)
+    manager = TimeManager(clock)
+    clock.start(color)
+    limits = manager.limits_for(board, color)
+    move, value = ai_2.get_best_move(board, limits.depth, color, limits=limits)
+    clock.stop()
+"""
+
+import os
+import time
+from board import Board
+from search_limits import SearchLimits, STABLE, FORCED
+
+# Plies a game is expected to last, and the fewest own moves time is saved for
+EXPECTED_GAME_PLIES = 70
+MIN_MOVES_TO_GO = 10
+# Fraction of the increment spent on the current move
+INCREMENT_USE = 0.75
+# The hard limit is this many soft limits, but at most this fraction of the
+# remaining time, and never closer than SAFETY_MARGIN seconds to flagging
+HARD_FACTOR = 4.0
+MAX_FRACTION = 0.25
+SAFETY_MARGIN = 0.5
+
+# Stability: after this many iterations with the same best move the soft
+# limit is scaled by STABLE_FACTOR
+STABLE_ITERATIONS = 3
+STABLE_FACTOR = 0.4
+# A score this much worse than the previous iteration's scales the soft
+# limit by DROP_FACTOR
+SCORE_DROP = 500
+DROP_FACTOR = 2.0
+
+DEFAULT_DEPTH = 12
+
+
+class GameClock:
+    """
+    Remaining time of both players under a total + increment time control.
+    """
+
+    def __init__(self, total, increment=0.0):
+        """
+        Args:
+            total (float): Seconds each player has for the game
+            increment (float): Seconds added after each of a player's moves
+        """
+        self.total = total
+        self.increment = increment
+        self.remaining = {Board.BLACK: float(total), Board.WHITE: float(total)}
+        self._running = None
+
+    @classmethod
+    def from_env(cls):
+        """
+        Clock from GOMOKU_CLOCK ("total" or "total+increment" in seconds),
+        or None when it is not set.
+        """
+        value = os.environ.get("GOMOKU_CLOCK")
+        if not value:
+            return None
+        total, _, increment = value.partition("+")
+        return cls(float(total), float(increment) if increment else 0.0)
+
+    def start(self, color):
+        """Start color's clock."""
+        self._running = (color, time.time())
+
+    def stop(self):
+        """
+        Stop the running clock, charging the time used and adding the increment.
+
+        Returns:
+            float: Seconds used for the move
+        """
+        if self._running is None:
+            return 0.0
+        color, started = self._running
+        self._running = None
+        used = time.time() - started
+        self.remaining[color] += self.increment - used
+        return used
+
+    def time_left(self, color):
+        """Remaining seconds of color, including the running move."""
+        remaining = self.remaining[color]
+        if self._running is not None and self._running[0] == color:
+            remaining -= time.time() - self._running[1]
+        return remaining
+
+    def flagged(self, color):
+        """Whether color has run out of time."""
+        return self.time_left(color) <= 0
+
+    def reset(self):
+        self.remaining = {Board.BLACK: float(self.total), Board.WHITE: float(self.total)}
+        self._running = None
+
+    def __str__(self):
+        return (f"Black {self.time_left(Board.BLACK):.1f}s, "
+                f"White {self.time_left(Board.WHITE):.1f}s")
+
+
+class TimedLimits(SearchLimits):
+    """
+    SearchLimits whose soft time limit adapts to the engine's iterations.
+    """
+
+    def __init__(self, depth=None, nodes=None, soft_time=None, hard_time=None, deadline=None):
+        super().__init__(depth, nodes, soft_time, hard_time, deadline)
+        self.base_soft_time = soft_time
+
+    def start(self):
+        super().start()
+        self.early_stop = None
+        self.stable_iterations = 0
+        self.last_move = None
+        self.last_value = None
+        if getattr(self, "base_soft_time", None) is not None:
+            self.soft_time = self.base_soft_time
+
+    def completed_iteration(self, depth, best_move, best_value, root_moves):
+        if root_moves <= 1:
+            self.early_stop = FORCED
+            return
+
+        self.stable_iterations = self.stable_iterations + 1 if best_move == self.last_move else 1
+        factor = 1.0
+        if self.last_value is not None and self.last_value - best_value >= SCORE_DROP:
+            # The previous best line fails: spend more time looking for another
+            factor = DROP_FACTOR
+        elif self.stable_iterations >= STABLE_ITERATIONS:
+            factor = STABLE_FACTOR
+        self.last_move = best_move
+        self.last_value = best_value
+
+        if self.base_soft_time is not None:
+            soft = self.base_soft_time * factor
+            if self.hard_time is not None:
+                soft = min(soft, self.hard_time)
+            self.soft_time = soft
+            if factor < 1 and self.soft_time_passed():
+                self.early_stop = STABLE
+
+    def can_deepen(self, depth):
+        if self.early_stop is not None and depth > 1:
+            self.finish(self.early_stop)
+            return False
+        return super().can_deepen(depth)
+
+
+class TimeManager:
+    """
+    Allocates per-move limits from a GameClock.
+    """
+
+    def __init__(self, clock, depth=DEFAULT_DEPTH, nodes=None):
+        """
+        Args:
+            clock (GameClock): The game clock
+            depth (int): Maximum depth, so time rather than depth ends searches
+            nodes (int): Optional node budget per move
+        """
+        self.clock = clock
+        self.depth = depth
+        self.nodes = nodes
+
+    @classmethod
+    def from_env(cls, clock, nodes=None):
+        """
+        Time manager searching to GOMOKU_AI_DEPTH if it is set, otherwise
+        to DEFAULT_DEPTH, so the clock rather than the depth ends searches.
+        """
+        depth = os.environ.get("GOMOKU_AI_DEPTH")
+        return cls(clock, int(depth) if depth else DEFAULT_DEPTH, nodes)
+
+    def allocate(self, state, color):
+        """
+        Soft and hard time limits for color's next move.
+
+        Returns:
+            tuple: (soft_time, hard_time) in seconds
+        """
+        remaining = self.clock.time_left(color) - SAFETY_MARGIN
+        if remaining <= 0:
+            # Nearly flagged: move almost at once
+            return 0.05, 0.1
+        plies_left = max(0, EXPECTED_GAME_PLIES - len(state.moves_history))
+        moves_to_go = max(MIN_MOVES_TO_GO, plies_left / 2)
+        increment = self.clock.increment * INCREMENT_USE
+        soft = remaining / moves_to_go + increment
+        hard = min(soft * HARD_FACTOR, remaining * MAX_FRACTION + increment, remaining)
+        return min(soft, hard), hard
+
+    def limits_for(self, state, color):
+        """TimedLimits for color's next move."""
+        soft, hard = self.allocate(state, color)
+        return TimedLimits(depth=self.depth, nodes=self.nodes, soft_time=soft, hard_time=hard)
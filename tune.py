@@ -0,0 +1,364 @@
+"""
+Evaluation weight tuning.
+
+Fits the pattern weights in eval_fn (consec_score, block_count_score,
+not_current_score, empty_space_score) against game outcomes with a
+Texel-style loss: the probability that the side to move wins a position is
+modelled as sigmoid(evaluation / scale), and the mean squared error against
+the actual result is minimised with gradient descent.
+
+Feature extraction is the expensive part, so it never calls
+evaluation_state. Positions are replayed from the game archive into NumPy
+arrays in batches, every line of every position is stacked into one array,
+and the evaluate_line scanner is run once per column across all of them.
+The resulting pattern counts are exactly the calc() calls evaluation_state
+would make, so features @ bucket values reproduces its score.
+
+Usage:
+    python tune.py games.gmka -o weights.json
+"""
+
+import argparse
+import numpy as np
+from board import Board
+import eval_fn
+from archive import read_games, RESULT_BLACK, RESULT_WHITE, RESULT_DRAW
+
+# Pattern buckets per colour: run lengths 1-4 x blocked x split by a gap,
+# then the two five-in-a-row scores.
+FIVE_GAP_BUCKET = 16
+FIVE_BUCKET = 17
+N_BUCKETS = 18
+# Features are the bucket counts of the side to move followed by those of
+# its opponent.
+N_FEATURES = 2 * N_BUCKETS
+
+# Value used to pad short diagonals; behaves like an opponent stone for both
+# colours, which is exactly how evaluate_line treats the end of a line.
+_PAD = 3
+
+
+def _run_bucket(consec, blocked, has_empty):
+    return (consec - 1) * 4 + blocked * 2 + has_empty
+
+
+def _line_indices(size):
+    """Flat cell indices of every line evaluate_color scans, padded to size."""
+    grid = np.arange(size * size).reshape(size, size)
+    lines = [grid[i, :] for i in range(size)] + [grid[:, i] for i in range(size)]
+    flipped = np.fliplr(grid)
+    for k in range(-size + 5, size - 4):
+        lines.append(np.diag(grid, k=k))
+        lines.append(np.diag(flipped, k=k))
+
+    indices = np.full((len(lines), size), -1, dtype=np.int64)
+    for i, line in enumerate(lines):
+        indices[i, :len(line)] = line
+    return indices
+
+
+def extract_features(boards, to_move):
+    """
+    Count evaluation patterns for a batch of positions.
+
+    Args:
+        boards: int8 array of shape (N, size, size)
+        to_move: Array of shape (N,) with the side to move of each position
+
+    Returns:
+        np.ndarray: float32 array of shape (N, N_FEATURES)
+    """
+    n, size, _ = boards.shape
+    indices = _line_indices(size)
+    n_lines = indices.shape[0]
+
+    flat = np.concatenate([boards.reshape(n, -1), np.full((n, 1), _PAD, dtype=boards.dtype)], axis=1)
+    # (N * lines, size), padded with one extra sentinel column for lookahead
+    lines = flat[:, indices].reshape(n * n_lines, size)
+    lines = np.concatenate([lines, np.full((lines.shape[0], 1), _PAD, dtype=lines.dtype)], axis=1)
+    position = np.repeat(np.arange(n), n_lines)
+
+    features = np.zeros((n, N_FEATURES), dtype=np.float32)
+    for color in (Board.BLACK, Board.WHITE):
+        counts = _scan_lines(lines, color, position, n)
+        own = to_move == color
+        features[own, :N_BUCKETS] += counts[own]
+        features[~own, N_BUCKETS:] += counts[~own]
+    return features
+
+
+def _scan_lines(lines, color, position, n):
+    """Vectorized evaluate_line over many lines for one colour."""
+    m, width = lines.shape
+    consec = np.zeros(m, dtype=np.int64)
+    block_count = np.full(m, 2, dtype=np.int64)
+    empty = np.zeros(m, dtype=bool)
+    counts = np.zeros(n * N_BUCKETS, dtype=np.int64)
+
+    def emit(mask, run, blocks, has_empty):
+        # calc() scores nothing for a run blocked on both sides
+        mask = mask & ~((blocks == 2) & (run < 5))
+        if not mask.any():
+            return
+        run, blocks, has_empty = run[mask], blocks[mask], has_empty[mask]
+        bucket = np.where(run >= 5,
+                          np.where(has_empty, FIVE_GAP_BUCKET, FIVE_BUCKET),
+                          _run_bucket(np.minimum(run, 4), blocks == 1, has_empty))
+        counts[:] += np.bincount(position[mask] * N_BUCKETS + bucket, minlength=n * N_BUCKETS)
+
+    no_gap = np.zeros(m, dtype=bool)
+    for i in range(width - 1):
+        value = lines[:, i]
+        is_color = value == color
+        is_empty = value == Board.EMPTY
+        in_run = consec > 0
+
+        # Gap inside a run: bridge it once if the run continues after it
+        gap = is_empty & in_run
+        bridge = gap & ~empty & (lines[:, i + 1] == color)
+        close = gap & ~bridge
+        emit(close, consec, block_count - 1, empty)
+
+        # Run ended by an opponent stone (or the end of the line)
+        blocked = ~is_color & ~is_empty & in_run
+        emit(blocked, consec, block_count, no_gap)
+
+        consec = np.where(is_color, consec + 1, np.where(close | blocked, 0, consec))
+        empty = np.where(bridge, True, np.where(close, False, empty))
+        block_count = np.where(close | (is_empty & ~in_run), 1,
+                               np.where(~is_color & ~is_empty, 2, block_count))
+
+    emit(consec > 0, consec, block_count, no_gap)
+    return counts.reshape(n, N_BUCKETS)
+
+
+def pattern_values(weights=None):
+    """
+    Score of each bucket under a weight set, before calc()'s integer rounding.
+
+    Args:
+        weights (dict): Weight set as returned by eval_fn.get_weights
+            (the current eval_fn weights by default)
+
+    Returns:
+        tuple: (current, not_current) float arrays of shape (N_BUCKETS,)
+    """
+    current, not_current = _model_values(_weights_to_params(weights or eval_fn.get_weights()))
+    return current, not_current
+
+
+def evaluate_features(features, weights=None):
+    """Evaluation of each position from the side to move's point of view."""
+    current, not_current = pattern_values(weights)
+    return features[:, :N_BUCKETS] @ current - features[:, N_BUCKETS:] @ not_current
+
+
+def iter_positions(path, size=15, skip_opening=4, batch_size=4096):
+    """
+    Stream labelled positions from a game archive.
+
+    Args:
+        path (str): Game archive
+        size (int): Only games on this board size are used
+        skip_opening (int): Number of opening plies to skip in each game
+        batch_size (int): Approximate number of positions per batch
+
+    Yields:
+        tuple: (boards, to_move, result) with boards of shape (N, size, size)
+            and result the score of the side to move (1 win, 0.5 draw, 0 loss)
+    """
+    boards, to_move, results = [], [], []
+    pending = 0
+    for game in read_games(path, decode_config=False):
+        if game.size != size or game.result not in (RESULT_BLACK, RESULT_WHITE, RESULT_DRAW):
+            continue
+        n = len(game.moves)
+        if n <= skip_opening:
+            continue
+
+        # Position k is the board before move k; replay all prefixes at once
+        cells = np.array([r * size + c for r, c in game.moves])
+        players = np.where(np.arange(n) % 2 == 0, Board.BLACK, Board.WHITE).astype(np.int8)
+        placed = np.arange(n)[None, :] < np.arange(n)[:, None]
+        positions = np.zeros((n, size * size), dtype=np.int8)
+        rows, cols = np.nonzero(placed)
+        positions[rows, cells[cols]] = players[cols]
+
+        positions = positions[skip_opening:]
+        side = players[skip_opening:]
+        if game.result == RESULT_DRAW:
+            score = np.full(len(side), 0.5)
+        else:
+            score = (side == game.result).astype(np.float64)
+
+        boards.append(positions.reshape(-1, size, size))
+        to_move.append(side)
+        results.append(score)
+        pending += len(side)
+        if pending >= batch_size:
+            yield np.concatenate(boards), np.concatenate(to_move), np.concatenate(results)
+            boards, to_move, results = [], [], []
+            pending = 0
+
+    if pending:
+        yield np.concatenate(boards), np.concatenate(to_move), np.concatenate(results)
+
+
+def build_dataset(path, size=15, skip_opening=4, max_positions=None):
+    """
+    Extract features for every position of an archive.
+
+    Returns:
+        tuple: (features, results) arrays
+    """
+    features, results = [], []
+    total = 0
+    for boards, to_move, result in iter_positions(path, size, skip_opening):
+        features.append(extract_features(boards, to_move))
+        results.append(result)
+        total += len(result)
+        if max_positions and total >= max_positions:
+            break
+    if not features:
+        return np.zeros((0, N_FEATURES), dtype=np.float32), np.zeros(0)
+    features = np.concatenate(features)[:max_positions]
+    results = np.concatenate(results)[:max_positions]
+    return features, results
+
+
+# The weights are fitted in log space: every bucket value is a product of
+# weights, so the gradient with respect to a log-weight is just the value of
+# each bucket it appears in.
+def _weights_to_params(weights):
+    return np.log(np.concatenate([np.asarray(weights[name], dtype=np.float64)
+                                  for name in eval_fn.WEIGHT_NAMES]))
+
+
+def _params_to_weights(params):
+    values = np.exp(params)
+    return {name: [float(v) for v in values[i * 4:(i + 1) * 4]]
+            for i, name in enumerate(eval_fn.WEIGHT_NAMES)}
+
+
+def _incidence():
+    """(current, not_current) matrices mapping buckets to the log-weights they use."""
+    matrices = []
+    for is_current in (True, False):
+        a = np.zeros((N_BUCKETS, 16))
+        for consec in range(1, 5):
+            k = consec - 1
+            for blocked in (0, 1):
+                for has_empty in (0, 1):
+                    b = _run_bucket(consec, blocked, has_empty)
+                    a[b, k] = 1
+                    a[b, 4 + k] = blocked
+                    a[b, 8 + k] = not is_current
+                    a[b, 12 + k] = has_empty
+        matrices.append(a)
+    return matrices
+
+
+_INCIDENCE = _incidence()
+
+
+def _model_values(params):
+    values = []
+    for a in _INCIDENCE:
+        v = np.exp(a @ params)
+        v[FIVE_GAP_BUCKET] = eval_fn.FIVE_GAP_SCORE
+        v[FIVE_BUCKET] = eval_fn.FIVE_SCORE
+        values.append(v)
+    return values
+
+
+def _sigmoid(x):
+    return 1 / (1 + np.exp(-np.clip(x, -50, 50)))
+
+
+def texel_loss(features, results, weights=None, scale=1000.0):
+    """Mean squared error between sigmoid(eval / scale) and the results."""
+    evaluation = evaluate_features(features, weights)
+    return float(np.mean((_sigmoid(evaluation / scale) - results) ** 2))
+
+
+def fit_scale(features, results, weights=None):
+    """Find the sigmoid scale that best fits the given weights."""
+    candidates = np.logspace(1, 6, 51)
+    losses = [texel_loss(features, results, weights, scale) for scale in candidates]
+    return float(candidates[int(np.argmin(losses))])
+
+
+def fit_weights(features, results, weights=None, scale=None, iterations=500, learning_rate=0.05, verbose=False):
+    """
+    Fit the pattern weights with gradient descent on the Texel loss.
+
+    Args:
+        features: Feature matrix from extract_features/build_dataset
+        results: Result of each position for the side to move
+        weights (dict): Starting weights (current eval_fn weights by default)
+        scale (float): Sigmoid scale (fitted to the starting weights if None)
+        iterations (int): Number of gradient steps
+        learning_rate (float): Step size in log-weight space
+
+    Returns:
+        tuple: (weights, scale, loss)
+    """
+    weights = weights or eval_fn.get_weights()
+    if scale is None:
+        scale = fit_scale(features, results, weights)
+
+    params = _weights_to_params(weights)
+    own = features[:, :N_BUCKETS].astype(np.float64)
+    opp = features[:, N_BUCKETS:].astype(np.float64)
+    n = max(len(results), 1)
+
+    for step in range(iterations):
+        current, not_current = _model_values(params)
+        evaluation = own @ current - opp @ not_current
+        p = _sigmoid(evaluation / scale)
+        # dLoss/dEval for each position
+        g = 2 * (p - results) * p * (1 - p) / scale / n
+        grad = ((g @ own) * current) @ _INCIDENCE[0] - ((g @ opp) * not_current) @ _INCIDENCE[1]
+        # Normalise the step so the huge range of evaluation scores does not
+        # make the learning rate position dependent
+        norm = np.linalg.norm(grad)
+        if norm == 0:
+            break
+        params -= learning_rate * grad / norm
+        if verbose and step % 50 == 0:
+            print(f"Step {step}: loss {np.mean((p - results) ** 2):.6f}")
+
+    weights = _params_to_weights(params)
+    return weights, scale, texel_loss(features, results, weights, scale)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune eval_fn pattern weights from a game archive")
+    parser.add_argument("archive", help="Game archive written by archive.py")
+    parser.add_argument("-o", "--output", default="weights.json", help="Where to write the fitted weights")
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--learning-rate", type=float, default=0.05)
+    parser.add_argument("--max-positions", type=int, default=None)
+    parser.add_argument("--skip-opening", type=int, default=4)
+    args = parser.parse_args()
+
+    features, results = build_dataset(args.archive, skip_opening=args.skip_opening,
+                                      max_positions=args.max_positions)
+    if len(results) == 0:
+        print("No finished games found in archive")
+        return
+    print(f"Extracted features for {len(results)} positions")
+
+    start_weights = eval_fn.get_weights()
+    scale = fit_scale(features, results, start_weights)
+    print(f"Initial loss: {texel_loss(features, results, start_weights, scale):.6f} (scale {scale:.0f})")
+
+    weights, scale, loss = fit_weights(features, results, start_weights, scale,
+                                       args.iterations, args.learning_rate, verbose=True)
+    print(f"Final loss: {loss:.6f}")
+    eval_fn.save_weights(args.output, weights)
+    print(f"Weights written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()